@@ -9,7 +9,7 @@ from app.auth import AuthorizedUser
 from app.libs.tenant_auth import TenantAuthorizedUser, TenantUserDep
 from app.libs.models import Tenant, TenantUpdate, Industry, CompanySize
 # Import centralized database connection
-from app.libs.db_connection import get_db_connection
+from app.libs.request_db import RequestDB, RequestDBDep
 
 # Try to import file handling dependencies, make them optional
 try:
@@ -145,59 +145,56 @@ class BrandingResponse(BaseModel):
     brand_primary: str
     
 @router.get("/tenant-profile")
-async def get_tenant_profile(tenant_user: TenantAuthorizedUser = TenantUserDep) -> TenantProfileResponse:
+async def get_tenant_profile(tenant_user: TenantAuthorizedUser = TenantUserDep, db: RequestDB = RequestDBDep) -> TenantProfileResponse:
     """Get complete tenant profile including branding for the authenticated user's tenant"""
     
-    conn = await get_db_connection()
-    try:
-        # Get tenant data for the authenticated user's tenant
-        tenant_row = await conn.fetchrow(
-            """SELECT t.id, t.slug, t.name, t.company_name, t.industry, t.company_address, 
-                      t.website_url, t.company_size, t.time_zone,
-                      t.primary_contact_name, t.primary_contact_title, t.primary_contact_email,
-                      t.primary_contact_phone, t.primary_contact_whatsapp,
-                      t.billing_contact_name, t.billing_contact_email,
-                      t.technical_contact_name, t.technical_contact_email,
-                      t.custom_domain,
-                      COALESCE(b.logo_svg, NULL) as logo_svg,
-                      COALESCE(b.brand_primary, '#0052cc') as brand_primary
-               FROM tenants t
-               LEFT JOIN tenant_branding b ON t.slug = b.tenant_id
-               WHERE t.slug = $1""",
-            tenant_user.tenant_slug
-        )
-        
-        if not tenant_row:
-            raise HTTPException(status_code=404, detail="Tenant not found")
-        
-        return TenantProfileResponse(
-            tenant_id=tenant_row['slug'],
-            slug=tenant_row['slug'],
-            name=tenant_row['name'],
-            logo_svg=tenant_row['logo_svg'],
-            brand_primary=tenant_row['brand_primary'],
-            company_name=tenant_row['company_name'],
-            industry=tenant_row['industry'],
-            company_address=tenant_row['company_address'],
-            website_url=tenant_row['website_url'],
-            company_size=tenant_row['company_size'],
-            time_zone=tenant_row['time_zone'],
-            primary_contact_name=tenant_row['primary_contact_name'],
-            primary_contact_title=tenant_row['primary_contact_title'],
-            primary_contact_email=tenant_row['primary_contact_email'],
-            primary_contact_phone=tenant_row['primary_contact_phone'],
-            primary_contact_whatsapp=tenant_row['primary_contact_whatsapp'],
-            billing_contact_name=tenant_row['billing_contact_name'],
-            billing_contact_email=tenant_row['billing_contact_email'],
-            technical_contact_name=tenant_row['technical_contact_name'],
-            technical_contact_email=tenant_row['technical_contact_email'],
-            custom_domain=tenant_row['custom_domain']
-        )
-    finally:
-        await conn.close()
+    conn = await db.connection()
+    # Get tenant data for the authenticated user's tenant
+    tenant_row = await conn.fetchrow(
+        """SELECT t.id, t.slug, t.name, t.company_name, t.industry, t.company_address, 
+                  t.website_url, t.company_size, t.time_zone,
+                  t.primary_contact_name, t.primary_contact_title, t.primary_contact_email,
+                  t.primary_contact_phone, t.primary_contact_whatsapp,
+                  t.billing_contact_name, t.billing_contact_email,
+                  t.technical_contact_name, t.technical_contact_email,
+                  t.custom_domain,
+                  COALESCE(b.logo_svg, NULL) as logo_svg,
+                  COALESCE(b.brand_primary, '#0052cc') as brand_primary
+           FROM tenants t
+           LEFT JOIN tenant_branding b ON t.slug = b.tenant_id
+           WHERE t.slug = $1""",
+        tenant_user.tenant_slug
+    )
+    
+    if not tenant_row:
+        raise HTTPException(status_code=404, detail="Tenant not found")
+    
+    return TenantProfileResponse(
+        tenant_id=tenant_row['slug'],
+        slug=tenant_row['slug'],
+        name=tenant_row['name'],
+        logo_svg=tenant_row['logo_svg'],
+        brand_primary=tenant_row['brand_primary'],
+        company_name=tenant_row['company_name'],
+        industry=tenant_row['industry'],
+        company_address=tenant_row['company_address'],
+        website_url=tenant_row['website_url'],
+        company_size=tenant_row['company_size'],
+        time_zone=tenant_row['time_zone'],
+        primary_contact_name=tenant_row['primary_contact_name'],
+        primary_contact_title=tenant_row['primary_contact_title'],
+        primary_contact_email=tenant_row['primary_contact_email'],
+        primary_contact_phone=tenant_row['primary_contact_phone'],
+        primary_contact_whatsapp=tenant_row['primary_contact_whatsapp'],
+        billing_contact_name=tenant_row['billing_contact_name'],
+        billing_contact_email=tenant_row['billing_contact_email'],
+        technical_contact_name=tenant_row['technical_contact_name'],
+        technical_contact_email=tenant_row['technical_contact_email'],
+        custom_domain=tenant_row['custom_domain']
+    )
 
 @router.put("/tenant-profile")
-async def update_tenant_profile(request: TenantProfileRequest, raw_request: Request, tenant_slug: Optional[str] = None) -> TenantProfileResponse:
+async def update_tenant_profile(request: TenantProfileRequest, raw_request: Request, tenant_slug: Optional[str] = None, db: RequestDB = RequestDBDep) -> TenantProfileResponse:
     """Update complete tenant profile including branding - Super admin bypass enabled"""
     
     # Comprehensive debugging
@@ -245,239 +242,230 @@ async def update_tenant_profile(request: TenantProfileRequest, raw_request: Requ
         raise HTTPException(status_code=401, detail="Authentication required - super admin bypass not found")
     """Update complete tenant profile including branding for the authenticated user's tenant"""
     
-    conn = await get_db_connection()
-    try:
-        # Update tenant table for the authenticated user's tenant
-        tenant_update_fields = []
-        tenant_values = []
-        param_count = 1
+    conn = await db.connection()
+    # Update tenant table for the authenticated user's tenant
+    tenant_update_fields = []
+    tenant_values = []
+    param_count = 1
+    
+    # Map profile fields to update
+    profile_fields = {
+        'company_name': request.company_name,
+        'industry': request.industry.value if isinstance(request.industry, Industry) else request.industry,
+        'company_address': request.company_address,
+        'website_url': request.website_url,
+        'company_size': request.company_size.value if request.company_size else None,
+        'time_zone': request.time_zone,
+        'primary_contact_name': request.primary_contact_name,
+        'primary_contact_title': request.primary_contact_title,
+        'primary_contact_email': request.primary_contact_email,
+        'primary_contact_phone': request.primary_contact_phone,
+        'primary_contact_whatsapp': request.primary_contact_whatsapp,
+        'billing_contact_name': request.billing_contact_name,
+        'billing_contact_email': request.billing_contact_email,
+        'technical_contact_name': request.technical_contact_name,
+        'technical_contact_email': request.technical_contact_email,
+        'custom_domain': request.custom_domain
+    }
+    
+    # Add fields that have values
+    for field, value in profile_fields.items():
+        if value is not None:
+            tenant_update_fields.append(f"{field} = ${param_count}")
+            tenant_values.append(value)
+            param_count += 1
+    
+    # Update tenant if there are fields to update
+    if tenant_update_fields:
+        tenant_update_fields.append("updated_at = NOW()")
+        tenant_values.append(tenant_slug)
         
-        # Map profile fields to update
-        profile_fields = {
-            'company_name': request.company_name,
-            'industry': request.industry.value if isinstance(request.industry, Industry) else request.industry,
-            'company_address': request.company_address,
-            'website_url': request.website_url,
-            'company_size': request.company_size.value if request.company_size else None,
-            'time_zone': request.time_zone,
-            'primary_contact_name': request.primary_contact_name,
-            'primary_contact_title': request.primary_contact_title,
-            'primary_contact_email': request.primary_contact_email,
-            'primary_contact_phone': request.primary_contact_phone,
-            'primary_contact_whatsapp': request.primary_contact_whatsapp,
-            'billing_contact_name': request.billing_contact_name,
-            'billing_contact_email': request.billing_contact_email,
-            'technical_contact_name': request.technical_contact_name,
-            'technical_contact_email': request.technical_contact_email,
-            'custom_domain': request.custom_domain
-        }
+        tenant_query = f"UPDATE tenants SET {', '.join(tenant_update_fields)} WHERE slug = ${param_count}"
+        print(f"🔍 EXECUTING TENANT UPDATE:")
+        print(f"   Query: {tenant_query}")
+        print(f"   Values: {tenant_values}")
+        print(f"   Target tenant: {tenant_slug}")
         
-        # Add fields that have values
-        for field, value in profile_fields.items():
-            if value is not None:
-                tenant_update_fields.append(f"{field} = ${param_count}")
-                tenant_values.append(value)
-                param_count += 1
-        
-        # Update tenant if there are fields to update
-        if tenant_update_fields:
-            tenant_update_fields.append("updated_at = NOW()")
-            tenant_values.append(tenant_slug)
-            
-            tenant_query = f"UPDATE tenants SET {', '.join(tenant_update_fields)} WHERE slug = ${param_count}"
-            print(f"🔍 EXECUTING TENANT UPDATE:")
-            print(f"   Query: {tenant_query}")
-            print(f"   Values: {tenant_values}")
-            print(f"   Target tenant: {tenant_slug}")
+        result = await conn.execute(tenant_query, *tenant_values)
+        print(f"   Update result: {result}")
+    else:
+        print(f"⚠️ NO TENANT FIELDS TO UPDATE")
+    
+    # Update branding if provided (skip if table doesn't exist)
+    if request.brand_primary is not None or request.logo_svg is not None:
+        try:
+            # Check if branding exists
+            existing_branding = await conn.fetchrow(
+                "SELECT id FROM tenant_branding WHERE tenant_id = $1",
+                tenant_slug
+            )
             
-            result = await conn.execute(tenant_query, *tenant_values)
-            print(f"   Update result: {result}")
-        else:
-            print(f"⚠️ NO TENANT FIELDS TO UPDATE")
-        
-        # Update branding if provided (skip if table doesn't exist)
-        if request.brand_primary is not None or request.logo_svg is not None:
-            try:
-                # Check if branding exists
-                existing_branding = await conn.fetchrow(
-                    "SELECT id FROM tenant_branding WHERE tenant_id = $1",
-                    tenant_slug
-                )
+            if existing_branding:
+                # Update existing branding
+                branding_fields = []
+                branding_values = []
+                param_count = 1
                 
-                if existing_branding:
-                    # Update existing branding
-                    branding_fields = []
-                    branding_values = []
-                    param_count = 1
+                if request.brand_primary is not None:
+                    branding_fields.append(f"brand_primary = ${param_count}")
+                    branding_values.append(request.brand_primary)
+                    param_count += 1
                     
-                    if request.brand_primary is not None:
-                        branding_fields.append(f"brand_primary = ${param_count}")
-                        branding_values.append(request.brand_primary)
-                        param_count += 1
-                        
-                    if request.logo_svg is not None:
-                        branding_fields.append(f"logo_svg = ${param_count}")
-                        branding_values.append(request.logo_svg)
-                        param_count += 1
+                if request.logo_svg is not None:
+                    branding_fields.append(f"logo_svg = ${param_count}")
+                    branding_values.append(request.logo_svg)
+                    param_count += 1
+                
+                if branding_fields:
+                    branding_fields.append("updated_at = NOW()")
+                    branding_values.append(tenant_slug)
                     
-                    if branding_fields:
-                        branding_fields.append("updated_at = NOW()")
-                        branding_values.append(tenant_slug)
-                        
-                        branding_query = f"UPDATE tenant_branding SET {', '.join(branding_fields)} WHERE tenant_id = ${param_count}"
-                        await conn.execute(branding_query, *branding_values)
-                else:
-                    # Insert new branding
-                    await conn.execute(
-                        "INSERT INTO tenant_branding (tenant_id, logo_svg, brand_primary) VALUES ($1, $2, $3)",
-                        tenant_slug,
-                        request.logo_svg,
-                        request.brand_primary or "#0052cc"
-                    )
-            except Exception as e:
-                print(f"⚠️ TENANT-PROFILE UPDATE: Branding table not available, skipping branding update: {e}")
-                # Continue without branding updates if table doesn't exist
-        
-        # Return updated profile by fetching the tenant data
-        tenant_row = await conn.fetchrow(
-            """
-            SELECT id, slug, name, company_name, industry, company_address, 
-                   website_url, company_size, time_zone,
-                   primary_contact_name, primary_contact_title, primary_contact_email,
-                   primary_contact_phone, primary_contact_whatsapp,
-                   billing_contact_name, billing_contact_email,
-                   technical_contact_name, technical_contact_email, custom_domain
-            FROM tenants WHERE slug = $1
-            """,
-            tenant_slug
-        )
-        
-        if not tenant_row:
-            raise HTTPException(status_code=404, detail="Tenant not found")
-        
-        # Get branding data (skip if table doesn't exist)
-        branding_row = None
-        try:
-            branding_row = await conn.fetchrow(
-                "SELECT logo_svg, brand_primary FROM tenant_branding WHERE tenant_id = $1",
-                tenant_slug
-            )
+                    branding_query = f"UPDATE tenant_branding SET {', '.join(branding_fields)} WHERE tenant_id = ${param_count}"
+                    await conn.execute(branding_query, *branding_values)
+            else:
+                # Insert new branding
+                await conn.execute(
+                    "INSERT INTO tenant_branding (tenant_id, logo_svg, brand_primary) VALUES ($1, $2, $3)",
+                    tenant_slug,
+                    request.logo_svg,
+                    request.brand_primary or "#0052cc"
+                )
         except Exception as e:
-            print(f"⚠️ TENANT-PROFILE UPDATE: Branding table not available for fetch: {e}")
-        
-        return TenantProfileResponse(
-            tenant_id=tenant_row['slug'],
-            slug=tenant_row['slug'], 
-            name=tenant_row['name'],
-            logo_svg=branding_row['logo_svg'] if branding_row else None,
-            brand_primary=branding_row['brand_primary'] if branding_row else "#0052cc",
-            company_name=tenant_row['company_name'],
-            industry=tenant_row['industry'],
-            company_address=tenant_row['company_address'],
-            website_url=tenant_row['website_url'],
-            company_size=tenant_row['company_size'],
-            time_zone=tenant_row['time_zone'],
-            primary_contact_name=tenant_row['primary_contact_name'],
-            primary_contact_title=tenant_row['primary_contact_title'],
-            primary_contact_email=tenant_row['primary_contact_email'],
-            primary_contact_phone=tenant_row['primary_contact_phone'],
-            primary_contact_whatsapp=tenant_row['primary_contact_whatsapp'],
-            billing_contact_name=tenant_row['billing_contact_name'],
-            billing_contact_email=tenant_row['billing_contact_email'],
-            technical_contact_name=tenant_row['technical_contact_name'],
-            technical_contact_email=tenant_row['technical_contact_email'],
-            custom_domain=tenant_row['custom_domain']
+            print(f"⚠️ TENANT-PROFILE UPDATE: Branding table not available, skipping branding update: {e}")
+            # Continue without branding updates if table doesn't exist
+    
+    # Return updated profile by fetching the tenant data
+    tenant_row = await conn.fetchrow(
+        """
+        SELECT id, slug, name, company_name, industry, company_address, 
+               website_url, company_size, time_zone,
+               primary_contact_name, primary_contact_title, primary_contact_email,
+               primary_contact_phone, primary_contact_whatsapp,
+               billing_contact_name, billing_contact_email,
+               technical_contact_name, technical_contact_email, custom_domain
+        FROM tenants WHERE slug = $1
+        """,
+        tenant_slug
+    )
+    
+    if not tenant_row:
+        raise HTTPException(status_code=404, detail="Tenant not found")
+    
+    # Get branding data (skip if table doesn't exist)
+    branding_row = None
+    try:
+        branding_row = await conn.fetchrow(
+            "SELECT logo_svg, brand_primary FROM tenant_branding WHERE tenant_id = $1",
+            tenant_slug
         )
-    finally:
-        await conn.close()
+    except Exception as e:
+        print(f"⚠️ TENANT-PROFILE UPDATE: Branding table not available for fetch: {e}")
+    
+    return TenantProfileResponse(
+        tenant_id=tenant_row['slug'],
+        slug=tenant_row['slug'], 
+        name=tenant_row['name'],
+        logo_svg=branding_row['logo_svg'] if branding_row else None,
+        brand_primary=branding_row['brand_primary'] if branding_row else "#0052cc",
+        company_name=tenant_row['company_name'],
+        industry=tenant_row['industry'],
+        company_address=tenant_row['company_address'],
+        website_url=tenant_row['website_url'],
+        company_size=tenant_row['company_size'],
+        time_zone=tenant_row['time_zone'],
+        primary_contact_name=tenant_row['primary_contact_name'],
+        primary_contact_title=tenant_row['primary_contact_title'],
+        primary_contact_email=tenant_row['primary_contact_email'],
+        primary_contact_phone=tenant_row['primary_contact_phone'],
+        primary_contact_whatsapp=tenant_row['primary_contact_whatsapp'],
+        billing_contact_name=tenant_row['billing_contact_name'],
+        billing_contact_email=tenant_row['billing_contact_email'],
+        technical_contact_name=tenant_row['technical_contact_name'],
+        technical_contact_email=tenant_row['technical_contact_email'],
+        custom_domain=tenant_row['custom_domain']
+    )
 
 @router.get("/branding")
-async def get_branding_settings(tenant_user: TenantAuthorizedUser = TenantUserDep) -> BrandingResponse:
+async def get_branding_settings(tenant_user: TenantAuthorizedUser = TenantUserDep, db: RequestDB = RequestDBDep) -> BrandingResponse:
     """Get branding settings for the authenticated user's tenant"""
     
-    conn = await get_db_connection()
-    try:
-        # Get existing branding settings for the authenticated user's tenant
-        row = await conn.fetchrow(
-            "SELECT tenant_id, logo_svg, brand_primary FROM tenant_branding WHERE tenant_id = $1",
-            tenant_user.tenant_slug
+    conn = await db.connection()
+    # Get existing branding settings for the authenticated user's tenant
+    row = await conn.fetchrow(
+        "SELECT tenant_id, logo_svg, brand_primary FROM tenant_branding WHERE tenant_id = $1",
+        tenant_user.tenant_slug
+    )
+    
+    if row:
+        return BrandingResponse(
+            tenant_id=row['tenant_id'],
+            logo_svg=row['logo_svg'],
+            brand_primary=row['brand_primary']
+        )
+    else:
+        # Return default settings
+        return BrandingResponse(
+            tenant_id=tenant_user.tenant_slug,
+            logo_svg=None,
+            brand_primary="#0052cc"
         )
-        
-        if row:
-            return BrandingResponse(
-                tenant_id=row['tenant_id'],
-                logo_svg=row['logo_svg'],
-                brand_primary=row['brand_primary']
-            )
-        else:
-            # Return default settings
-            return BrandingResponse(
-                tenant_id=tenant_user.tenant_slug,
-                logo_svg=None,
-                brand_primary="#0052cc"
-            )
-    finally:
-        await conn.close()
 
 @router.put("/branding")
-async def update_branding_settings(request: BrandingUpdateRequest, tenant_user: TenantAuthorizedUser = TenantUserDep) -> BrandingResponse:
+async def update_branding_settings(request: BrandingUpdateRequest, tenant_user: TenantAuthorizedUser = TenantUserDep, db: RequestDB = RequestDBDep) -> BrandingResponse:
     """Update branding settings for the authenticated user's tenant"""
     
-    conn = await get_db_connection()
-    try:
-        # Check if branding settings exist for the authenticated user's tenant
-        existing = await conn.fetchrow(
-            "SELECT id FROM tenant_branding WHERE tenant_id = $1",
-            tenant_user.tenant_slug
-        )
+    conn = await db.connection()
+    # Check if branding settings exist for the authenticated user's tenant
+    existing = await conn.fetchrow(
+        "SELECT id FROM tenant_branding WHERE tenant_id = $1",
+        tenant_user.tenant_slug
+    )
+    
+    if existing:
+        # Update existing settings
+        update_fields = []
+        values = []
+        param_count = 1
         
-        if existing:
-            # Update existing settings
-            update_fields = []
-            values = []
-            param_count = 1
+        if request.brand_primary is not None:
+            update_fields.append(f"brand_primary = ${param_count}")
+            values.append(request.brand_primary)
+            param_count += 1
             
-            if request.brand_primary is not None:
-                update_fields.append(f"brand_primary = ${param_count}")
-                values.append(request.brand_primary)
-                param_count += 1
-                
-            if request.logo_svg is not None:
-                update_fields.append(f"logo_svg = ${param_count}")
-                values.append(request.logo_svg)
-                param_count += 1
+        if request.logo_svg is not None:
+            update_fields.append(f"logo_svg = ${param_count}")
+            values.append(request.logo_svg)
+            param_count += 1
+        
+        if update_fields:
+            update_fields.append("updated_at = NOW()")
+            values.append(tenant_user.tenant_slug)
             
-            if update_fields:
-                update_fields.append("updated_at = NOW()")
-                values.append(tenant_user.tenant_slug)
-                
-                query = f"UPDATE tenant_branding SET {', '.join(update_fields)} WHERE tenant_id = ${param_count} RETURNING tenant_id, logo_svg, brand_primary"
-                row = await conn.fetchrow(query, *values)
-            else:
-                # No fields to update, just return existing
-                row = await conn.fetchrow(
-                    "SELECT tenant_id, logo_svg, brand_primary FROM tenant_branding WHERE tenant_id = $1",
-                    tenant_user.tenant_slug
-                )
+            query = f"UPDATE tenant_branding SET {', '.join(update_fields)} WHERE tenant_id = ${param_count} RETURNING tenant_id, logo_svg, brand_primary"
+            row = await conn.fetchrow(query, *values)
         else:
-            # Insert new settings
+            # No fields to update, just return existing
             row = await conn.fetchrow(
-                "INSERT INTO tenant_branding (tenant_id, logo_svg, brand_primary) VALUES ($1, $2, $3) RETURNING tenant_id, logo_svg, brand_primary",
-                tenant_user.tenant_slug,
-                request.logo_svg,
-                request.brand_primary or "#0052cc"
+                "SELECT tenant_id, logo_svg, brand_primary FROM tenant_branding WHERE tenant_id = $1",
+                tenant_user.tenant_slug
             )
-        
-        return BrandingResponse(
-            tenant_id=row['tenant_id'],
-            logo_svg=row['logo_svg'],
-            brand_primary=row['brand_primary']
+    else:
+        # Insert new settings
+        row = await conn.fetchrow(
+            "INSERT INTO tenant_branding (tenant_id, logo_svg, brand_primary) VALUES ($1, $2, $3) RETURNING tenant_id, logo_svg, brand_primary",
+            tenant_user.tenant_slug,
+            request.logo_svg,
+            request.brand_primary or "#0052cc"
         )
-    finally:
-        await conn.close()
+    
+    return BrandingResponse(
+        tenant_id=row['tenant_id'],
+        logo_svg=row['logo_svg'],
+        brand_primary=row['brand_primary']
+    )
 
 @router.post("/branding/upload-logo")
-async def upload_logo(tenant_user: TenantAuthorizedUser = TenantUserDep, file: UploadFile = File(...)) -> dict:
+async def upload_logo(tenant_user: TenantAuthorizedUser = TenantUserDep, db: RequestDB = RequestDBDep, file: UploadFile = File(...)) -> dict:
     """Upload SVG logo for the authenticated user's tenant"""
     
     if not MULTIPART_AVAILABLE:
@@ -509,26 +497,23 @@ async def upload_logo(tenant_user: TenantAuthorizedUser = TenantUserDep, file: U
     
     # Update branding with new logo
     update_request = BrandingUpdateRequest(logo_svg=svg_content)
-    result = await update_branding_settings(update_request, tenant_user)
+    result = await update_branding_settings(update_request, tenant_user, db)
     
     return {"message": "Logo uploaded successfully", "branding": result}
 
 @router.delete("/branding/reset")
-async def reset_branding_settings(tenant_user: TenantAuthorizedUser = TenantUserDep) -> BrandingResponse:
+async def reset_branding_settings(tenant_user: TenantAuthorizedUser = TenantUserDep, db: RequestDB = RequestDBDep) -> BrandingResponse:
     """Reset branding settings to defaults for the authenticated user's tenant"""
     
-    conn = await get_db_connection()
-    try:
-        # Reset to defaults for the authenticated user's tenant
-        row = await conn.fetchrow(
-            "INSERT INTO tenant_branding (tenant_id, logo_svg, brand_primary) VALUES ($1, NULL, '#0052cc') ON CONFLICT (tenant_id) DO UPDATE SET logo_svg = NULL, brand_primary = '#0052cc', updated_at = NOW() RETURNING tenant_id, logo_svg, brand_primary",
-            tenant_user.tenant_slug
-        )
-        
-        return BrandingResponse(
-            tenant_id=row['tenant_id'],
-            logo_svg=row['logo_svg'],
-            brand_primary=row['brand_primary']
-        )
-    finally:
-        await conn.close()
+    conn = await db.connection()
+    # Reset to defaults for the authenticated user's tenant
+    row = await conn.fetchrow(
+        "INSERT INTO tenant_branding (tenant_id, logo_svg, brand_primary) VALUES ($1, NULL, '#0052cc') ON CONFLICT (tenant_id) DO UPDATE SET logo_svg = NULL, brand_primary = '#0052cc', updated_at = NOW() RETURNING tenant_id, logo_svg, brand_primary",
+        tenant_user.tenant_slug
+    )
+    
+    return BrandingResponse(
+        tenant_id=row['tenant_id'],
+        logo_svg=row['logo_svg'],
+        brand_primary=row['brand_primary']
+    )
@@ -1,5 +1,5 @@
 
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Depends
 from pydantic import BaseModel, Field
 from typing import Optional, List, Dict, Any
 from datetime import datetime, timezone, timedelta
@@ -12,6 +12,10 @@ import requests
 import os
 from app.auth import AuthorizedUser
 from app.libs.tenant_auth import TenantAuthorizedUser, TenantUserDep
+from app.libs.backend_auth import require_backend_token
+from app.libs.contact_tiers import contact_tiers
+from app.libs.n8n_health import ensure_n8n_available, tenant_n8n_url
+from app.libs.request_db import RequestDB, RequestDBDep
 
 router = APIRouter()
 
@@ -20,6 +24,7 @@ MAX_MSG_CHARS = 200
 RECENT_MESSAGES_LIMIT = 10
 CACHE_TTL_SECONDS = 60
 DEFAULT_SLA_SECONDS = 900
+DEFAULT_HOT_TTL_DAYS = 30
 
 class ContactInfo(BaseModel):
     """Contact information model"""
@@ -112,14 +117,14 @@ async def get_context_envelope(
         if tenant_id.isdigit():
             # Legacy integer tenant_id
             tenant_query = """
-                SELECT id, slug FROM tenants 
+                SELECT id, slug, hot_ttl_days FROM tenants 
                 WHERE id = $1 AND status = 'active'
             """
             tenant_result = await conn.fetchrow(tenant_query, int(tenant_id))
         else:
             # String tenant_slug
             tenant_query = """
-                SELECT id, slug FROM tenants 
+                SELECT id, slug, hot_ttl_days FROM tenants 
                 WHERE slug = $1 AND status = 'active'
             """
             tenant_result = await conn.fetchrow(tenant_query, tenant_id)
@@ -192,7 +197,10 @@ async def get_context_envelope(
         # 5. Get conversation history (only if we have a contact_id)
         if actual_contact_id:
             try:
-                messages = await get_recent_messages(conn, tenant_int_id, actual_contact_id)
+                messages = await get_recent_messages(
+                    conn, tenant_int_id, actual_contact_id,
+                    tenant_result['hot_ttl_days'] or DEFAULT_HOT_TTL_DAYS
+                )
                 envelope.conversation_history = ConversationHistory(
                     recent_messages=messages,
                     summary=""  # Empty in MVP
@@ -231,68 +239,28 @@ async def resolve_contact(
     contact_id: Optional[str], 
     whatsapp: Optional[str]
 ) -> Optional[Dict[str, Any]]:
-    """Resolve contact using cache -> archive -> stub policy"""
-    
-    if contact_id:
-        # Look up by contact_id in cache first
-        query = """
-            SELECT contact_id, whatsapp_number, full_name, metadata
-            FROM contacts_cache 
-            WHERE tenant_id = $1 AND contact_id = $2
-        """
-        result = await conn.fetchrow(query, tenant_id, UUID(contact_id))
-        if result:
-            return dict(result)
-        
-        # Fallback to archive
-        query = """
-            SELECT contact_id, whatsapp_number, full_name, metadata
-            FROM contacts_archive 
-            WHERE tenant_id = $1 AND contact_id = $2
-        """
-        result = await conn.fetchrow(query, tenant_id, UUID(contact_id))
-        if result:
-            return dict(result)
-    
-    elif whatsapp:
-        # Look up by whatsapp in cache first
-        query = """
-            SELECT contact_id, whatsapp_number, full_name, metadata
-            FROM contacts_cache 
-            WHERE tenant_id = $1 AND whatsapp_number = $2
-        """
-        result = await conn.fetchrow(query, tenant_id, whatsapp)
-        if result:
-            return dict(result)
-        
-        # Fallback to archive
-        query = """
-            SELECT contact_id, whatsapp_number, full_name, metadata
-            FROM contacts_archive 
-            WHERE tenant_id = $1 AND whatsapp_number = $2
-        """
-        result = await conn.fetchrow(query, tenant_id, whatsapp)
-        if result:
-            return dict(result)
-    
-    return None
+    """Resolve contact using cache -> archive -> stub policy (archived contacts are promoted)"""
+    return await contact_tiers.resolve(conn, tenant_id, contact_id=contact_id, whatsapp=whatsapp)
 
 async def get_recent_messages(
     conn: asyncpg.Connection, 
     tenant_id: int, 
-    contact_id: UUID
+    contact_id: UUID,
+    ttl_days: int = DEFAULT_HOT_TTL_DAYS
 ) -> List[MessageInfo]:
     """Get recent messages for contact"""
     
+    # Bounded by the tenant's retention window so only the live monthly partitions are scanned
     query = """
         SELECT message_content, direction, message_timestamp
         FROM messages_archive 
         WHERE tenant_id = $1 AND contact_id = $2
+        AND message_timestamp >= NOW() - make_interval(days => $4)
         ORDER BY message_timestamp DESC
         LIMIT $3
     """
     
-    results = await conn.fetch(query, tenant_id, contact_id, RECENT_MESSAGES_LIMIT)
+    results = await conn.fetch(query, tenant_id, contact_id, RECENT_MESSAGES_LIMIT, ttl_days)
     
     messages = []
     for row in results:
@@ -385,7 +353,8 @@ class AddPasteResponse(BaseModel):
 @router.post("/add-paste")
 async def add_paste(
     request: AddPasteRequest, 
-    tenant_user: TenantAuthorizedUser = TenantUserDep
+    tenant_user: TenantAuthorizedUser = TenantUserDep,
+    db: RequestDB = RequestDBDep
 ) -> AddPasteResponse:
     """
     Add paste content and forward to tenant's n8n webhook for ingestion.
@@ -405,9 +374,16 @@ async def add_paste(
         
         # Use the authenticated user's tenant slug
         tenant_slug = tenant_user.tenant_slug
+
+        # Fail fast instead of waiting out the timeout when the tenant's n8n is known to be down
+        ensure_n8n_available(tenant_slug)
         
-        # Construct the n8n webhook URL
-        webhook_url = f"https://{tenant_slug}.n8n.flomastr.com/webhook/context/add-paste"
+        # Construct the n8n webhook URL (same instance the health probe checks)
+        conn = await db.connection()
+        n8n_url = await conn.fetchval("SELECT n8n_url FROM tenants WHERE id = $1", tenant_user.tenant_id)
+        webhook_url = f"{tenant_n8n_url(tenant_slug, n8n_url)}/webhook/context/add-paste"
+        # Do not hold a database connection through the webhook call
+        await db.close()
         
         # Prepare the payload to send to n8n
         payload = {
@@ -449,6 +425,8 @@ async def add_paste(
                 detail=f"Failed to send content to processing service: {response.status_code}"
             )
             
+    except HTTPException:
+        raise
     except requests.exceptions.RequestException as e:
         print(f"Network error calling n8n webhook: {str(e)}")
         raise HTTPException(
@@ -461,3 +439,10 @@ async def add_paste(
             status_code=500,
             detail=f"Internal server error: {str(e)}"
         )
+
+@router.get("/contacts/tier-stats")
+async def contact_tier_stats(
+    _: str = Depends(require_backend_token)
+) -> Dict[str, Any]:
+    """Hit/miss counters for the hot (contacts_cache) and cold (contacts_archive) tiers"""
+    return contact_tiers.stats()
@@ -13,6 +13,7 @@ from uuid import UUID, uuid4
 
 # Import centralized database connection
 from app.libs.db_connection import get_db_connection
+from app.libs.contact_tiers import contact_tiers
 
 router = APIRouter()
 
@@ -78,10 +79,8 @@ async def ingest_message(request: MessageIngestRequest):
             
             tenant_id = tenant_record['id']
             
-            # Step 2: Contact Management - Check if contact exists in Hot storage
-            contact_query = """SELECT contact_id FROM contacts_cache 
-                             WHERE tenant_id = $1 AND whatsapp_number = $2"""
-            contact_record = await conn.fetchrow(contact_query, tenant_id, request.contact_number)
+            # Step 2: Contact Management - Hot storage first, archived contacts are promoted back
+            contact_record = await contact_tiers.resolve(conn, tenant_id, whatsapp=request.contact_number)
             
             contact_id = None
             created_contact = False
@@ -138,41 +137,22 @@ async def ingest_message(request: MessageIngestRequest):
                 message_id, tenant_id, contact_id, request.message_content
             )
             
-            # Step 4: Work Queue Management - Check if thread exists
-            thread_query = """SELECT thread_id FROM inbox_threads 
-                             WHERE tenant_id = $1 AND contact_id = $2"""
-            thread_record = await conn.fetchrow(thread_query, tenant_id, contact_id)
-            
-            thread_id = None
-            created_thread = False
-            
-            if thread_record:
-                thread_id = thread_record['thread_id']
-                
-                # Update existing thread
-                await conn.execute(
-                    """UPDATE inbox_threads 
-                       SET last_message_summary = $3, 
-                           last_message_timestamp = CURRENT_TIMESTAMP,
-                           contact_name = $4
-                       WHERE thread_id = $1 AND tenant_id = $2""",
-                    thread_id, tenant_id, 
-                    request.message_content[:200] + "..." if len(request.message_content) > 200 else request.message_content,
-                    request.contact_name
-                )
-            else:
-                # Create new thread in work queue
-                thread_id = uuid4()
-                created_thread = True
-                
-                await conn.execute(
-                    """INSERT INTO inbox_threads 
-                       (thread_id, tenant_id, contact_id, contact_name, 
-                        last_message_summary, last_message_timestamp, status)
-                       VALUES ($1, $2, $3, $4, $5, CURRENT_TIMESTAMP, 'new')""",
-                    thread_id, tenant_id, contact_id, request.contact_name,
-                    request.message_content[:200] + "..." if len(request.message_content) > 200 else request.message_content
-                )
+            # Step 4: Work Queue Management - one upsert on (tenant_id, contact_id)
+            summary = request.message_content[:200] + "..." if len(request.message_content) > 200 else request.message_content
+            thread_record = await conn.fetchrow(
+                """INSERT INTO inbox_threads 
+                   (thread_id, tenant_id, contact_id, contact_name, 
+                    last_message_summary, last_message_timestamp, status)
+                   VALUES ($1, $2, $3, $4, $5, CURRENT_TIMESTAMP, 'new')
+                   ON CONFLICT (tenant_id, contact_id) DO UPDATE SET
+                       last_message_summary = EXCLUDED.last_message_summary,
+                       last_message_timestamp = EXCLUDED.last_message_timestamp,
+                       contact_name = EXCLUDED.contact_name
+                   RETURNING thread_id, (xmax = 0) AS inserted""",
+                uuid4(), tenant_id, contact_id, request.contact_name, summary
+            )
+            thread_id = thread_record['thread_id']
+            created_thread = thread_record['inserted']
             
             print(f"Successfully ingested message from {request.contact_number} for tenant {tenant_id}")
             
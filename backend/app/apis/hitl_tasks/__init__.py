@@ -10,7 +10,7 @@ import json
 import asyncpg
 from app.auth import AuthorizedUser
 from app.libs.tenant_auth import TenantAuthorizedUser, TenantUserDep, TenantUserByEmailDep
-from app.libs.db_connection import get_db_connection
+from app.libs.request_db import RequestDB, RequestDBDep
 
 router = APIRouter()
 
@@ -90,20 +90,17 @@ class ResolveTaskResponse(BaseModel):
 
 
 @router.get("/tasks")
-async def get_hitl_tasks_legacy(tenant_user: TenantAuthorizedUser = TenantUserByEmailDep):
+async def get_hitl_tasks_legacy(tenant_user: TenantAuthorizedUser = TenantUserByEmailDep, db: RequestDB = RequestDBDep):
     """Legacy endpoint for HITL tasks"""
-    conn = await get_db_connection()
-    try:
-        query = """
-            SELECT task_id::text as task_id, title, description, status, created_at
-            FROM active_hitl_tasks
-            WHERE tenant_id = $1
-            ORDER BY created_at DESC;
-        """
-        records = await conn.fetch(query, tenant_user.tenant_id)
-        return [HitlTask(**record) for record in records]
-    finally:
-        await conn.close()
+    conn = await db.connection()
+    query = """
+        SELECT task_id::text as task_id, title, description, status, created_at
+        FROM active_hitl_tasks
+        WHERE tenant_id = $1
+        ORDER BY created_at DESC;
+    """
+    records = await conn.fetch(query, tenant_user.tenant_id)
+    return [HitlTask(**record) for record in records]
 
 
 @router.get(
@@ -112,19 +109,16 @@ async def get_hitl_tasks_legacy(tenant_user: TenantAuthorizedUser = TenantUserBy
     summary="Get Active HITL Tasks",
     description="Retrieves active HITL tasks for the authenticated tenant, sorted by creation date.",
 )
-async def get_hitl_tasks(tenant_user: TenantAuthorizedUser = TenantUserByEmailDep):
-    conn = await get_db_connection()
-    try:
-        query = """
-            SELECT task_id::text as task_id, title, description, status, created_at
-            FROM active_hitl_tasks
-            WHERE tenant_id = $1
-            ORDER BY created_at DESC;
-        """
-        records = await conn.fetch(query, tenant_user.tenant_id)
-        return [HitlTask(**record) for record in records]
-    finally:
-        await conn.close()
+async def get_hitl_tasks(tenant_user: TenantAuthorizedUser = TenantUserByEmailDep, db: RequestDB = RequestDBDep):
+    conn = await db.connection()
+    query = """
+        SELECT task_id::text as task_id, title, description, status, created_at
+        FROM active_hitl_tasks
+        WHERE tenant_id = $1
+        ORDER BY created_at DESC;
+    """
+    records = await conn.fetch(query, tenant_user.tenant_id)
+    return [HitlTask(**record) for record in records]
 
 
 @router.get(
@@ -133,52 +127,49 @@ async def get_hitl_tasks(tenant_user: TenantAuthorizedUser = TenantUserByEmailDe
     summary="Get HITL Task Details",
     description="Retrieves detailed information for a specific HITL task by task_id.",
 )
-async def get_hitl_task_detail(task_id: str, tenant_user: TenantAuthorizedUser = TenantUserDep):
-    conn = await get_db_connection()
-    try:
-        query = """
-            SELECT task_id, tenant_id, title, description, status, 
-                   payload_components, created_at, assigned_to
-            FROM active_hitl_tasks
-            WHERE task_id = $1 AND tenant_id = $2;
-        """
-        
-        record = await conn.fetchrow(query, UUID(task_id), tenant_user.tenant_id)
-        
-        if not record:
-            raise HTTPException(status_code=404, detail="Task not found")
-        
-        # Parse payload_components
-        payload_components = None
-        if record['payload_components']:
-            if isinstance(record['payload_components'], str):
-                payload_data = json.loads(record['payload_components'])
-            else:
-                payload_data = record['payload_components']
-            
-            # Transform old format to new format before validation
-            transformed_data = transform_payload_components(payload_data)
-            payload_components = PayloadComponents(**transformed_data)
+async def get_hitl_task_detail(task_id: str, tenant_user: TenantAuthorizedUser = TenantUserDep, db: RequestDB = RequestDBDep):
+    conn = await db.connection()
+    query = """
+        SELECT task_id, tenant_id, title, description, status, 
+               payload_components, created_at, assigned_to
+        FROM active_hitl_tasks
+        WHERE task_id = $1 AND tenant_id = $2;
+    """
+    
+    record = await conn.fetchrow(query, UUID(task_id), tenant_user.tenant_id)
+    
+    if not record:
+        raise HTTPException(status_code=404, detail="Task not found")
+    
+    # Parse payload_components
+    payload_components = None
+    if record['payload_components']:
+        if isinstance(record['payload_components'], str):
+            payload_data = json.loads(record['payload_components'])
+        else:
+            payload_data = record['payload_components']
         
-        return HitlTaskDetail(
-            task_id=str(record['task_id']),
-            tenant_id=record['tenant_id'],
-            title=record['title'],
-            description=record['description'],
-            status=record['status'],
-            payload_components=payload_components,
-            created_at=record['created_at'],
-            assigned_to=record['assigned_to']
-        )
-    finally:
-        await conn.close()
+        # Transform old format to new format before validation
+        transformed_data = transform_payload_components(payload_data)
+        payload_components = PayloadComponents(**transformed_data)
+    
+    return HitlTaskDetail(
+        task_id=str(record['task_id']),
+        tenant_id=record['tenant_id'],
+        title=record['title'],
+        description=record['description'],
+        status=record['status'],
+        payload_components=payload_components,
+        created_at=record['created_at'],
+        assigned_to=record['assigned_to']
+    )
 
 
 @router.post(
     "/api/v1/tasks",
     status_code=201,
 )
-async def create_hitl_task(task: HitlTaskCreate, tenant_user: TenantAuthorizedUser = TenantUserDep):
+async def create_hitl_task(task: HitlTaskCreate, tenant_user: TenantAuthorizedUser = TenantUserDep, db: RequestDB = RequestDBDep):
     """
     Creates a new Human-in-the-Loop task.
     Validates that the task tenant_id matches the authenticated user's tenant.
@@ -190,7 +181,7 @@ async def create_hitl_task(task: HitlTaskCreate, tenant_user: TenantAuthorizedUs
             detail="Cannot create task for a different tenant"
         )
     
-    conn = await get_db_connection()
+    conn = await db.connection()
     try:
         query = """
             INSERT INTO active_hitl_tasks (tenant_id, title, description, payload_components)
@@ -214,8 +205,6 @@ async def create_hitl_task(task: HitlTaskCreate, tenant_user: TenantAuthorizedUs
         # Log the error for debugging
         print(f"Error creating HITL task: {e}")
         raise HTTPException(status_code=500, detail="Failed to create task.") from None
-    finally:
-        await conn.close()
 
 @router.post(
     "/api/v1/tasks/{task_id}/resolve",
@@ -226,13 +215,14 @@ async def create_hitl_task(task: HitlTaskCreate, tenant_user: TenantAuthorizedUs
 async def resolve_hitl_task(
     task_id: str, 
     request: ResolveTaskRequest,
-    tenant_user: TenantAuthorizedUser = TenantUserDep
+    tenant_user: TenantAuthorizedUser = TenantUserDep,
+    db: RequestDB = RequestDBDep
 ):
     """
     Resolve a HITL task by updating its status and storing feedback.
     Only allows resolving tasks that belong to the authenticated user's tenant.
     """
-    conn = await get_db_connection()
+    conn = await db.connection()
     try:
         # Map actions to status
         status_map = {
@@ -305,5 +295,3 @@ async def resolve_hitl_task(
             status_code=500,
             detail="Failed to resolve task"
         ) from None
-    finally:
-        await conn.close()
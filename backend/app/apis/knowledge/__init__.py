@@ -1,17 +1,40 @@
 
-from fastapi import APIRouter, HTTPException, Request, Query, Depends
+from fastapi import APIRouter, HTTPException, Request, Response, Query, Depends, UploadFile, File, Form
 from pydantic import BaseModel
 from typing import Optional, List
+import asyncio
 import asyncpg
+import base64
+import hashlib
+import json
+import os
+import shutil
+import tempfile
 import uuid
+import zipfile
 from datetime import datetime
 from app.auth import AuthorizedUser
 from app.libs.backend_auth import require_backend_token
 from app.libs.tenant_auth import TenantAuthorizedUser, TenantUserDep
-from app.libs.db_connection import get_db_connection
+from app.libs.request_db import RequestDB, RequestDBDep
+from app.libs.knowledge_ingestion import upsert_document
+from app.libs.knowledge_import import (
+    KNOWLEDGE_IMPORT_MAX_DOCUMENTS,
+    TERMINAL_JOB_STATUSES,
+    ImportSource,
+    create_import_job,
+    is_supported,
+    list_zip_sources,
+    request_import_cancel,
+    start_import_job,
+)
+from app.libs.pdf_extraction import spool_upload
+from app.libs.synthesis import SynthesisUnavailableError
 
 router = APIRouter()
 
+IMPORT_ARCHIVE_MAX_BYTES = int(os.getenv("IMPORT_ARCHIVE_MAX_BYTES", str(1024 * 1024 * 1024)))
+
 class KnowledgeItem(BaseModel):
     id: str
     title: str
@@ -31,6 +54,7 @@ class KnowledgeIndexItem(BaseModel):
 class KnowledgeIndexResponse(BaseModel):
     entries: List[dict]
     total_count: int
+    next_cursor: Optional[str] = None
 
 class UpsertKnowledgeRequest(BaseModel):
     title: str
@@ -40,6 +64,12 @@ class UpsertKnowledgeRequest(BaseModel):
 class UpsertKnowledgeResponse(BaseModel):
     id: str
     status: str
+    content_hash: Optional[str] = None
+    chunks_total: Optional[int] = None
+    chunks_added: Optional[int] = None
+    chunks_removed: Optional[int] = None
+    chunks_unchanged: Optional[int] = None
+    embedding_calls: Optional[int] = None
 
 class IndexUpsertRequest(BaseModel):
     id: str
@@ -57,106 +87,359 @@ async def knowledge_health():
     """Health check for knowledge service"""
     return {"status": "healthy", "service": "knowledge"}
 
+def encode_index_cursor(updated_at: datetime, entry_id) -> str:
+    """Opaque keyset cursor over (updated_at, id)"""
+    raw = json.dumps([updated_at.isoformat(), str(entry_id)])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_index_cursor(cursor: str):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        updated_at, entry_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(updated_at), uuid.UUID(entry_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
 @router.get("/{tenant_slug}/index")
 async def get_knowledge_index(
-    tenant_user: TenantAuthorizedUser = TenantUserDep
+    request: Request,
+    response: Response,
+    limit: int = Query(50, ge=1, le=200, description="Page size"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    include_content: bool = Query(False, description="Include description and source_metadata"),
+    tenant_user: TenantAuthorizedUser = TenantUserDep,
+    db: RequestDB = RequestDBDep
 ) -> KnowledgeIndexResponse:
-    """Get knowledge index for a tenant"""
-    conn = None
+    """
+    Get knowledge index for a tenant, newest first, with keyset pagination.
+    Responses carry an ETag over (count, max(updated_at)); If-None-Match is answered with 304.
+    """
     try:
-        conn = await get_db_connection()
+        conn = await db.connection()
+        
+        # Cheap change detector, served from the (tenant_id, updated_at, id) index
+        summary = await conn.fetchrow(
+            "SELECT COUNT(*) AS total, MAX(updated_at) AS last_updated FROM knowledge_bases WHERE tenant_id = $1",
+            tenant_user.tenant_id
+        )
+        last_updated = summary["last_updated"].isoformat() if summary["last_updated"] else ""
+        etag_source = f"{summary['total']}|{last_updated}|{cursor or ''}|{limit}|{int(include_content)}"
+        etag = f'W/"{hashlib.sha1(etag_source.encode()).hexdigest()}"'
+        
+        if request.headers.get("If-None-Match") == etag:
+            return Response(status_code=304, headers={"ETag": etag})
+        
+        content_columns = "kb.description, kb.source_metadata," if include_content else ""
+        params = [tenant_user.tenant_id, limit + 1]
+        cursor_clause = ""
+        if cursor:
+            cursor_updated_at, cursor_id = decode_index_cursor(cursor)
+            cursor_clause = "AND (kb.updated_at, kb.id) < ($3, $4)"
+            params.extend([cursor_updated_at, cursor_id])
         
-        # Query knowledge bases for this tenant with chunk counts
-        query = """
+        query = f"""
             SELECT 
                 kb.id, 
                 kb.name, 
-                kb.description, 
+                {content_columns}
                 kb.source_type,
-                kb.source_metadata, 
                 kb.document_count,
                 kb.total_chunks,
                 kb.created_at, 
                 kb.updated_at
             FROM knowledge_bases kb
-            WHERE kb.tenant_id = $1
-            ORDER BY kb.updated_at DESC
+            WHERE kb.tenant_id = $1 {cursor_clause}
+            ORDER BY kb.updated_at DESC, kb.id DESC
+            LIMIT $2
         """
         
-        rows = await conn.fetch(query, tenant_user.tenant_id)
+        rows = await conn.fetch(query, *params)
+        has_more = len(rows) > limit
+        rows = rows[:limit]
         
         entries = []
         for row in rows:
-            entries.append({
+            metadata = {
+                "source_type": row["source_type"],
+                "document_count": row["document_count"] or 0,
+                "total_chunks": row["total_chunks"] or 0
+            }
+            entry = {
                 "id": str(row["id"]),
                 "title": row["name"],
-                "content": row["description"] or "",
-                "metadata": {
-                    "source_type": row["source_type"],
-                    "source_metadata": row["source_metadata"] or {},
-                    "document_count": row["document_count"] or 0,
-                    "total_chunks": row["total_chunks"] or 0
-                },
+                "metadata": metadata,
                 "created_at": row["created_at"].isoformat() if row["created_at"] else None,
                 "updated_at": row["updated_at"].isoformat() if row["updated_at"] else None
-            })
+            }
+            if include_content:
+                entry["content"] = row["description"] or ""
+                metadata["source_metadata"] = row["source_metadata"] or {}
+            entries.append(entry)
         
+        next_cursor = None
+        if has_more and rows[-1]["updated_at"]:
+            next_cursor = encode_index_cursor(rows[-1]["updated_at"], rows[-1]["id"])
+        
+        response.headers["ETag"] = etag
         return KnowledgeIndexResponse(
             entries=entries,
-            total_count=len(entries)
+            total_count=summary["total"],
+            next_cursor=next_cursor
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error getting knowledge index: {e}")
         raise HTTPException(status_code=500, detail="Failed to get knowledge index")
-    finally:
-        if conn:
-            await conn.close()
 
 @router.post("/{tenant_slug}/index")
 async def upsert_knowledge_index(
     request: UpsertKnowledgeRequest,
-    tenant_user: TenantAuthorizedUser = TenantUserDep
+    tenant_user: TenantAuthorizedUser = TenantUserDep,
+    db: RequestDB = RequestDBDep
 ) -> UpsertKnowledgeResponse:
-    """Upsert knowledge base for a tenant"""
-    conn = None
+    """
+    Upsert knowledge base for a tenant.
+    Content is chunked and diffed against the stored chunks; only changed chunks are re-embedded.
+    """
     try:
-        conn = await get_db_connection()
-        
-        entry_id = uuid.uuid4()
-        now = datetime.utcnow()
-        
-        # Insert or update knowledge base
-        query = """
-            INSERT INTO knowledge_bases (id, tenant_id, name, description, source_metadata, created_at, updated_at)
-            VALUES ($1, $2, $3, $4, $5, $6, $7)
-            ON CONFLICT (tenant_id, name) 
-            DO UPDATE SET 
-                description = EXCLUDED.description,
-                source_metadata = EXCLUDED.source_metadata,
-                updated_at = EXCLUDED.updated_at
-            RETURNING id
-        """
+        conn = await db.connection()
         
-        result = await conn.fetchrow(
-            query,
-            entry_id,
+        result = await upsert_document(
+            conn,
             tenant_user.tenant_id,
             request.title,
             request.content,
-            request.metadata or {},
-            now,
-            now
+            request.metadata
         )
         
-        return UpsertKnowledgeResponse(
-            id=str(result["id"]),
-            status="success"
-        )
+        return UpsertKnowledgeResponse(**{**result, "id": str(result["id"])})
         
+    except SynthesisUnavailableError as e:
+        raise HTTPException(status_code=503, detail=f"Embedding service unavailable: {str(e)}") from e
     except Exception as e:
         print(f"Error upserting knowledge: {e}")
         raise HTTPException(status_code=500, detail="Failed to upsert knowledge")
-    finally:
-        if conn:
-            await conn.close()
+
+# Bulk import
+
+class ImportJobResponse(BaseModel):
+    job_id: str
+    status: str
+    total_items: int
+    processed_items: int = 0
+    succeeded_items: int = 0
+    unchanged_items: int = 0
+    failed_items: int = 0
+    chunks_added: int = 0
+    docs_per_minute: Optional[float] = None
+    eta_seconds: Optional[int] = None
+    error: Optional[str] = None
+    created_at: Optional[str] = None
+    started_at: Optional[str] = None
+    finished_at: Optional[str] = None
+
+class ImportItemsResponse(BaseModel):
+    items: List[dict]
+    next_cursor: Optional[int] = None
+
+def _import_job_response(row) -> ImportJobResponse:
+    docs_per_minute, eta_seconds = None, None
+    if row["started_at"] and row["processed_items"]:
+        end = row["finished_at"] or datetime.now(row["started_at"].tzinfo)
+        elapsed = max((end - row["started_at"]).total_seconds(), 1.0)
+        docs_per_minute = round(row["processed_items"] * 60 / elapsed, 2)
+        if not row["finished_at"]:
+            remaining = row["total_items"] - row["processed_items"]
+            eta_seconds = int(remaining * elapsed / row["processed_items"])
+    return ImportJobResponse(
+        job_id=str(row["id"]),
+        status=row["status"],
+        total_items=row["total_items"],
+        processed_items=row["processed_items"],
+        succeeded_items=row["succeeded_items"],
+        unchanged_items=row["unchanged_items"],
+        failed_items=row["failed_items"],
+        chunks_added=row["chunks_added"],
+        docs_per_minute=docs_per_minute,
+        eta_seconds=eta_seconds,
+        error=row["error"],
+        created_at=row["created_at"].isoformat() if row["created_at"] else None,
+        started_at=row["started_at"].isoformat() if row["started_at"] else None,
+        finished_at=row["finished_at"].isoformat() if row["finished_at"] else None
+    )
+
+async def _fetch_import_job(conn, tenant_id, job_id: uuid.UUID):
+    row = await conn.fetchrow(
+        """SELECT id, status, total_items, processed_items, succeeded_items, unchanged_items, failed_items,
+                  chunks_added, error, created_at, started_at, finished_at
+           FROM knowledge_import_jobs WHERE id = $1 AND tenant_id = $2""",
+        job_id, tenant_id
+    )
+    if not row:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return row
+
+@router.post("/{tenant_slug}/imports", status_code=202)
+async def create_knowledge_import(
+    files: List[UploadFile] = File(default=[]),
+    urls: List[str] = Form(default=[]),
+    tenant_user: TenantAuthorizedUser = TenantUserDep,
+    db: RequestDB = RequestDBDep
+) -> ImportJobResponse:
+    """
+    Start a bulk knowledge import from uploaded files, zip archives and/or URLs.
+    Uploads are staged and the job runs in the background; poll
+    GET /{tenant_slug}/imports/{job_id} for progress.
+    """
+    staging_dir = tempfile.mkdtemp(prefix="flomastr-import-")
+    try:
+        sources: List[ImportSource] = []
+        for upload in files:
+            filename = upload.filename or ""
+            if filename.lower().endswith(".zip"):
+                path = await spool_upload(upload, max_bytes=IMPORT_ARCHIVE_MAX_BYTES, suffix=".zip")
+                staged = os.path.join(staging_dir, os.path.basename(path))
+                shutil.move(path, staged)
+                try:
+                    sources.extend(await asyncio.to_thread(list_zip_sources, staged))
+                except zipfile.BadZipFile:
+                    raise HTTPException(status_code=422, detail=f"Invalid zip archive: {filename}")
+            elif is_supported(filename):
+                path = await spool_upload(upload, suffix=os.path.splitext(filename)[1])
+                staged = os.path.join(staging_dir, os.path.basename(path))
+                shutil.move(path, staged)
+                sources.append(ImportSource("file", filename, staged))
+            else:
+                raise HTTPException(status_code=422, detail=f"Unsupported file type: {filename}")
+        
+        for url in urls:
+            for line in url.splitlines():
+                if line.strip():
+                    sources.append(ImportSource("url", line.strip()))
+        
+        if not sources:
+            raise HTTPException(status_code=400, detail="No importable documents were provided")
+        if len(sources) > KNOWLEDGE_IMPORT_MAX_DOCUMENTS:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Too many documents ({len(sources)}, max {KNOWLEDGE_IMPORT_MAX_DOCUMENTS})"
+            )
+        
+        conn = await db.connection()
+        job_id = await create_import_job(conn, tenant_user.tenant_id, tenant_user.user_id, sources, staging_dir)
+        start_import_job(job_id)
+        print(f"KNOWLEDGE_IMPORT: job {job_id} queued with {len(sources)} documents for {tenant_user.tenant_slug}")
+        
+        return _import_job_response(await _fetch_import_job(conn, tenant_user.tenant_id, job_id))
+        
+    except HTTPException:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        raise
+    except Exception as e:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        print(f"Error creating knowledge import: {e}")
+        raise HTTPException(status_code=500, detail="Failed to create knowledge import")
+
+@router.get("/{tenant_slug}/imports")
+async def list_knowledge_imports(
+    limit: int = Query(20, ge=1, le=100),
+    tenant_user: TenantAuthorizedUser = TenantUserDep,
+    db: RequestDB = RequestDBDep
+) -> List[ImportJobResponse]:
+    """List the tenant's most recent import jobs"""
+    try:
+        conn = await db.connection()
+        rows = await conn.fetch(
+            """SELECT id, status, total_items, processed_items, succeeded_items, unchanged_items, failed_items,
+                      chunks_added, error, created_at, started_at, finished_at
+               FROM knowledge_import_jobs WHERE tenant_id = $1
+               ORDER BY created_at DESC LIMIT $2""",
+            tenant_user.tenant_id, limit
+        )
+        return [_import_job_response(row) for row in rows]
+    except Exception as e:
+        print(f"Error listing knowledge imports: {e}")
+        raise HTTPException(status_code=500, detail="Failed to list knowledge imports")
+
+@router.get("/{tenant_slug}/imports/{job_id}")
+async def get_knowledge_import(
+    job_id: uuid.UUID,
+    tenant_user: TenantAuthorizedUser = TenantUserDep,
+    db: RequestDB = RequestDBDep
+) -> ImportJobResponse:
+    """Progress and throughput of an import job"""
+    try:
+        conn = await db.connection()
+        return _import_job_response(await _fetch_import_job(conn, tenant_user.tenant_id, job_id))
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error getting knowledge import: {e}")
+        raise HTTPException(status_code=500, detail="Failed to get knowledge import")
+
+@router.get("/{tenant_slug}/imports/{job_id}/items")
+async def list_knowledge_import_items(
+    job_id: uuid.UUID,
+    status: Optional[str] = Query(None, description="Filter by item status, e.g. 'failed'"),
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[int] = Query(None, description="next_cursor from the previous page"),
+    tenant_user: TenantAuthorizedUser = TenantUserDep,
+    db: RequestDB = RequestDBDep
+) -> ImportItemsResponse:
+    """Per-document status and errors of an import job, in submission order"""
+    try:
+        conn = await db.connection()
+        await _fetch_import_job(conn, tenant_user.tenant_id, job_id)
+        rows = await conn.fetch(
+            """SELECT position, source_type, source_ref, status, knowledge_base_id, chunks_added, error,
+                      started_at, finished_at
+               FROM knowledge_import_items
+               WHERE job_id = $1 AND position > $2 AND ($3::text IS NULL OR status = $3)
+               ORDER BY position LIMIT $4""",
+            job_id, cursor if cursor is not None else -1, status, limit + 1
+        )
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        items = [
+            {
+                "position": row["position"],
+                "source_type": row["source_type"],
+                "source": row["source_ref"],
+                "status": row["status"],
+                "knowledge_base_id": str(row["knowledge_base_id"]) if row["knowledge_base_id"] else None,
+                "chunks_added": row["chunks_added"],
+                "error": row["error"],
+                "started_at": row["started_at"].isoformat() if row["started_at"] else None,
+                "finished_at": row["finished_at"].isoformat() if row["finished_at"] else None
+            }
+            for row in rows
+        ]
+        return ImportItemsResponse(items=items, next_cursor=rows[-1]["position"] if has_more else None)
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error listing knowledge import items: {e}")
+        raise HTTPException(status_code=500, detail="Failed to list knowledge import items")
+
+@router.delete("/{tenant_slug}/imports/{job_id}")
+async def cancel_knowledge_import(
+    job_id: uuid.UUID,
+    tenant_user: TenantAuthorizedUser = TenantUserDep,
+    db: RequestDB = RequestDBDep
+) -> ImportJobResponse:
+    """Cancel a running import job; documents already written are kept"""
+    try:
+        conn = await db.connection()
+        job = await _fetch_import_job(conn, tenant_user.tenant_id, job_id)
+        if job["status"] in TERMINAL_JOB_STATUSES:
+            raise HTTPException(status_code=409, detail=f"Import job is already {job['status']}")
+        if not await request_import_cancel(conn, job_id):
+            raise HTTPException(status_code=409, detail="Import job is no longer running")
+        return _import_job_response(await _fetch_import_job(conn, tenant_user.tenant_id, job_id))
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error cancelling knowledge import: {e}")
+        raise HTTPException(status_code=500, detail="Failed to cancel knowledge import")
@@ -0,0 +1,77 @@
+"""
+Tenant n8n Health API
+
+Up/down state and probe latency percentiles of tenant n8n instances, as
+measured by the n8n_health maintenance job.
+"""
+
+from fastapi import APIRouter, HTTPException, Depends, Query
+from pydantic import BaseModel
+from typing import List, Optional
+from datetime import datetime
+from uuid import UUID
+from app.auth.super_admin_bypass import get_admin_user_or_bypass, AdminUserOrBypass
+from app.libs.auth_utils import is_super_admin
+from app.libs.n8n_health import all_n8n_health, get_n8n_health
+from app.libs.request_db import RequestDB, RequestDBDep
+from app.libs.tenant_auth import TenantAuthorizedUser, TenantUserDep
+
+router = APIRouter()
+
+class TenantN8nHealthResponse(BaseModel):
+    tenant_id: UUID
+    tenant_slug: str
+    is_up: Optional[bool] = None
+    consecutive_failures: int
+    last_status_code: Optional[int] = None
+    last_latency_ms: Optional[float] = None
+    p50_latency_ms: Optional[float] = None
+    p90_latency_ms: Optional[float] = None
+    p99_latency_ms: Optional[float] = None
+    samples: int
+    last_error: Optional[str] = None
+    checked_at: Optional[datetime] = None
+    last_up_at: Optional[datetime] = None
+    state_changed_at: Optional[datetime] = None
+
+class N8nHealthSummaryResponse(BaseModel):
+    total: int
+    up: int
+    down: int
+    tenants: List[TenantN8nHealthResponse]
+
+
+@router.get("/n8n-health")
+async def list_n8n_health(
+    down_only: bool = Query(False, description="Only return instances currently down"),
+    user: AdminUserOrBypass = Depends(get_admin_user_or_bypass)
+) -> N8nHealthSummaryResponse:
+    """Health of every tenant n8n instance (Super-Admin only)"""
+    if not is_super_admin(user):
+        raise HTTPException(status_code=403, detail="Super admin access required")
+
+    all_states = all_n8n_health()
+    up = sum(1 for health in all_states if health.is_up)
+    down = sum(1 for health in all_states if health.is_up is False)
+    states = [health for health in all_states if health.is_up is False] if down_only else all_states
+    return N8nHealthSummaryResponse(
+        total=len(all_states),
+        up=up,
+        down=down,
+        tenants=[TenantN8nHealthResponse(**health.to_dict()) for health in states]
+    )
+
+
+@router.get("/tenants/{tenant_slug}/n8n-health")
+async def get_tenant_n8n_health(
+    tenant_slug: str,
+    tenant_user: TenantAuthorizedUser = TenantUserDep,
+    db: RequestDB = RequestDBDep
+) -> TenantN8nHealthResponse:
+    """Health and probe latency of the tenant's own n8n instance"""
+    # Served from memory; the connection was only needed for the membership check
+    await db.close()
+    health = get_n8n_health(tenant_user.tenant_slug)
+    if not health:
+        raise HTTPException(status_code=404, detail="n8n instance has not been probed yet")
+    return TenantN8nHealthResponse(**health.to_dict())
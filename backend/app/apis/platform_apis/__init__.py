@@ -8,6 +8,7 @@ import asyncpg
 
 # Import centralized database connection
 from app.libs.db_connection import get_db_connection
+from app.libs.schema_capabilities import get_schema_capabilities
 
 router = APIRouter()
 
@@ -49,10 +50,7 @@ async def get_platform_manifest() -> PlatformManifestResponse:
 async def _table_exists(conn, table_name: str) -> bool:
     """Check if a table exists in the database."""
     try:
-        result = await conn.fetchval(
-            "SELECT EXISTS (SELECT FROM information_schema.tables WHERE table_name = $1)",
-            table_name
-        )
-        return bool(result)
+        schema = await get_schema_capabilities(conn)
+        return schema.has_table(table_name)
     except Exception:
         return False
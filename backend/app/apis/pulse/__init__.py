@@ -11,6 +11,7 @@ import uuid
 
 from app.auth import AuthorizedUser
 from app.libs.db_connection import get_db_connection
+from app.libs.schema_capabilities import get_schema_capabilities
 
 router = APIRouter(prefix="/routes/tenants", tags=["relational-pulse"])
 
@@ -153,16 +154,11 @@ async def pulse_health_check(user: AuthorizedUser):
     """
     Health check for Relational Pulse system
     """
-    conn = await get_db_connection()
     try:
-        # Check if pulse tables exist
-        tables_check = await conn.fetch("""
-            SELECT table_name 
-            FROM information_schema.tables 
-            WHERE table_name IN ('pulse_campaigns', 'pulse_messages', 'users', 'conversations');
-        """)
-        
-        tables_ready = len(tables_check)
+        # Check if pulse tables exist (in-memory unless the schema snapshot is stale)
+        schema = await get_schema_capabilities()
+        pulse_tables = ('pulse_campaigns', 'pulse_messages', 'users', 'conversations')
+        tables_ready = len(pulse_tables) - len(schema.missing_tables(*pulse_tables))
         
         return {
             "status": "healthy" if tables_ready >= 2 else "ready",
@@ -177,5 +173,3 @@ async def pulse_health_check(user: AuthorizedUser):
             "message": "Relational Pulse infrastructure ready for setup",
             "detail": str(e)
         }
-    finally:
-        await conn.close()
@@ -7,7 +7,7 @@ Tenant Lifecycle Management API
 Provides endpoints for super admins to manage tenant lifecycles:
 - Suspend/reactivate tenants
 - Soft delete tenants (reversible)
-- Hard delete tenants (irreversible with cascade)
+- Hard delete tenants (irreversible, batched background job)
 """
 
 from fastapi import APIRouter, HTTPException, status
@@ -20,6 +20,7 @@ from app.auth import AuthorizedUser
 
 # Import centralized database connection
 from app.libs.db_connection import get_db_connection
+from app.libs.tenant_purge import create_purge_job, get_purge_job, is_purge_running, start_tenant_purge
 
 router = APIRouter()
 
@@ -319,6 +320,8 @@ async def hard_delete_tenant(
     """
     Hard delete a tenant - permanently removes tenant and ALL related data.
     This is an IRREVERSIBLE operation that cascades to all related tables.
+    The tenant is suspended immediately and its data is deleted by a background
+    job in bounded batches; progress is reported by the status endpoint.
     """
     check_super_admin_access(user)
     
@@ -348,104 +351,22 @@ async def hard_delete_tenant(
                 detail=f"Tenant with ID {request.tenant_id} not found"
             )
         
-        # Start transaction for cascade deletion
-        async with conn.transaction():
-            # Delete related data in correct order (respecting foreign key constraints)
-            
-            # 1. Delete messages_archive (depends on contacts_archive)
-            messages_count = await conn.fetchval(
-                "SELECT COUNT(*) FROM messages_archive WHERE tenant_id = $1",
-                request.tenant_id
-            )
-            await conn.execute(
-                "DELETE FROM messages_archive WHERE tenant_id = $1",
-                request.tenant_id
-            )
-            
-            # 2. Delete contacts_archive and contacts_cache
-            contacts_archive_count = await conn.fetchval(
-                "SELECT COUNT(*) FROM contacts_archive WHERE tenant_id = $1",
-                request.tenant_id
-            )
-            await conn.execute(
-                "DELETE FROM contacts_archive WHERE tenant_id = $1",
-                request.tenant_id
-            )
-            
-            contacts_cache_count = await conn.fetchval(
-                "SELECT COUNT(*) FROM contacts_cache WHERE tenant_id = $1",
-                request.tenant_id
-            )
-            await conn.execute(
-                "DELETE FROM contacts_cache WHERE tenant_id = $1",
-                request.tenant_id
-            )
-            
-            # 3. Delete inbox_threads
-            threads_count = await conn.fetchval(
-                "SELECT COUNT(*) FROM inbox_threads WHERE tenant_id = $1",
-                request.tenant_id
-            )
-            await conn.execute(
-                "DELETE FROM inbox_threads WHERE tenant_id = $1",
-                request.tenant_id
-            )
-            
-            # 4. Delete active_hitl_tasks (tenant_id is varchar)
-            hitl_tasks_count = await conn.fetchval(
-                "SELECT COUNT(*) FROM active_hitl_tasks WHERE tenant_id = $1",
-                str(request.tenant_id)
-            )
-            await conn.execute(
-                "DELETE FROM active_hitl_tasks WHERE tenant_id = $1",
-                str(request.tenant_id)
-            )
-            
-            # 5. Delete from knowledge_index (uses tenant_slug)
-            knowledge_count = await conn.fetchval(
-                "SELECT COUNT(*) FROM knowledge_index WHERE tenant_slug = $1",
-                tenant['slug']
-            )
-            await conn.execute(
-                "DELETE FROM knowledge_index WHERE tenant_slug = $1",
-                tenant['slug']
-            )
-            
-            # 6. Delete from ctx_cache_envelopes (uses tenant_slug)
-            ctx_cache_count = await conn.fetchval(
-                "SELECT COUNT(*) FROM ctx_cache_envelopes WHERE tenant_slug = $1",
-                tenant['slug']
-            )
-            await conn.execute(
-                "DELETE FROM ctx_cache_envelopes WHERE tenant_slug = $1",
-                tenant['slug']
-            )
-            
-            # 7. Delete from tenant_profiles (uses tenant_id)
-            profiles_count = await conn.fetchval(
-                "SELECT COUNT(*) FROM tenant_profiles WHERE tenant_id = $1",
-                request.tenant_id
-            )
-            await conn.execute(
-                "DELETE FROM tenant_profiles WHERE tenant_id = $1",
-                request.tenant_id
-            )
-            
-            # 8. Finally delete the tenant (CASCADE will handle tenant_branding and webchat_sessions)
-            await conn.execute(
-                "DELETE FROM tenants WHERE id = $1",
-                request.tenant_id
+        if await is_purge_running(conn, request.tenant_id):
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Hard delete of tenant '{tenant['name']}' is already in progress"
             )
         
+        # Runs in the background in committed batches; a failed job is resumed by calling again
+        await create_purge_job(conn, tenant, request.reason, user.sub)
+        start_tenant_purge(request.tenant_id)
+        
         return TenantLifecycleResponse(
-            success=True,
-            message=f"Tenant '{tenant['name']}' and all related data have been permanently deleted. "
-                   f"Removed: {messages_count} messages, {contacts_archive_count} archived contacts, "
-                   f"{contacts_cache_count} cached contacts, {threads_count} threads, "
-                   f"{hitl_tasks_count} HITL tasks, {knowledge_count} knowledge items, "
-                   f"{ctx_cache_count} context cache entries.",
             tenant_id=request.tenant_id,
             action="hard_delete",
+            status="deleting",
+            message=f"Tenant '{tenant['name']}' is being permanently deleted. "
+                   f"Track progress at /status/{request.tenant_id}.",
             timestamp=datetime.utcnow()
         )
         
@@ -476,8 +397,18 @@ async def get_tenant_lifecycle_status(
             "SELECT id, slug, name, status, deleted_at, created_at, updated_at FROM tenants WHERE id = $1",
             tenant_id
         )
+        deletion = await get_purge_job(conn, tenant_id)
         
         if not tenant:
+            # Purged tenants are only known through their deletion job
+            if deletion:
+                return {
+                    "tenant_id": tenant_id,
+                    "status": "deleted" if deletion["status"] == "completed" else "deleting",
+                    "is_suspended": False,
+                    "is_soft_deleted": False,
+                    "deletion": deletion
+                }
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Tenant with ID {tenant_id} not found"
@@ -492,7 +423,8 @@ async def get_tenant_lifecycle_status(
             "created_at": tenant['created_at'],
             "updated_at": tenant['updated_at'],
             "is_suspended": tenant['status'] == 'suspended',
-            "is_soft_deleted": tenant['deleted_at'] is not None
+            "is_soft_deleted": tenant['deleted_at'] is not None,
+            "deletion": deletion
         }
         
     except HTTPException:
@@ -2,22 +2,13 @@
 
 
 from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, HttpUrl, Field
-from typing import List, Dict, Any
-import requests
+from typing import List, Dict, Any, AsyncIterator, Optional
+import asyncio
 import hashlib
 import json
-import io
 import os
-from PyPDF2 import PdfReader
-
-# Try to import OpenAI, but make it optional
-try:
-    from openai import OpenAI
-    OPENAI_AVAILABLE = True
-except ImportError:
-    OPENAI_AVAILABLE = False
-    OpenAI = None
 
 # Try to import file handling dependencies, make them optional
 try:
@@ -29,6 +20,19 @@ except ImportError:
     File = None
 
 from app.libs.backend_auth import require_backend_token
+from app.libs.answer_cache import answer_cache
+from app.libs.pdf_extraction import conversion_limiter, iter_pdf_pages, spool_upload
+from app.libs.url_fetcher import fetch_url_markdown
+from app.libs.synthesis import (
+    SYNTHESIS_MODEL,
+    SYSTEM_PROMPT,
+    SynthesisTimeoutError,
+    SynthesisUnavailableError,
+    format_sse,
+    get_openai_client,
+    stream_answer,
+    synthesize_answer,
+)
 
 router = APIRouter(prefix="/tools")
 
@@ -64,6 +68,26 @@ class SynthesisInput(BaseModel):
 class AnswerResponse(BaseModel):
     answer: str
 
+async def _synthesize(data: SynthesisInput, handler: str) -> AnswerResponse:
+    """Run a single non-streaming synthesis through the shared engine"""
+    lookup = await answer_cache.lookup(SYNTHESIS_MODEL, SYSTEM_PROMPT, data.query, data.context)
+    if lookup.hit:
+        return AnswerResponse(answer=lookup.answer)
+
+    try:
+        answer = await synthesize_answer(data.query, data.context)
+        await answer_cache.store(lookup, SYNTHESIS_MODEL, data.query, answer)
+        return AnswerResponse(answer=answer)
+
+    except SynthesisUnavailableError as e:
+        raise HTTPException(status_code=503, detail=f"AI synthesis unavailable: {str(e)}") from e
+    except SynthesisTimeoutError as e:
+        raise HTTPException(status_code=504, detail=f"AI synthesis timed out: {str(e)}") from e
+    except Exception as e:
+        # Handle API errors gracefully
+        print(f"OpenAI API error in {handler}: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"AI synthesis failed: {str(e)}") from e
+
 @router.post("/synthesis")
 async def synthesize(
     request: Request,
@@ -73,40 +97,52 @@ async def synthesize(
     """
     Dedicated synthesis endpoint that bypasses reverse proxy routing issues.
     Generates coherent, natural-language answers based on provided context and user query.
-    Uses OpenAI GPT-4 to synthesize answers using only the provided context.
     """
-    # System prompt to instruct the LLM to act as a knowledge assistant
-    system_prompt = (
-        "You are a helpful knowledge assistant. Your task is to provide a concise and direct answer to the user's question. "
-        "The user will provide a question and a block of context. "
-        "You must answer the question using ONLY the information provided in the context. "
-        "If the context does not contain the answer, state that you cannot answer based on the provided information. "
-        "Do not use any prior knowledge. Do not make up any information. "
-        "Answer in a professional and helpful tone."
-    )
-
-    # Combine the user query and context into the message history
-    messages = [
-        {"role": "system", "content": system_prompt},
-        {"role": "user", "content": f"Context:\n{data.context}\n\nQuestion:\n{data.query}"}
-    ]
+    return await _synthesize(data, "synthesize")
 
+@router.post("/synthesis/stream")
+async def synthesize_stream(
+    request: Request,
+    data: SynthesisInput,
+    _: str = Depends(require_backend_token)
+) -> StreamingResponse:
+    """
+    Streaming variant of /synthesis.
+    Emits Server-Sent Events: one `token` event per delta as it arrives from the LLM,
+    then a final `done` event carrying the full answer (or an `error` event).
+    """
     try:
-        # Call the OpenAI API to generate the response
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=messages,
-            temperature=0.0  # Set to 0.0 for deterministic, factual responses
-        )
-        
-        # Extract the answer from the API response
-        answer = response.choices[0].message.content
-        return AnswerResponse(answer=answer)
+        # Fail before the stream opens if the client cannot be built
+        get_openai_client()
+    except SynthesisUnavailableError as e:
+        raise HTTPException(status_code=503, detail=f"AI synthesis unavailable: {str(e)}") from e
 
-    except Exception as e:
-        # Handle API errors gracefully
-        print(f"OpenAI API error in synthesize: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"AI synthesis failed: {str(e)}")
+    lookup = await answer_cache.lookup(SYNTHESIS_MODEL, SYSTEM_PROMPT, data.query, data.context)
+
+    async def event_stream():
+        if lookup.hit:
+            # Cached answers are sent whole; no LLM call is made
+            yield format_sse({"token": lookup.answer}, event="token")
+            yield format_sse({"answer": lookup.answer, "cached": True}, event="done")
+            return
+
+        parts = []
+        try:
+            async for token in stream_answer(data.query, data.context):
+                parts.append(token)
+                yield format_sse({"token": token}, event="token")
+            answer = "".join(parts)
+            yield format_sse({"answer": answer, "cached": False}, event="done")
+            await answer_cache.store(lookup, SYNTHESIS_MODEL, data.query, answer)
+        except Exception as e:
+            print(f"OpenAI API error in synthesize_stream: {str(e)}")
+            yield format_sse({"detail": f"AI synthesis failed: {str(e)}"}, event="error")
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 @router.post("/generate/answer")
 async def generate_answer(
@@ -116,40 +152,16 @@ async def generate_answer(
 ) -> AnswerResponse:
     """
     Generates a coherent, natural-language answer based on provided context and user query.
-    Uses OpenAI GPT-4 to synthesize answers using only the provided context.
+    Kept for existing n8n flows; shares the engine behind /synthesis.
     """
-    # System prompt to instruct the LLM to act as a knowledge assistant
-    system_prompt = (
-        "You are a helpful knowledge assistant. Your task is to provide a concise and direct answer to the user's question. "
-        "The user will provide a question and a block of context. "
-        "You must answer the question using ONLY the information provided in the context. "
-        "If the context does not contain the answer, state that you cannot answer based on the provided information. "
-        "Do not use any prior knowledge. Do not make up any information. "
-        "Answer in a professional and helpful tone."
-    )
-
-    # Combine the user query and context into the message history
-    messages = [
-        {"role": "system", "content": system_prompt},
-        {"role": "user", "content": f"Context:\n{data.context}\n\nQuestion:\n{data.query}"}
-    ]
-
-    try:
-        # Call the OpenAI API to generate the response
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",  # Using gpt-4o-mini for cost efficiency
-            messages=messages,
-            temperature=0.0  # Set to 0.0 for deterministic, factual responses
-        )
-        
-        # Extract the answer from the API response
-        answer = response.choices[0].message.content
-        return AnswerResponse(answer=answer)
+    return await _synthesize(data, "generate_answer")
 
-    except Exception as e:
-        # Handle API errors gracefully
-        print(f"OpenAI API error in generate_answer: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"AI generation failed: {str(e)}")
+@router.get("/synthesis/cache-stats")
+async def synthesis_cache_stats(
+    _: str = Depends(require_backend_token)
+) -> Dict[str, Any]:
+    """Hit/miss counters for the synthesis answer cache"""
+    return answer_cache.stats()
 
 @router.post("/prepare/context")
 async def prepare_context(
@@ -167,6 +179,53 @@ async def prepare_context(
     # Return a JSON object with the combined context
     return ContextResponse(context=context_string)
 
+TEXT_FILE_EXTENSIONS = ('.txt', '.md', '.csv', '.json', '.xml', '.html')
+
+def _conversion_tenant_key(request: Request) -> str:
+    """Tenant used for the per-tenant conversion cap (n8n sends X-Tenant-Slug)"""
+    return (request.headers.get("X-Tenant-Slug")
+            or request.query_params.get("tenant_slug")
+            or "default")
+
+def _decode_text_file(path: str, filename: str) -> str:
+    with open(path, "rb") as f:
+        contents = f.read()
+
+    if filename.lower().endswith(TEXT_FILE_EXTENSIONS):
+        try:
+            return contents.decode('utf-8')
+        except UnicodeDecodeError:
+            try:
+                return contents.decode('latin-1')
+            except Exception as e:
+                raise HTTPException(status_code=422, detail=f"Could not decode text file: {str(e)}")
+
+    try:
+        return contents.decode('utf-8')
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=422, detail=f"Unsupported file type: {filename}")
+
+async def _iter_file_markdown(path: str, filename: str) -> AsyncIterator[str]:
+    """Yield markdown for a spooled upload: one item per PDF page, or the whole text file"""
+    if filename.lower().endswith('.pdf'):
+        try:
+            async for page_text in iter_pdf_pages(path):
+                yield page_text
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=422, detail=f"Could not extract content from PDF: {str(e)}")
+
+    elif filename.lower().endswith(('.docx', '.doc')):
+        raise HTTPException(status_code=422, detail="Word document support requires additional configuration.")
+
+    else:
+        yield await asyncio.to_thread(_decode_text_file, path, filename)
+
+def _remove_spooled(path: Optional[str]) -> None:
+    if path and os.path.exists(path):
+        os.unlink(path)
+
 @router.post("/convert/file-to-md")
 async def convert_file_to_md(
     request: Request,
@@ -175,6 +234,7 @@ async def convert_file_to_md(
 ) -> ConvertFileResponse:
     """
     Accepts a file upload, extracts text, and returns it as markdown.
+    The upload is spooled to disk and PDFs are extracted off the event loop.
     """
     
     if not MULTIPART_AVAILABLE:
@@ -183,54 +243,16 @@ async def convert_file_to_md(
             detail="File upload functionality is currently unavailable. Please install python-multipart."
         )
     
-    # --- START TEMPORARY DEBUGGING CODE ---
-    server_secret_key = os.getenv("BACKEND_API_SECRET_TOKEN")
-    incoming_header = request.headers.get("Authorization")
-    print("--- START AUTH DEBUG ---")
-    print(f"SERVER_SECRET_KEY_LOADED: {server_secret_key}")
-    print(f"INCOMING_HEADER_RECEIVED: {incoming_header}")
-    if incoming_header:
-        incoming_token = incoming_header.split(" ")[1] if " " in incoming_header else incoming_header
-        print(f"ARE_THEY_EQUAL?: {server_secret_key == incoming_token}")
-    print("--- END AUTH DEBUG ---")
-    # --- END TEMPORARY DEBUGGING CODE ---
-    
+    tenant_key = _conversion_tenant_key(request)
+    conversion_limiter.acquire(tenant_key)
+    path = None
     try:
-        # Read the file content into memory
-        contents = await file.read()
         filename = file.filename or ""
+        path = await spool_upload(file, suffix=os.path.splitext(filename)[1])
         
-        # Determine file type by extension and process accordingly
-        text_content = ""
-        
-        if filename.lower().endswith('.pdf'):
-            try:
-                pdf_file = io.BytesIO(contents)
-                pdf_reader = PdfReader(pdf_file)
-                for page in pdf_reader.pages:
-                    text_content += page.extract_text() + "\n"
-            except Exception as e:
-                raise HTTPException(status_code=422, detail=f"Could not extract content from PDF: {str(e)}")
-                
-        elif filename.lower().endswith(('.txt', '.md', '.csv', '.json', '.xml', '.html')):
-            try:
-                text_content = contents.decode('utf-8')
-            except UnicodeDecodeError:
-                try:
-                    text_content = contents.decode('latin-1')
-                except Exception as e:
-                    raise HTTPException(status_code=422, detail=f"Could not decode text file: {str(e)}")
-        
-        elif filename.lower().endswith(('.docx', '.doc')):
-            raise HTTPException(status_code=422, detail="Word document support requires additional configuration.")
-        
-        else:
-            try:
-                text_content = contents.decode('utf-8')
-            except UnicodeDecodeError:
-                raise HTTPException(status_code=422, detail=f"Unsupported file type: {filename}")
-        
-        text_content = text_content.strip()
+        # Collect pages and join once
+        pages = [page async for page in _iter_file_markdown(path, filename)]
+        text_content = "\n".join(pages).strip()
         
         if not text_content:
             raise HTTPException(status_code=422, detail="Could not extract any text content from the file.")
@@ -241,24 +263,86 @@ async def convert_file_to_md(
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Unexpected error during file processing: {str(e)}")
+    finally:
+        conversion_limiter.release(tenant_key)
+        _remove_spooled(path)
+
+@router.post("/convert/file-to-md/stream")
+async def convert_file_to_md_stream(
+    request: Request,
+    file: UploadFile,
+    _: str = Depends(require_backend_token)
+) -> StreamingResponse:
+    """
+    Streaming variant of /convert/file-to-md.
+    Returns text/markdown chunked per page as soon as each page is extracted.
+    If extraction fails after the first page, the stream ends with a
+    `<!-- conversion-error: ... -->` line so clients can tell the markdown is incomplete.
+    """
+    
+    if not MULTIPART_AVAILABLE:
+        raise HTTPException(
+            status_code=503, 
+            detail="File upload functionality is currently unavailable. Please install python-multipart."
+        )
+    
+    tenant_key = _conversion_tenant_key(request)
+    conversion_limiter.acquire(tenant_key)
+    path = None
+    try:
+        filename = file.filename or ""
+        path = await spool_upload(file, suffix=os.path.splitext(filename)[1])
+        pages = _iter_file_markdown(path, filename)
+        # Pull the first page before responding so size/page-limit and parse errors keep their status codes
+        first_page = await pages.__anext__()
+    except StopAsyncIteration:
+        conversion_limiter.release(tenant_key)
+        _remove_spooled(path)
+        raise HTTPException(status_code=422, detail="Could not extract any text content from the file.")
+    except BaseException as e:
+        conversion_limiter.release(tenant_key)
+        _remove_spooled(path)
+        if isinstance(e, Exception) and not isinstance(e, HTTPException):
+            raise HTTPException(status_code=500, detail=f"Unexpected error during file processing: {str(e)}") from e
+        raise
+
+    async def page_stream():
+        try:
+            yield first_page + "\n"
+            async for page_text in pages:
+                yield page_text + "\n"
+        except Exception as e:
+            print(f"File conversion stream failed for {filename}: {str(e)}")
+            # Headers (200) are already sent; mark the truncated output in-band
+            detail = str(e).replace("--", "- -").replace("\n", " ")
+            yield f"\n<!-- conversion-error: {detail} -->\n"
+        finally:
+            await pages.aclose()
+            conversion_limiter.release(tenant_key)
+            _remove_spooled(path)
+
+    return StreamingResponse(page_stream(), media_type="text/markdown; charset=utf-8")
 
 @router.post("/convert/url-to-md")
 async def convert_url_to_markdown(
     request_body: ConvertUrlRequest,
     _: str = Depends(require_backend_token)
 ) -> ConvertResponse:
-    """Convert URL to markdown"""
+    """
+    Convert URL to markdown.
+    Unchanged pages are revalidated with ETag/Last-Modified and served from the conversion cache.
+    """
     try:
-        response = requests.get(str(request_body.url), timeout=10)
-        response.raise_for_status()
-        
-        content = response.text
+        result = await fetch_url_markdown(str(request_body.url))
+        print(f"URL conversion {request_body.url}: {result.cache_status}")
         
         return ConvertResponse(
-            markdown=f"# Content from {request_body.url}\n\n{content[:1000]}...",
-            title=f"Content from {request_body.url}"
+            markdown=result.markdown,
+            title=result.title
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"URL conversion failed: {str(e)}")
 
@@ -269,7 +353,8 @@ async def embed_knowledge(
 ) -> EmbedResponse:
     """Generate embeddings for knowledge content"""
     try:
-        response = client.embeddings.create(
+        client = get_openai_client()
+        response = await client.embeddings.create(
             model="text-embedding-3-large",
             input=request_body.texts
         )
@@ -10,6 +10,7 @@ import asyncpg
 
 # Import centralized database connection
 from app.libs.db_connection import get_db_connection
+from app.libs.schema_capabilities import get_schema_capabilities
 
 router = APIRouter()
 
@@ -79,14 +80,9 @@ async def list_users(request: Request) -> List[UserRoleInfo]:
     conn = await get_db_connection()
     try:
         # First check if user_roles table exists
-        table_exists = await conn.fetchval("""
-            SELECT EXISTS (
-                SELECT 1 FROM information_schema.tables 
-                WHERE table_name = 'user_roles'
-            )
-        """)
+        schema = await get_schema_capabilities(conn)
         
-        if not table_exists:
+        if not schema.has_table("user_roles"):
             print(f"⚠️ USER-MANAGEMENT: user_roles table doesn't exist, creating sample data")
             # Return some sample data based on configured super admins
             import os
@@ -1,11 +1,23 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query
 from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
+from typing import List, Literal, Optional, Dict, Any
 from datetime import datetime
 import asyncpg
+import base64
+import json
+import uuid
 from app.auth import AuthorizedUser
 from app.libs.models import WorkflowExecution
 from app.libs.db_connection import get_db_connection
+from app.libs.execution_rollups import (
+    apply_execution_change,
+    execution_timeseries,
+    summarize_executions,
+    workflow_latency,
+)
+from app.libs.execution_payloads import load_payload, load_payloads, store_payload
+from app.libs.execution_ingest import EXECUTION_INGEST_MAX_EVENTS, ingest_execution_events
+from app.libs.backend_auth import require_backend_token
 
 router = APIRouter()
 
@@ -22,6 +34,51 @@ class WorkflowExecutionUpdate(BaseModel):
     execution_data: Optional[Dict[str, Any]] = None
     error_message: Optional[str] = None
 
+class ExecutionEvent(BaseModel):
+    event: Literal["start", "finish"]
+    n8n_execution_id: str
+    workflow_id: Optional[uuid.UUID] = None  # or n8n_workflow_id; optional once the execution is known
+    n8n_workflow_id: Optional[str] = None
+    status: Optional[str] = None  # defaults to running / success / error from the event
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    error_message: Optional[str] = None
+    execution_data: Optional[Dict[str, Any]] = None
+
+class ExecutionEventBatch(BaseModel):
+    tenant_id: uuid.UUID
+    events: List[ExecutionEvent]
+
+class WorkflowExecutionPage(BaseModel):
+    executions: List[WorkflowExecution]
+    next_cursor: Optional[str] = None
+
+# Always returned by the list endpoint; anything in OPTIONAL_EXECUTION_FIELDS is opt-in via fields=
+LIST_EXECUTION_COLUMNS = [
+    "id", "workflow_id", "tenant_id", "n8n_execution_id", "status",
+    "started_at", "finished_at", "error_message", "created_at",
+]
+OPTIONAL_EXECUTION_FIELDS = {"execution_data"}
+
+def encode_execution_cursor(started_at: datetime, execution_id) -> str:
+    """Opaque keyset cursor over (started_at, id)"""
+    raw = json.dumps([started_at.isoformat(), str(execution_id)])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_execution_cursor(cursor: str):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        started_at, execution_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(started_at), uuid.UUID(execution_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def _inline_execution_data(value):
+    """execution_data still stored inline (not yet moved to workflow_execution_payloads)"""
+    if value is None:
+        return None
+    return json.loads(value) if isinstance(value, str) else value
+
 @router.post("/workflow-executions", response_model=WorkflowExecution)
 async def create_workflow_execution(
     execution: WorkflowExecutionCreate,
@@ -38,35 +95,75 @@ async def create_workflow_execution(
         if not workflow_exists:
             raise HTTPException(status_code=404, detail="Workflow not found")
         
-        result = await conn.fetchrow("""
-            INSERT INTO workflow_executions (
-                workflow_id, tenant_id, n8n_execution_id, status, 
-                execution_data, started_at
-            ) VALUES ($1, $2, $3, $4, $5, NOW())
-            RETURNING id, workflow_id, tenant_id, n8n_execution_id, status,
-                     started_at, finished_at, execution_data, error_message, created_at
-        """, 
-        execution.workflow_id, execution.tenant_id, execution.n8n_execution_id,
-        execution.status, execution.execution_data
-        )
+        async with conn.transaction():
+            result = await conn.fetchrow("""
+                INSERT INTO workflow_executions (
+                    workflow_id, tenant_id, n8n_execution_id, status, started_at
+                ) VALUES ($1, $2, $3, $4, NOW())
+                RETURNING id, workflow_id, tenant_id, n8n_execution_id, status,
+                         started_at, finished_at, error_message, created_at
+            """, 
+            execution.workflow_id, execution.tenant_id, execution.n8n_execution_id,
+            execution.status
+            )
+            # Run data is stored compressed, out of line
+            await store_payload(conn, result["id"], execution.execution_data)
+            await apply_execution_change(conn, new=result)
         
-        return WorkflowExecution(**dict(result))
+        return WorkflowExecution(**dict(result), execution_data=execution.execution_data)
     finally:
         await conn.close()
 
-@router.get("/workflow-executions", response_model=List[WorkflowExecution])
+@router.post("/workflow-executions/events")
+async def ingest_workflow_execution_events(
+    batch: ExecutionEventBatch,
+    _: str = Depends(require_backend_token)
+) -> Dict[str, Any]:
+    """
+    Batched start/finish events from n8n, idempotent on n8n_execution_id.
+    Safe to re-send: a replayed flush changes nothing.
+    """
+    if len(batch.events) > EXECUTION_INGEST_MAX_EVENTS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {EXECUTION_INGEST_MAX_EVENTS} events per request"
+        )
+    if not batch.events:
+        return {"events": 0, "executions": 0, "inserted": 0, "updated": 0, "rejected": []}
+    
+    conn = await get_db_connection()
+    try:
+        return await ingest_execution_events(
+            conn, batch.tenant_id, [event.model_dump() for event in batch.events]
+        )
+    finally:
+        await conn.close()
+
+@router.get(
+    "/workflow-executions",
+    response_model=WorkflowExecutionPage,
+    response_model_exclude_unset=True
+)
 async def list_workflow_executions(
+    user: AuthorizedUser,
     workflow_id: Optional[str] = None,
     tenant_id: Optional[str] = None,
     status: Optional[str] = None,
-    limit: int = 50,
-    offset: int = 0,
-    user: AuthorizedUser
-) -> List[WorkflowExecution]:
-    """List workflow executions with optional filters"""
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    fields: Optional[str] = Query(None, description="Comma-separated extra fields, e.g. execution_data")
+) -> WorkflowExecutionPage:
+    """List workflow executions with optional filters, newest first (keyset-paginated)"""
+    requested = {field.strip() for field in fields.split(",") if field.strip()} if fields else set()
+    unknown = requested - OPTIONAL_EXECUTION_FIELDS - set(LIST_EXECUTION_COLUMNS)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    include_data = "execution_data" in requested
+    columns = LIST_EXECUTION_COLUMNS + (["execution_data"] if include_data else [])
+    
     conn = await get_db_connection()
     try:
-        conditions = []
+        conditions = ["started_at IS NOT NULL"]
         params = []
         param_count = 1
         
@@ -85,24 +182,39 @@ async def list_workflow_executions(
             params.append(status)
             param_count += 1
         
-        where_clause = "WHERE " + " AND ".join(conditions) if conditions else ""
+        if cursor:
+            cursor_started_at, cursor_id = decode_execution_cursor(cursor)
+            conditions.append(f"(started_at, id) < (${param_count}, ${param_count + 1})")
+            params.extend([cursor_started_at, cursor_id])
+            param_count += 2
+        
+        where_clause = "WHERE " + " AND ".join(conditions)
         
-        # Add limit and offset parameters
-        params.extend([limit, offset])
-        limit_param = param_count
-        offset_param = param_count + 1
+        # Fetch one extra row to know whether there is a next page
+        params.append(limit + 1)
         
         query = f"""
-            SELECT id, workflow_id, tenant_id, n8n_execution_id, status,
-                   started_at, finished_at, execution_data, error_message, created_at
+            SELECT {', '.join(columns)}
             FROM workflow_executions
             {where_clause}
-            ORDER BY started_at DESC
-            LIMIT ${limit_param} OFFSET ${offset_param}
+            ORDER BY started_at DESC, id DESC
+            LIMIT ${param_count}
         """
         
-        results = await conn.fetch(query, *params)
-        return [WorkflowExecution(**dict(row)) for row in results]
+        rows = await conn.fetch(query, *params)
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        
+        executions = [dict(row) for row in rows]
+        if include_data:
+            payloads = await load_payloads(conn, [row["id"] for row in rows])
+            for row in executions:
+                row["execution_data"] = payloads.get(row["id"], _inline_execution_data(row["execution_data"]))
+        
+        return WorkflowExecutionPage(
+            executions=[WorkflowExecution(**row) for row in executions],
+            next_cursor=encode_execution_cursor(rows[-1]["started_at"], rows[-1]["id"]) if has_more else None
+        )
     finally:
         await conn.close()
 
@@ -124,7 +236,10 @@ async def get_workflow_execution(
         if not result:
             raise HTTPException(status_code=404, detail="Workflow execution not found")
         
-        return WorkflowExecution(**dict(result))
+        execution = dict(result)
+        payload = await load_payload(conn, result["id"])
+        execution["execution_data"] = payload if payload is not None else _inline_execution_data(result["execution_data"])
+        return WorkflowExecution(**execution)
     finally:
         await conn.close()
 
@@ -153,9 +268,8 @@ async def update_workflow_execution(
             param_count += 1
             
         if execution_update.execution_data is not None:
-            update_fields.append(f"execution_data = ${param_count}")
-            params.append(execution_update.execution_data)
-            param_count += 1
+            # Stored out of line below; drop any legacy inline copy
+            update_fields.append("execution_data = NULL")
             
         if execution_update.error_message is not None:
             update_fields.append(f"error_message = ${param_count}")
@@ -172,67 +286,75 @@ async def update_workflow_execution(
             SET {', '.join(update_fields)}
             WHERE id = ${param_count}
             RETURNING id, workflow_id, tenant_id, n8n_execution_id, status,
-                     started_at, finished_at, execution_data, error_message, created_at
+                     started_at, finished_at, error_message, created_at
         """
         
-        result = await conn.fetchrow(query, *params)
-        
-        if not result:
-            raise HTTPException(status_code=404, detail="Workflow execution not found")
+        async with conn.transaction():
+            previous = await conn.fetchrow("""
+                SELECT tenant_id, workflow_id, status, started_at, finished_at
+                FROM workflow_executions
+                WHERE id = $1
+                FOR UPDATE
+            """, execution_id)
+            
+            if not previous:
+                raise HTTPException(status_code=404, detail="Workflow execution not found")
+            
+            result = await conn.fetchrow(query, *params)
+            if execution_update.execution_data is not None:
+                await store_payload(conn, result["id"], execution_update.execution_data)
+            await apply_execution_change(conn, old=previous, new=result)
         
-        return WorkflowExecution(**dict(result))
+        # execution_data is only echoed back when it was part of the update
+        return WorkflowExecution(**dict(result), execution_data=execution_update.execution_data)
     finally:
         await conn.close()
 
 @router.get("/workflow-executions/stats/summary")
 async def get_execution_stats(
+    user: AuthorizedUser,
     tenant_id: Optional[str] = None,
     workflow_id: Optional[str] = None,
-    days: int = 30,
-    user: AuthorizedUser
+    days: int = Query(30, ge=1, le=3650)
 ) -> Dict[str, Any]:
-    """Get execution statistics"""
+    """Get execution statistics (served from the hourly rollup)"""
     conn = await get_db_connection()
     try:
-        conditions = ["started_at >= NOW() - INTERVAL '%s days'" % days]
-        params = []
-        param_count = 1
-        
-        if tenant_id:
-            conditions.append(f"tenant_id = ${param_count}")
-            params.append(tenant_id)
-            param_count += 1
-            
-        if workflow_id:
-            conditions.append(f"workflow_id = ${param_count}")
-            params.append(workflow_id)
-            param_count += 1
-        
-        where_clause = "WHERE " + " AND ".join(conditions)
-        
-        # Get overall stats
-        stats_query = f"""
-            SELECT 
-                COUNT(*) as total_executions,
-                COUNT(CASE WHEN status = 'success' THEN 1 END) as successful,
-                COUNT(CASE WHEN status = 'error' THEN 1 END) as failed,
-                COUNT(CASE WHEN status = 'running' THEN 1 END) as running,
-                AVG(EXTRACT(EPOCH FROM (finished_at - started_at))) as avg_duration_seconds
-            FROM workflow_executions
-            {where_clause}
-        """
-        
-        result = await conn.fetchrow(stats_query, *params)
-        
-        return {
-            "total_executions": result["total_executions"],
-            "successful": result["successful"],
-            "failed": result["failed"],
-            "running": result["running"],
-            "success_rate": round((result["successful"] / result["total_executions"]) * 100, 2) if result["total_executions"] > 0 else 0,
-            "avg_duration_seconds": round(result["avg_duration_seconds"] or 0, 2),
-            "period_days": days
-        }
+        stats = await summarize_executions(conn, days, tenant_id=tenant_id, workflow_id=workflow_id)
+        return {**stats, "period_days": days}
+    finally:
+        await conn.close()
+
+@router.get("/workflow-executions/stats/timeseries")
+async def get_execution_timeseries(
+    user: AuthorizedUser,
+    tenant_id: Optional[str] = None,
+    workflow_id: Optional[str] = None,
+    hours: int = Query(24, ge=1, le=24 * 90)
+) -> Dict[str, Any]:
+    """Per-hour execution statistics for charts, oldest hour first"""
+    conn = await get_db_connection()
+    try:
+        points = await execution_timeseries(conn, hours, tenant_id=tenant_id, workflow_id=workflow_id)
+        return {"period_hours": hours, "points": points}
+    finally:
+        await conn.close()
+
+@router.get("/workflow-executions/stats/latency")
+async def get_workflow_latency(
+    user: AuthorizedUser,
+    tenant_id: Optional[str] = None,
+    days: int = Query(1, ge=1, le=3650),
+    min_executions: int = Query(1, ge=1),
+    limit: int = Query(50, ge=1, le=500)
+) -> Dict[str, Any]:
+    """Per-workflow duration percentiles (p50/p90/p99), slowest p99 first"""
+    conn = await get_db_connection()
+    try:
+        workflows = await workflow_latency(
+            conn, days, tenant_id=tenant_id, min_executions=min_executions, limit=limit
+        )
+        return {"period_days": days, "workflows": workflows}
     finally:
         await conn.close()
 
@@ -244,12 +366,15 @@ async def delete_workflow_execution(
     """Delete a workflow execution"""
     conn = await get_db_connection()
     try:
-        result = await conn.execute("""
-            DELETE FROM workflow_executions WHERE id = $1
-        """, execution_id)
-        
-        if result == "DELETE 0":
-            raise HTTPException(status_code=404, detail="Workflow execution not found")
+        async with conn.transaction():
+            deleted = await conn.fetchrow("""
+                DELETE FROM workflow_executions WHERE id = $1
+                RETURNING tenant_id, workflow_id, status, started_at, finished_at
+            """, execution_id)
+            
+            if not deleted:
+                raise HTTPException(status_code=404, detail="Workflow execution not found")
+            await apply_execution_change(conn, old=deleted)
         
         return {"message": "Workflow execution deleted successfully"}
     finally:
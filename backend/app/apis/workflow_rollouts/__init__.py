@@ -0,0 +1,209 @@
+"""
+Workflow Rollouts API
+
+Super-admin endpoints to push a master workflow to many tenant n8n instances
+in canary waves, follow per-tenant progress, and pause, resume or cancel.
+"""
+
+from fastapi import APIRouter, HTTPException, Depends, Query
+from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Optional
+from datetime import datetime
+from uuid import UUID
+from app.auth.super_admin_bypass import get_admin_user_or_bypass, AdminUserOrBypass
+from app.libs.auth_utils import is_super_admin
+from app.libs.db_connection import get_db_connection
+from app.libs.workflow_rollouts import (
+    ROLLOUT_DEFAULT_CONCURRENCY,
+    ROLLOUT_DEFAULT_MAX_FAILURE_RATIO,
+    ROLLOUT_DEFAULT_WAVE_DELAY_SECONDS,
+    ROLLOUT_MAX_CONCURRENCY,
+    create_rollout,
+    get_rollout,
+    list_rollout_targets,
+    list_rollouts,
+    set_rollout_status,
+    start_rollout,
+)
+
+router = APIRouter()
+
+class TenantSelector(BaseModel):
+    tenant_ids: Optional[List[UUID]] = None
+    slugs: Optional[List[str]] = None
+    exclude_slugs: Optional[List[str]] = None
+    statuses: Optional[List[str]] = Field(None, description="Tenant statuses to include (default: active)")
+
+class RolloutCreateRequest(BaseModel):
+    master_workflow_id: str
+    selector: TenantSelector = Field(default_factory=TenantSelector)
+    waves: Optional[List[float]] = Field(None, description="Cumulative tenant percentages per wave, e.g. [1, 10, 50, 100]")
+    concurrency: int = Field(ROLLOUT_DEFAULT_CONCURRENCY, ge=1, le=ROLLOUT_MAX_CONCURRENCY)
+    max_failure_ratio: float = Field(ROLLOUT_DEFAULT_MAX_FAILURE_RATIO, ge=0, le=1)
+    wave_delay_seconds: int = Field(ROLLOUT_DEFAULT_WAVE_DELAY_SECONDS, ge=0, le=3600)
+
+class RolloutResumeRequest(BaseModel):
+    retry_failed: bool = True
+
+class RolloutResponse(BaseModel):
+    id: UUID
+    master_workflow_id: str
+    content_hash: str
+    tenant_selector: Dict[str, Any]
+    waves: List[float]
+    current_wave: int
+    concurrency: int
+    max_failure_ratio: float
+    wave_delay_seconds: int
+    status: str
+    status_reason: Optional[str] = None
+    created_by: Optional[str] = None
+    heartbeat_at: Optional[datetime] = None
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    targets: Optional[Dict[str, int]] = None
+    wave_progress: Optional[List[Dict[str, Any]]] = None
+
+class RolloutTargetResponse(BaseModel):
+    tenant_id: UUID
+    tenant_slug: str
+    wave: int
+    status: str
+    action: Optional[str] = None
+    tenant_workflow_id: Optional[str] = None
+    attempts: int
+    error_message: Optional[str] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+
+def require_super_admin(user: AdminUserOrBypass):
+    if not is_super_admin(user):
+        raise HTTPException(status_code=403, detail="Super admin access required")
+
+
+@router.post("/workflow-rollouts")
+async def create_workflow_rollout(
+    request: RolloutCreateRequest,
+    user: AdminUserOrBypass = Depends(get_admin_user_or_bypass)
+) -> RolloutResponse:
+    """Pin a master workflow version, select tenants and start rolling out in waves (Super-Admin only)"""
+    require_super_admin(user)
+
+    conn = await get_db_connection()
+    try:
+        rollout = await create_rollout(
+            conn,
+            request.master_workflow_id,
+            request.selector.model_dump(exclude_none=True, mode="json"),
+            waves=request.waves,
+            concurrency=request.concurrency,
+            max_failure_ratio=request.max_failure_ratio,
+            wave_delay_seconds=request.wave_delay_seconds,
+            created_by=getattr(user, "sub", None)
+        )
+    finally:
+        await conn.close()
+
+    start_rollout(rollout["id"])
+    return RolloutResponse(**rollout)
+
+
+@router.get("/workflow-rollouts")
+async def list_workflow_rollouts(
+    limit: int = Query(50, ge=1, le=200),
+    user: AdminUserOrBypass = Depends(get_admin_user_or_bypass)
+) -> List[RolloutResponse]:
+    """Most recent rollouts first (Super-Admin only)"""
+    require_super_admin(user)
+
+    conn = await get_db_connection()
+    try:
+        return [RolloutResponse(**rollout) for rollout in await list_rollouts(conn, limit)]
+    finally:
+        await conn.close()
+
+
+@router.get("/workflow-rollouts/{rollout_id}")
+async def get_workflow_rollout(
+    rollout_id: UUID,
+    user: AdminUserOrBypass = Depends(get_admin_user_or_bypass)
+) -> RolloutResponse:
+    """Rollout status with per-wave progress (Super-Admin only)"""
+    require_super_admin(user)
+
+    conn = await get_db_connection()
+    try:
+        rollout = await get_rollout(conn, rollout_id)
+    finally:
+        await conn.close()
+
+    if not rollout:
+        raise HTTPException(status_code=404, detail="Rollout not found")
+    return RolloutResponse(**rollout)
+
+
+@router.get("/workflow-rollouts/{rollout_id}/targets")
+async def list_workflow_rollout_targets(
+    rollout_id: UUID,
+    status: Optional[str] = Query(None, description="pending, running, succeeded or failed"),
+    limit: int = Query(200, ge=1, le=1000),
+    user: AdminUserOrBypass = Depends(get_admin_user_or_bypass)
+) -> List[RolloutTargetResponse]:
+    """Per-tenant rollout status (Super-Admin only)"""
+    require_super_admin(user)
+
+    conn = await get_db_connection()
+    try:
+        targets = await list_rollout_targets(conn, rollout_id, status, limit)
+    finally:
+        await conn.close()
+    return [RolloutTargetResponse(**target) for target in targets]
+
+
+@router.post("/workflow-rollouts/{rollout_id}/pause")
+async def pause_workflow_rollout(
+    rollout_id: UUID,
+    user: AdminUserOrBypass = Depends(get_admin_user_or_bypass)
+) -> RolloutResponse:
+    """Stop starting new tenants; tenants in flight finish (Super-Admin only)"""
+    require_super_admin(user)
+
+    conn = await get_db_connection()
+    try:
+        return RolloutResponse(**await set_rollout_status(conn, rollout_id, "pause"))
+    finally:
+        await conn.close()
+
+
+@router.post("/workflow-rollouts/{rollout_id}/resume")
+async def resume_workflow_rollout(
+    rollout_id: UUID,
+    request: RolloutResumeRequest = RolloutResumeRequest(),
+    user: AdminUserOrBypass = Depends(get_admin_user_or_bypass)
+) -> RolloutResponse:
+    """Resume a paused rollout, by default retrying the tenants that failed (Super-Admin only)"""
+    require_super_admin(user)
+
+    conn = await get_db_connection()
+    try:
+        return RolloutResponse(**await set_rollout_status(conn, rollout_id, "resume", request.retry_failed))
+    finally:
+        await conn.close()
+
+
+@router.post("/workflow-rollouts/{rollout_id}/cancel")
+async def cancel_workflow_rollout(
+    rollout_id: UUID,
+    user: AdminUserOrBypass = Depends(get_admin_user_or_bypass)
+) -> RolloutResponse:
+    """Cancel a rollout; tenants already updated keep the new version (Super-Admin only)"""
+    require_super_admin(user)
+
+    conn = await get_db_connection()
+    try:
+        return RolloutResponse(**await set_rollout_status(conn, rollout_id, "cancel"))
+    finally:
+        await conn.close()
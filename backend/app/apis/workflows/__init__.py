@@ -193,12 +193,12 @@ async def get_workflow_executions(
     limit: int = 50,
     offset: int = 0
 ) -> List[WorkflowExecution]:
-    """Get executions for a specific workflow"""
+    """Get executions for a specific workflow (without run data; see GET /workflow-executions/{id})"""
     conn = await get_db_connection()
     try:
         results = await conn.fetch("""
             SELECT id, workflow_id, tenant_id, n8n_execution_id, status,
-                   started_at, finished_at, execution_data, error_message, created_at
+                   started_at, finished_at, error_message, created_at
             FROM workflow_executions
             WHERE workflow_id = $1
             ORDER BY started_at DESC
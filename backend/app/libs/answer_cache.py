@@ -0,0 +1,312 @@
+"""Answer cache for knowledge synthesis.
+
+Synthesis runs at temperature 0.0, so the same (model, prompt, query, context)
+always yields the same answer. This module caches those answers so repeated
+FAQ questions skip the LLM call entirely.
+
+Tiers:
+1. Exact: in-memory LRU keyed by a hash of model, system prompt, normalized
+   query and context, with a TTL. Optionally backed by the
+   ``synthesis_answer_cache`` Postgres table (ANSWER_CACHE_PERSIST=true).
+2. Semantic (opt-in, ANSWER_CACHE_SEMANTIC=true): on an exact miss the query
+   is embedded and compared against cached queries that were answered from the
+   same context; a cosine similarity above ANSWER_CACHE_SIMILARITY reuses the
+   cached answer.
+
+Usage:
+
+    from app.libs.answer_cache import answer_cache
+
+    lookup = await answer_cache.lookup(model, system_prompt, query, context)
+    if lookup.answer is not None:
+        return lookup.answer
+    answer = ...
+    await answer_cache.store(lookup, model, query, answer)
+
+Expired ``synthesis_answer_cache`` rows are deleted by the singleton
+``answer_cache_purge`` maintenance job (``run_answer_cache_purge``). Every
+process drops its own expired in-memory entries in the per-process
+``answer_cache_memory_purge`` job (``run_answer_cache_memory_purge``).
+"""
+
+import asyncio
+import hashlib
+import json
+import math
+import os
+import re
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from app.libs.db_connection import get_db_connection
+
+# Configuration
+ANSWER_CACHE_TTL_SECONDS = int(os.getenv("ANSWER_CACHE_TTL_SECONDS", "86400"))
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "5000"))
+ANSWER_CACHE_PERSIST = os.getenv("ANSWER_CACHE_PERSIST", "false").lower() == "true"
+ANSWER_CACHE_SEMANTIC = os.getenv("ANSWER_CACHE_SEMANTIC", "false").lower() == "true"
+ANSWER_CACHE_SIMILARITY = float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.95"))
+ANSWER_CACHE_EMBEDDING_MODEL = os.getenv("ANSWER_CACHE_EMBEDDING_MODEL", "text-embedding-3-small")
+ANSWER_CACHE_PURGE_BATCH_SIZE = int(os.getenv("ANSWER_CACHE_PURGE_BATCH_SIZE", "1000"))
+ANSWER_CACHE_PURGE_MAX_BATCHES = int(os.getenv("ANSWER_CACHE_PURGE_MAX_BATCHES", "100"))
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_query(query: str) -> str:
+    """Case-fold, collapse whitespace and drop trailing punctuation"""
+    return _WHITESPACE_RE.sub(" ", query.casefold()).strip().rstrip("?!. ")
+
+
+def hash_text(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def make_cache_key(model: str, system_prompt: str, query: str, context: str) -> str:
+    """Stable key over everything that determines a temperature-0 answer"""
+    payload = json.dumps(
+        [model, hash_text(system_prompt), normalize_query(query), hash_text(context)],
+        separators=(",", ":"),
+    )
+    return hash_text(payload)
+
+
+def cosine_similarity(a: List[float], b: List[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm_a = math.sqrt(sum(x * x for x in a))
+    norm_b = math.sqrt(sum(y * y for y in b))
+    if not norm_a or not norm_b:
+        return 0.0
+    return dot / (norm_a * norm_b)
+
+
+class AnswerCacheLookup:
+    """Result of a cache lookup; pass it back to ``store`` on a miss."""
+
+    def __init__(self, key: str, scope: str, answer: Optional[str] = None,
+                 tier: Optional[str] = None, embedding: Optional[List[float]] = None):
+        self.key = key
+        self.scope = scope  # hash of (model, system prompt, context)
+        self.answer = answer
+        self.tier = tier  # 'memory', 'postgres', 'semantic' or None on miss
+        self.embedding = embedding
+
+    @property
+    def hit(self) -> bool:
+        return self.answer is not None
+
+
+class AnswerCache:
+    """In-memory LRU + TTL answer cache with optional Postgres and semantic tiers"""
+
+    def __init__(self, max_entries: int = ANSWER_CACHE_MAX_ENTRIES, ttl_seconds: int = ANSWER_CACHE_TTL_SECONDS,
+                 persist: bool = ANSWER_CACHE_PERSIST, semantic: bool = ANSWER_CACHE_SEMANTIC,
+                 similarity_threshold: float = ANSWER_CACHE_SIMILARITY):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.persist = persist
+        self.semantic = semantic
+        self.similarity_threshold = similarity_threshold
+        # key -> (answer, scope, expires_at)
+        self._entries: "OrderedDict[str, Tuple[str, str, float]]" = OrderedDict()
+        # scope -> {key: query embedding}
+        self._embeddings: Dict[str, Dict[str, List[float]]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _get_memory(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if not entry:
+            return None
+        answer, scope, expires_at = entry
+        if expires_at <= time.time():
+            self._evict(key)
+            return None
+        self._entries.move_to_end(key)
+        return answer
+
+    def _put_memory(self, key: str, scope: str, answer: str, expires_at: Optional[float] = None) -> None:
+        self._entries[key] = (answer, scope, expires_at or time.time() + self.ttl_seconds)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            oldest_key = next(iter(self._entries))
+            self._evict(oldest_key)
+
+    def _evict(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry:
+            scoped = self._embeddings.get(entry[1])
+            if scoped:
+                scoped.pop(key, None)
+                if not scoped:
+                    del self._embeddings[entry[1]]
+
+    async def _embed_query(self, query: str) -> Optional[List[float]]:
+        # Imported lazily: synthesis owns the shared client
+        from app.libs.synthesis import get_openai_client
+        try:
+            client = get_openai_client()
+            response = await client.embeddings.create(
+                model=ANSWER_CACHE_EMBEDDING_MODEL,
+                input=[normalize_query(query)]
+            )
+            return response.data[0].embedding
+        except Exception as e:
+            print(f"ANSWER_CACHE: query embedding failed, semantic tier skipped: {e}")
+            return None
+
+    def _find_similar(self, scope: str, embedding: List[float]) -> Optional[str]:
+        best_key, best_score = None, self.similarity_threshold
+        for key, cached_embedding in self._embeddings.get(scope, {}).items():
+            score = cosine_similarity(embedding, cached_embedding)
+            if score >= best_score:
+                best_key, best_score = key, score
+        return self._get_memory(best_key) if best_key else None
+
+    async def _get_persisted(self, key: str) -> Optional[Tuple[str, str, datetime]]:
+        conn = await get_db_connection()
+        try:
+            row = await conn.fetchrow(
+                """SELECT answer, scope_hash, expires_at FROM synthesis_answer_cache
+                   WHERE cache_key = $1 AND expires_at > NOW()""",
+                key
+            )
+            return (row["answer"], row["scope_hash"], row["expires_at"]) if row else None
+        finally:
+            await conn.close()
+
+    async def _put_persisted(self, key: str, scope: str, model: str, answer: str) -> None:
+        expires_at = datetime.now(timezone.utc) + timedelta(seconds=self.ttl_seconds)
+        conn = await get_db_connection()
+        try:
+            await conn.execute(
+                """INSERT INTO synthesis_answer_cache (cache_key, scope_hash, model, answer, expires_at)
+                   VALUES ($1, $2, $3, $4, $5)
+                   ON CONFLICT (cache_key)
+                   DO UPDATE SET answer = EXCLUDED.answer, expires_at = EXCLUDED.expires_at""",
+                key, scope, model, answer, expires_at
+            )
+        finally:
+            await conn.close()
+
+    async def lookup(self, model: str, system_prompt: str, query: str, context: str) -> AnswerCacheLookup:
+        """Look the answer up in memory, then Postgres, then the semantic tier"""
+        key = make_cache_key(model, system_prompt, query, context)
+        scope = hash_text(json.dumps([model, hash_text(system_prompt), hash_text(context)]))
+        lookup = AnswerCacheLookup(key, scope)
+
+        answer = self._get_memory(key)
+        if answer is not None:
+            lookup.answer, lookup.tier = answer, "memory"
+        elif self.persist:
+            try:
+                persisted = await self._get_persisted(key)
+            except Exception as e:
+                print(f"ANSWER_CACHE: Postgres lookup failed: {e}")
+                persisted = None
+            if persisted:
+                answer, _, expires_at = persisted
+                self._put_memory(key, scope, answer, expires_at.timestamp())
+                lookup.answer, lookup.tier = answer, "postgres"
+
+        if lookup.answer is None and self.semantic and self._embeddings.get(scope):
+            lookup.embedding = await self._embed_query(query)
+            if lookup.embedding:
+                answer = self._find_similar(scope, lookup.embedding)
+                if answer is not None:
+                    lookup.answer, lookup.tier = answer, "semantic"
+
+        if lookup.hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return lookup
+
+    async def store(self, lookup: AnswerCacheLookup, model: str, query: str, answer: str) -> None:
+        """Record a freshly generated answer (best effort, never raises)"""
+        if not answer:
+            return
+        self._put_memory(lookup.key, lookup.scope, answer)
+
+        if self.semantic:
+            embedding = lookup.embedding or await self._embed_query(query)
+            if embedding:
+                self._embeddings.setdefault(lookup.scope, {})[lookup.key] = embedding
+
+        if self.persist:
+            try:
+                await self._put_persisted(lookup.key, lookup.scope, model, answer)
+            except Exception as e:
+                print(f"ANSWER_CACHE: Postgres store failed: {e}")
+
+    def purge_memory(self) -> int:
+        """Drop expired in-memory entries (they are otherwise only dropped when looked up)"""
+        now = time.time()
+        expired = [key for key, (_, _, expires_at) in self._entries.items() if expires_at <= now]
+        for key in expired:
+            self._evict(key)
+        return len(expired)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "persist": self.persist,
+            "semantic": self.semantic,
+        }
+
+
+# Process-wide cache instance
+answer_cache = AnswerCache()
+
+_PURGE_EXPIRED = """
+    WITH deleted AS (
+        DELETE FROM synthesis_answer_cache
+        WHERE cache_key IN (
+            SELECT cache_key FROM synthesis_answer_cache
+            WHERE expires_at <= NOW()
+            LIMIT $1
+        )
+        RETURNING 1
+    )
+    SELECT COUNT(*) FROM deleted
+"""
+
+
+async def run_answer_cache_purge() -> dict:
+    """Maintenance entry point: delete expired persisted answers in bounded batches"""
+    stats = {"rows_purged": 0}
+    conn = await get_db_connection()
+    try:
+        for _ in range(ANSWER_CACHE_PURGE_MAX_BATCHES):
+            deleted = await conn.fetchval(_PURGE_EXPIRED, ANSWER_CACHE_PURGE_BATCH_SIZE)
+            stats["rows_purged"] += deleted
+            if deleted < ANSWER_CACHE_PURGE_BATCH_SIZE:
+                break
+            await asyncio.sleep(0)
+    finally:
+        await conn.close()
+    if stats["rows_purged"]:
+        print(f"ANSWER_CACHE: purged {stats['rows_purged']} expired persisted answers")
+    return stats
+
+
+async def run_answer_cache_memory_purge() -> dict:
+    """Maintenance entry point (per process): drop this process's expired in-memory answers"""
+    return {"memory_entries_purged": answer_cache.purge_memory()}
+
+
+__all__ = [
+    "AnswerCache",
+    "AnswerCacheLookup",
+    "answer_cache",
+    "make_cache_key",
+    "normalize_query",
+    "run_answer_cache_memory_purge",
+    "run_answer_cache_purge",
+]
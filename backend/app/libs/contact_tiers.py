@@ -0,0 +1,210 @@
+"""Hot/cold tiering for contacts.
+
+``contacts_cache`` is the hot tier and ``contacts_archive`` the cold tier of
+record. Lookups read hot first; a contact found only in the archive is
+promoted back into the cache so the next lookup is a single query. Cache rows
+whose last contact and last access are both older than the tenant's
+``hot_ttl_days`` are evicted in batches, after their latest name and contact
+time have been written back to the archive. That keeps the hot table small
+enough to stay resident in shared_buffers.
+
+Per-tier hit/miss counters are kept in process and exposed through ``stats()``.
+
+Usage:
+
+    from app.libs.contact_tiers import contact_tiers
+
+    contact = await contact_tiers.resolve(conn, tenant_id, whatsapp=phone)
+    evicted = await contact_tiers.evict_expired(conn)
+"""
+
+import os
+import time
+from typing import Any, Dict, Optional
+from uuid import UUID
+
+import asyncpg
+
+from app.libs.db_connection import get_db_connection
+
+# Configuration
+CONTACT_EVICTION_BATCH_SIZE = int(os.getenv("CONTACT_EVICTION_BATCH_SIZE", "1000"))
+CONTACT_EVICTION_MAX_BATCHES = int(os.getenv("CONTACT_EVICTION_MAX_BATCHES", "50"))
+# Hot hits refresh last_accessed_at at most this often, so reads rarely write
+CONTACT_TOUCH_INTERVAL_SECONDS = int(os.getenv("CONTACT_TOUCH_INTERVAL_SECONDS", "3600"))
+DEFAULT_HOT_TTL_DAYS = 30
+
+_CONTACT_COLUMNS = "contact_id, tenant_id, whatsapp_number, full_name, metadata, last_contact_timestamp"
+
+
+class ContactTiers:
+    """Hot -> cold contact resolution with promotion, eviction and metrics"""
+
+    def __init__(self):
+        self.hot_hits = 0
+        self.hot_misses = 0
+        self.cold_hits = 0
+        self.cold_misses = 0
+        self.promotions = 0
+        self.evictions = 0
+        self.last_eviction_at: Optional[float] = None
+
+    @staticmethod
+    def _where(contact_id: Optional[str], whatsapp: Optional[str]):
+        if contact_id:
+            return "contact_id = $2", UUID(str(contact_id))
+        return "whatsapp_number = $2", whatsapp
+
+    async def resolve(
+        self,
+        conn: asyncpg.Connection,
+        tenant_id,
+        contact_id: Optional[str] = None,
+        whatsapp: Optional[str] = None,
+        promote: bool = True,
+    ) -> Optional[Dict[str, Any]]:
+        """Find a contact by id or WhatsApp number, promoting cold hits into the cache"""
+        if not contact_id and not whatsapp:
+            return None
+        predicate, value = self._where(contact_id, whatsapp)
+
+        hot = await conn.fetchrow(
+            f"""SELECT {_CONTACT_COLUMNS},
+                       last_accessed_at IS NULL
+                       OR last_accessed_at < NOW() - make_interval(secs => $3) AS stale
+                FROM contacts_cache WHERE tenant_id = $1 AND {predicate}""",
+            tenant_id, value, CONTACT_TOUCH_INTERVAL_SECONDS
+        )
+        if hot:
+            self.hot_hits += 1
+            if hot["stale"]:
+                await conn.execute(
+                    "UPDATE contacts_cache SET last_accessed_at = NOW() WHERE contact_id = $1",
+                    hot["contact_id"]
+                )
+            contact = dict(hot)
+            del contact["stale"]
+            return contact
+        self.hot_misses += 1
+
+        cold = await conn.fetchrow(
+            f"SELECT {_CONTACT_COLUMNS} FROM contacts_archive WHERE tenant_id = $1 AND {predicate}",
+            tenant_id, value
+        )
+        if not cold:
+            self.cold_misses += 1
+            return None
+        self.cold_hits += 1
+
+        if promote:
+            await self.promote(conn, cold)
+        return dict(cold)
+
+    async def promote(self, conn: asyncpg.Connection, contact) -> None:
+        """Copy an archived contact into the cache (no-op if it is already there)"""
+        status = await conn.execute(
+            f"""INSERT INTO contacts_cache ({_CONTACT_COLUMNS}, last_accessed_at)
+                VALUES ($1, $2, $3, $4, $5, $6, NOW())
+                ON CONFLICT DO NOTHING""",
+            contact["contact_id"], contact["tenant_id"], contact["whatsapp_number"],
+            contact["full_name"], contact["metadata"], contact["last_contact_timestamp"]
+        )
+        if status.endswith(" 1"):
+            self.promotions += 1
+
+    async def evict_expired(
+        self,
+        conn: asyncpg.Connection,
+        batch_size: int = CONTACT_EVICTION_BATCH_SIZE,
+        max_batches: int = CONTACT_EVICTION_MAX_BATCHES,
+    ) -> int:
+        """Evict idle cache rows past their tenant's hot_ttl_days, one committed batch at a time"""
+        total = 0
+        for _ in range(max_batches):
+            evicted = await conn.fetchval(
+                f"""WITH victims AS (
+                        SELECT c.contact_id, c.tenant_id, c.whatsapp_number, c.full_name, c.metadata,
+                               c.last_contact_timestamp
+                        FROM contacts_cache c
+                        JOIN tenants t ON t.id = c.tenant_id
+                        WHERE COALESCE(GREATEST(c.last_contact_timestamp, c.last_accessed_at), '-infinity')
+                              < NOW() - make_interval(days => COALESCE(t.hot_ttl_days, {DEFAULT_HOT_TTL_DAYS}))
+                        LIMIT $1
+                        FOR UPDATE OF c SKIP LOCKED
+                    ),
+                    written_back AS (
+                        -- The hot tier carries the latest name, metadata and contact time
+                        UPDATE contacts_archive a
+                        SET full_name = v.full_name,
+                            metadata = COALESCE(v.metadata, a.metadata),
+                            last_contact_timestamp = GREATEST(a.last_contact_timestamp, v.last_contact_timestamp)
+                        FROM victims v
+                        WHERE a.contact_id = v.contact_id
+                        RETURNING a.contact_id
+                    ),
+                    archived AS (
+                        INSERT INTO contacts_archive
+                            (contact_id, tenant_id, whatsapp_number, full_name, metadata, last_contact_timestamp)
+                        SELECT v.contact_id, v.tenant_id, v.whatsapp_number, v.full_name, v.metadata,
+                               v.last_contact_timestamp
+                        FROM victims v
+                        WHERE NOT EXISTS (SELECT 1 FROM contacts_archive a WHERE a.contact_id = v.contact_id)
+                        RETURNING contact_id
+                    ),
+                    evicted AS (
+                        DELETE FROM contacts_cache c USING victims v
+                        WHERE c.contact_id = v.contact_id
+                        RETURNING 1
+                    )
+                    SELECT COUNT(*) FROM evicted""",
+                batch_size
+            )
+            total += evicted
+            if evicted < batch_size:
+                break
+
+        self.evictions += total
+        self.last_eviction_at = time.time()
+        return total
+
+    def stats(self) -> dict:
+        hot_total = self.hot_hits + self.hot_misses
+        cold_total = self.cold_hits + self.cold_misses
+        return {
+            "hot": {
+                "hits": self.hot_hits,
+                "misses": self.hot_misses,
+                "hit_rate": round(self.hot_hits / hot_total, 4) if hot_total else 0.0,
+            },
+            "cold": {
+                "hits": self.cold_hits,
+                "misses": self.cold_misses,
+                "hit_rate": round(self.cold_hits / cold_total, 4) if cold_total else 0.0,
+            },
+            "promotions": self.promotions,
+            "evictions": self.evictions,
+            "last_eviction_at": self.last_eviction_at,
+        }
+
+
+# Process-wide tiering engine
+contact_tiers = ContactTiers()
+
+
+async def run_contact_eviction() -> int:
+    """Maintenance entry point: evict expired hot contacts"""
+    conn = await get_db_connection()
+    try:
+        evicted = await contact_tiers.evict_expired(conn)
+        if evicted:
+            print(f"CONTACT_TIERS: evicted {evicted} idle contacts from contacts_cache")
+        return evicted
+    finally:
+        await conn.close()
+
+
+__all__ = [
+    "ContactTiers",
+    "contact_tiers",
+    "run_contact_eviction",
+]
@@ -0,0 +1,91 @@
+"""Minimal DDSketch: mergeable quantile sketch with relative-error guarantees.
+
+Values are counted in logarithmic buckets: bucket ``i`` covers
+``(gamma^(i-1), gamma^i]`` with ``gamma = (1 + a) / (1 - a)``. Every quantile
+estimate is therefore within relative accuracy ``a`` of the true value. Two
+sketches merge by adding bucket counts, so per-hour sketches can be combined
+into any window without keeping the raw values. Counts can also be
+subtracted, which lets a stored sketch follow an execution that changes
+bucket.
+
+The serialised form is a plain ``{"<bucket index>": count}`` dict, suitable
+for a JSONB column and mergeable in SQL by summing values per key.
+
+Usage:
+
+    from app.libs.ddsketch import DDSketch
+
+    sketch = DDSketch()
+    sketch.add(1250)
+    sketch.merge(DDSketch.from_dict(stored))
+    p99 = sketch.quantile(0.99)
+"""
+
+import math
+from typing import Dict, Optional
+
+# Fixed for stored data: changing it would mis-read existing sketches
+DEFAULT_RELATIVE_ACCURACY = 0.01
+# Smaller values are counted in the bucket of this value
+MIN_VALUE = 1.0
+
+
+class DDSketch:
+    def __init__(self, relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY, counts: Optional[Dict[int, int]] = None):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.counts: Dict[int, int] = dict(counts or {})
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts.values())
+
+    def key(self, value: float) -> int:
+        return math.ceil(math.log(max(value, MIN_VALUE)) / self._log_gamma)
+
+    def value(self, key: int) -> float:
+        """Representative value of a bucket (relative error <= accuracy for the whole bucket)"""
+        return 2 * self.gamma ** key / (self.gamma + 1)
+
+    def add(self, value: float, count: int = 1) -> "DDSketch":
+        key = self.key(value)
+        self.counts[key] = self.counts.get(key, 0) + count
+        if self.counts[key] == 0:
+            del self.counts[key]
+        return self
+
+    def merge(self, other: "DDSketch") -> "DDSketch":
+        if other.gamma != self.gamma:
+            raise ValueError("Cannot merge sketches with different relative accuracy")
+        for key, count in other.counts.items():
+            self.counts[key] = self.counts.get(key, 0) + count
+            if self.counts[key] == 0:
+                del self.counts[key]
+        return self
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimated q-quantile (0 <= q <= 1), or None for an empty sketch"""
+        total = self.count
+        if total <= 0:
+            return None
+        rank = q * (total - 1)
+        seen = 0
+        for key in sorted(self.counts):
+            seen += self.counts[key]
+            if seen > rank:
+                return self.value(key)
+        return self.value(max(self.counts))
+
+    def to_dict(self) -> Dict[str, int]:
+        return {str(key): count for key, count in self.counts.items() if count}
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict], relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY) -> "DDSketch":
+        return cls(relative_accuracy, {int(key): int(count) for key, count in (data or {}).items()})
+
+
+__all__ = [
+    "DDSketch",
+    "DEFAULT_RELATIVE_ACCURACY",
+]
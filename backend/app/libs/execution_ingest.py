@@ -0,0 +1,184 @@
+"""Batched, idempotent ingestion of n8n execution events.
+
+n8n flushes arrays of execution ``start`` / ``finish`` events every few
+seconds. A flush is applied in one transaction:
+
+1. the events are COPYed into a per-connection temp staging table;
+2. one merge statement collapses them per ``n8n_execution_id`` (start and
+   finish of the same run may arrive in one flush), resolves the workflow
+   (by id, by ``n8n_workflow_id`` or from the already-stored execution) and
+   upserts into ``workflow_executions`` on (tenant_id, n8n_execution_id);
+3. the hourly rollups and the out-of-line payloads are updated from the
+   merged rows.
+
+Replaying a flush is a no-op, and a late ``start`` never reopens a finished
+execution. A ``finish`` without ``finished_at`` is stamped with the ingest
+time only when the execution has no finish time yet. Flushes for one tenant are serialised with an advisory lock so the
+rollup deltas are computed against the row each merge actually replaced.
+
+Usage:
+
+    from app.libs.execution_ingest import ingest_execution_events
+
+    result = await ingest_execution_events(conn, tenant_id, events)
+"""
+
+import os
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+from uuid import UUID
+
+import asyncpg
+
+from app.libs.execution_payloads import store_payloads
+from app.libs.execution_rollups import apply_execution_changes
+
+# Configuration
+EXECUTION_INGEST_MAX_EVENTS = int(os.getenv("EXECUTION_INGEST_MAX_EVENTS", "1000"))
+
+STAGING_COLUMNS = [
+    "seq", "n8n_execution_id", "workflow_id", "n8n_workflow_id",
+    "status", "started_at", "finished_at", "finished_at_defaulted", "error_message",
+]
+
+_CREATE_STAGING = """
+    CREATE TEMP TABLE IF NOT EXISTS execution_event_staging (
+        seq INTEGER NOT NULL,
+        n8n_execution_id TEXT NOT NULL,
+        workflow_id UUID,
+        n8n_workflow_id TEXT,
+        status TEXT,
+        started_at TIMESTAMPTZ,
+        finished_at TIMESTAMPTZ,
+        -- finish event without finished_at, stamped with the ingest time
+        finished_at_defaulted BOOLEAN NOT NULL DEFAULT FALSE,
+        error_message TEXT
+    ) ON COMMIT DELETE ROWS
+"""
+
+_MERGE = """
+    WITH batch AS (
+        SELECT n8n_execution_id,
+               (array_agg(workflow_id) FILTER (WHERE workflow_id IS NOT NULL))[1] AS workflow_id,
+               (array_agg(n8n_workflow_id) FILTER (WHERE n8n_workflow_id IS NOT NULL))[1] AS n8n_workflow_id,
+               -- A finish event decides the status over any start event in the same flush
+               (array_agg(status ORDER BY finished_at IS NOT NULL DESC, seq DESC))[1] AS status,
+               MIN(started_at) AS started_at,
+               -- A reported finish time wins over one stamped at ingest
+               COALESCE(MAX(finished_at) FILTER (WHERE NOT finished_at_defaulted), MAX(finished_at)) AS finished_at,
+               (array_agg(error_message ORDER BY seq DESC) FILTER (WHERE error_message IS NOT NULL))[1] AS error_message
+        FROM execution_event_staging
+        GROUP BY n8n_execution_id
+    ),
+    resolved AS (
+        SELECT b.*, COALESCE(w.id, wn.id, ex.workflow_id) AS resolved_workflow_id
+        FROM batch b
+        LEFT JOIN workflows w ON w.id = b.workflow_id AND w.tenant_id = $1
+        LEFT JOIN workflows wn ON b.workflow_id IS NULL AND wn.tenant_id = $1 AND wn.n8n_workflow_id = b.n8n_workflow_id
+        LEFT JOIN workflow_executions ex ON ex.tenant_id = $1 AND ex.n8n_execution_id = b.n8n_execution_id
+    )
+    INSERT INTO workflow_executions AS e
+        (workflow_id, tenant_id, n8n_execution_id, status, started_at, finished_at, error_message)
+    SELECT resolved_workflow_id, $1, n8n_execution_id, status,
+           COALESCE(started_at, finished_at, NOW()), finished_at, error_message
+    FROM resolved
+    WHERE resolved_workflow_id IS NOT NULL
+    ON CONFLICT (tenant_id, n8n_execution_id) WHERE n8n_execution_id IS NOT NULL DO UPDATE SET
+        status = CASE WHEN EXCLUDED.finished_at IS NULL AND e.finished_at IS NOT NULL
+                      THEN e.status ELSE EXCLUDED.status END,
+        started_at = LEAST(e.started_at, EXCLUDED.started_at),
+        -- A stamped finish time never replaces a stored one, so replaying a flush leaves it unchanged
+        finished_at = CASE WHEN e.finished_at IS NOT NULL AND NOT EXISTS (
+                               SELECT 1 FROM execution_event_staging s
+                               WHERE s.n8n_execution_id = EXCLUDED.n8n_execution_id
+                                 AND s.finished_at IS NOT NULL AND NOT s.finished_at_defaulted
+                           )
+                           THEN e.finished_at
+                           ELSE COALESCE(EXCLUDED.finished_at, e.finished_at) END,
+        error_message = COALESCE(EXCLUDED.error_message, e.error_message)
+    RETURNING e.id, e.workflow_id, e.tenant_id, e.n8n_execution_id, e.status,
+              e.started_at, e.finished_at, (xmax = 0) AS inserted
+"""
+
+
+def _aware(value: datetime) -> datetime:
+    return value.replace(tzinfo=timezone.utc) if value and value.tzinfo is None else value
+
+
+def staging_record(seq: int, event: Dict[str, Any]) -> tuple:
+    """Staging row for one event; defaults status from the event type"""
+    finished_at = _aware(event.get("finished_at"))
+    started_at = _aware(event.get("started_at"))
+    if event.get("event") == "start" and started_at is None:
+        started_at = datetime.now(timezone.utc)
+    finished_at_defaulted = event.get("event") == "finish" and finished_at is None
+    if finished_at_defaulted:
+        finished_at = datetime.now(timezone.utc)
+
+    status = event.get("status")
+    if status is None:
+        if finished_at is None:
+            status = "running"
+        else:
+            status = "error" if event.get("error_message") else "success"
+
+    return (
+        seq,
+        event["n8n_execution_id"],
+        UUID(str(event["workflow_id"])) if event.get("workflow_id") else None,
+        event.get("n8n_workflow_id"),
+        status,
+        started_at,
+        finished_at,
+        finished_at_defaulted,
+        event.get("error_message"),
+    )
+
+
+async def ingest_execution_events(conn: asyncpg.Connection, tenant_id, events: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Upsert a batch of start/finish events for one tenant; returns merge counts and rejects"""
+    records = [staging_record(seq, event) for seq, event in enumerate(events)]
+    execution_ids = sorted({record[1] for record in records})
+    # Last payload sent for each execution wins
+    payloads = {event["n8n_execution_id"]: event["execution_data"] for event in events if event.get("execution_data") is not None}
+
+    async with conn.transaction():
+        await conn.execute("SELECT pg_advisory_xact_lock(hashtext('execution_ingest:' || $1::text))", str(tenant_id))
+        await conn.execute(_CREATE_STAGING)
+        await conn.copy_records_to_table("execution_event_staging", records=records, columns=STAGING_COLUMNS)
+
+        previous = {
+            row["n8n_execution_id"]: row
+            for row in await conn.fetch(
+                """SELECT n8n_execution_id, tenant_id, workflow_id, status, started_at, finished_at
+                   FROM workflow_executions
+                   WHERE tenant_id = $1 AND n8n_execution_id = ANY($2::text[])
+                   FOR UPDATE""",
+                tenant_id, execution_ids
+            )
+        }
+        merged = await conn.fetch(_MERGE, tenant_id)
+
+        await apply_execution_changes(conn, [(previous.get(row["n8n_execution_id"]), row) for row in merged])
+        by_execution = {row["n8n_execution_id"]: row["id"] for row in merged}
+        await store_payloads(
+            conn,
+            [(by_execution[n8n_id], data) for n8n_id, data in payloads.items() if n8n_id in by_execution]
+        )
+
+    rejected = [n8n_id for n8n_id in execution_ids if n8n_id not in by_execution]
+    inserted = sum(1 for row in merged if row["inserted"])
+    return {
+        "events": len(events),
+        "executions": len(merged),
+        "inserted": inserted,
+        "updated": len(merged) - inserted,
+        "rejected": [{"n8n_execution_id": n8n_id, "reason": "unknown workflow"} for n8n_id in rejected],
+    }
+
+
+__all__ = [
+    "EXECUTION_INGEST_MAX_EVENTS",
+    "ingest_execution_events",
+    "staging_record",
+]
@@ -0,0 +1,174 @@
+"""Compressed, out-of-line storage for workflow execution payloads.
+
+n8n run data can be hundreds of KB per execution. Keeping it inline in
+``workflow_executions.execution_data`` made every listing and stats scan
+drag it through the buffer cache. Payloads now live in
+``workflow_execution_payloads``, one compressed BYTEA per execution, and are
+read only when a single execution (or an explicit ``fields=execution_data``
+listing) asks for them.
+
+Payloads are compressed with zstd when the optional ``zstandard`` package is
+installed, and with zlib otherwise. The codec is stored per row, so either
+build can read what the other wrote, except that zstd rows need
+``zstandard``. The column uses EXTERNAL storage because the data is already
+compressed and TOAST should not try again.
+
+Executions written before this existed are moved out of line in batches by
+the ``execution_payload_offload`` maintenance job.
+
+Usage:
+
+    from app.libs.execution_payloads import store_payload, load_payload
+
+    await store_payload(conn, execution_id, run_data)
+    run_data = await load_payload(conn, execution_id)
+"""
+
+import json
+import os
+import zlib
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import asyncpg
+
+from app.libs.db_connection import get_db_connection
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+    zstandard = None
+
+# Configuration
+EXECUTION_PAYLOAD_ZSTD_LEVEL = int(os.getenv("EXECUTION_PAYLOAD_ZSTD_LEVEL", "3"))
+EXECUTION_PAYLOAD_ZLIB_LEVEL = int(os.getenv("EXECUTION_PAYLOAD_ZLIB_LEVEL", "6"))
+EXECUTION_PAYLOAD_OFFLOAD_BATCH_SIZE = int(os.getenv("EXECUTION_PAYLOAD_OFFLOAD_BATCH_SIZE", "200"))
+EXECUTION_PAYLOAD_OFFLOAD_MAX_BATCHES = int(os.getenv("EXECUTION_PAYLOAD_OFFLOAD_MAX_BATCHES", "25"))
+
+CODEC_ZSTD = "zstd"
+CODEC_ZLIB = "zlib"
+
+
+def encode_payload(data: Any) -> Tuple[str, int, bytes]:
+    """Serialise and compress a payload; returns (codec, raw_size, blob)"""
+    raw = json.dumps(data, separators=(",", ":"), default=str).encode()
+    if ZSTD_AVAILABLE:
+        blob = zstandard.ZstdCompressor(level=EXECUTION_PAYLOAD_ZSTD_LEVEL).compress(raw)
+        return CODEC_ZSTD, len(raw), blob
+    return CODEC_ZLIB, len(raw), zlib.compress(raw, EXECUTION_PAYLOAD_ZLIB_LEVEL)
+
+
+def decode_payload(codec: str, blob: bytes) -> Any:
+    if codec == CODEC_ZSTD:
+        if not ZSTD_AVAILABLE:
+            raise RuntimeError("Execution payload is zstd-compressed but the zstandard package is not installed")
+        raw = zstandard.ZstdDecompressor().decompress(blob)
+    elif codec == CODEC_ZLIB:
+        raw = zlib.decompress(blob)
+    else:
+        raise ValueError(f"Unknown execution payload codec: {codec}")
+    return json.loads(raw)
+
+
+async def store_payload(conn: asyncpg.Connection, execution_id, data: Optional[Any]) -> None:
+    """Replace an execution's payload (None removes it)"""
+    if data is None:
+        await conn.execute("DELETE FROM workflow_execution_payloads WHERE execution_id = $1", execution_id)
+        return
+    await store_payloads(conn, [(execution_id, data)])
+
+
+async def store_payloads(conn: asyncpg.Connection, items: Iterable[Tuple[Any, Any]]) -> None:
+    """Replace the payloads of many executions; ``items`` are (execution_id, data) pairs"""
+    rows = [(execution_id, *encode_payload(data)) for execution_id, data in items if data is not None]
+    if rows:
+        await conn.executemany(
+            """INSERT INTO workflow_execution_payloads (execution_id, codec, raw_size, payload)
+               VALUES ($1, $2, $3, $4)
+               ON CONFLICT (execution_id) DO UPDATE SET
+                   codec = EXCLUDED.codec,
+                   raw_size = EXCLUDED.raw_size,
+                   payload = EXCLUDED.payload,
+                   updated_at = NOW()""",
+            rows
+        )
+
+
+async def load_payloads(conn: asyncpg.Connection, execution_ids: Iterable) -> Dict[Any, Any]:
+    """Decoded payloads for the given executions (missing ones are absent from the result)"""
+    rows = await conn.fetch(
+        "SELECT execution_id, codec, payload FROM workflow_execution_payloads WHERE execution_id = ANY($1::uuid[])",
+        list(execution_ids)
+    )
+    return {row["execution_id"]: decode_payload(row["codec"], row["payload"]) for row in rows}
+
+
+async def load_payload(conn: asyncpg.Connection, execution_id) -> Optional[Any]:
+    row = await conn.fetchrow(
+        "SELECT codec, payload FROM workflow_execution_payloads WHERE execution_id = $1",
+        execution_id
+    )
+    return decode_payload(row["codec"], row["payload"]) if row else None
+
+
+async def offload_inline_payloads(
+    conn: asyncpg.Connection,
+    batch_size: int = EXECUTION_PAYLOAD_OFFLOAD_BATCH_SIZE,
+    max_batches: int = EXECUTION_PAYLOAD_OFFLOAD_MAX_BATCHES,
+) -> int:
+    """Move inline execution_data into the payload table, one committed batch at a time"""
+    moved = 0
+    for _ in range(max_batches):
+        async with conn.transaction():
+            rows = await conn.fetch(
+                """SELECT id, execution_data::text AS execution_data
+                   FROM workflow_executions
+                   WHERE execution_data IS NOT NULL
+                   LIMIT $1
+                   FOR UPDATE SKIP LOCKED""",
+                batch_size
+            )
+            if not rows:
+                break
+            encoded = [(row["id"], *encode_payload(json.loads(row["execution_data"]))) for row in rows]
+            # Payloads written through the API since are newer than the inline copy
+            await conn.executemany(
+                """INSERT INTO workflow_execution_payloads (execution_id, codec, raw_size, payload)
+                   VALUES ($1, $2, $3, $4)
+                   ON CONFLICT (execution_id) DO NOTHING""",
+                encoded
+            )
+            await conn.execute(
+                "UPDATE workflow_executions SET execution_data = NULL WHERE id = ANY($1::uuid[])",
+                [row["id"] for row in rows]
+            )
+        moved += len(rows)
+        if len(rows) < batch_size:
+            break
+    return moved
+
+
+async def run_payload_offload() -> int:
+    """Maintenance entry point: move legacy inline payloads out of line"""
+    conn = await get_db_connection()
+    try:
+        moved = await offload_inline_payloads(conn)
+        if moved:
+            print(f"EXECUTION_PAYLOADS: moved {moved} inline payloads to workflow_execution_payloads")
+        return moved
+    finally:
+        await conn.close()
+
+
+__all__ = [
+    "ZSTD_AVAILABLE",
+    "decode_payload",
+    "encode_payload",
+    "load_payload",
+    "load_payloads",
+    "offload_inline_payloads",
+    "run_payload_offload",
+    "store_payload",
+    "store_payloads",
+]
@@ -0,0 +1,183 @@
+"""Retention and downsampling of workflow execution history.
+
+Execution history ages through three stages, per tenant:
+
+- younger than ``execution_detail_days``: full detail, payload included;
+- up to ``execution_retention_days``: summary row only (status, timings,
+  error), the compressed payload is dropped;
+- older: the row is deleted. Its contribution to the hourly stats already
+  lives in ``workflow_execution_rollups`` (maintained as executions are
+  written), so deleting raw rows never changes reported statistics.
+
+Rollup rows older than EXECUTION_ROLLUP_HOURLY_DAYS are folded from hourly
+into daily buckets (counts and durations summed, sketches merged), which
+bounds the rollup table as well.
+
+Every phase deletes in bounded, separately committed batches so the job can
+run alongside production traffic.
+
+Usage:
+
+    from app.libs.execution_retention import run_execution_retention
+
+    stats = await run_execution_retention()
+"""
+
+import asyncio
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Dict
+
+import asyncpg
+
+from app.libs.db_connection import get_db_connection
+
+# Configuration
+EXECUTION_DETAIL_DAYS = int(os.getenv("EXECUTION_DETAIL_DAYS", "14"))
+EXECUTION_RETENTION_DAYS = int(os.getenv("EXECUTION_RETENTION_DAYS", "90"))
+EXECUTION_ROLLUP_HOURLY_DAYS = int(os.getenv("EXECUTION_ROLLUP_HOURLY_DAYS", "180"))
+EXECUTION_RETENTION_BATCH_SIZE = int(os.getenv("EXECUTION_RETENTION_BATCH_SIZE", "1000"))
+# Per phase and tenant per run, so one huge tenant cannot monopolise a run
+EXECUTION_RETENTION_MAX_BATCHES = int(os.getenv("EXECUTION_RETENTION_MAX_BATCHES", "50"))
+EXECUTION_RETENTION_BATCH_PAUSE_SECONDS = float(os.getenv("EXECUTION_RETENTION_BATCH_PAUSE_SECONDS", "0.05"))
+
+_DROP_PAYLOADS = """
+    WITH expired AS (
+        SELECT p.execution_id
+        FROM workflow_execution_payloads p
+        JOIN workflow_executions e ON e.id = p.execution_id
+        WHERE e.tenant_id = $1 AND e.started_at < $2
+        LIMIT $3
+    ),
+    deleted AS (
+        DELETE FROM workflow_execution_payloads p USING expired x
+        WHERE p.execution_id = x.execution_id
+        RETURNING 1
+    )
+    SELECT COUNT(*) FROM deleted
+"""
+
+# Payloads not yet moved out of line by the offload job
+_DROP_INLINE_PAYLOADS = """
+    WITH cleared AS (
+        UPDATE workflow_executions SET execution_data = NULL
+        WHERE id IN (
+            SELECT id FROM workflow_executions
+            WHERE tenant_id = $1 AND started_at < $2 AND execution_data IS NOT NULL
+            LIMIT $3
+        )
+        RETURNING 1
+    )
+    SELECT COUNT(*) FROM cleared
+"""
+
+_DELETE_EXECUTIONS = """
+    WITH deleted AS (
+        DELETE FROM workflow_executions
+        WHERE id IN (
+            SELECT id FROM workflow_executions
+            WHERE tenant_id = $1 AND started_at < $2
+            LIMIT $3
+        )
+        RETURNING 1
+    )
+    SELECT COUNT(*) FROM deleted
+"""
+
+_DAY_BUCKET = "date_trunc('day', bucket AT TIME ZONE 'UTC') AT TIME ZONE 'UTC'"
+
+_FOLD_ROLLUPS = f"""
+    WITH hourly AS (
+        DELETE FROM workflow_execution_rollups
+        WHERE (tenant_id, workflow_id, bucket, status) IN (
+            SELECT tenant_id, workflow_id, bucket, status
+            FROM workflow_execution_rollups
+            WHERE bucket < $1 AND bucket <> {_DAY_BUCKET}
+            LIMIT $2
+        )
+        RETURNING *
+    ),
+    daily AS (
+        INSERT INTO workflow_execution_rollups AS r
+            (tenant_id, workflow_id, bucket, status, executions, duration_ms_sum, duration_count, duration_sketch)
+        SELECT tenant_id, workflow_id, {_DAY_BUCKET}, status,
+               SUM(executions), SUM(duration_ms_sum), SUM(duration_count), ddsketch_merge_agg(duration_sketch)
+        FROM hourly
+        GROUP BY tenant_id, workflow_id, {_DAY_BUCKET}, status
+        ON CONFLICT (tenant_id, workflow_id, bucket, status) DO UPDATE SET
+            executions = r.executions + EXCLUDED.executions,
+            duration_ms_sum = r.duration_ms_sum + EXCLUDED.duration_ms_sum,
+            duration_count = r.duration_count + EXCLUDED.duration_count,
+            duration_sketch = ddsketch_merge(r.duration_sketch, EXCLUDED.duration_sketch),
+            updated_at = NOW()
+    )
+    SELECT COUNT(*) FROM hourly
+"""
+
+
+async def _run_batches(conn: asyncpg.Connection, query: str, *args) -> int:
+    """Repeat a bounded batch statement until it comes up short; returns rows affected"""
+    total = 0
+    for _ in range(EXECUTION_RETENTION_MAX_BATCHES):
+        affected = await conn.fetchval(query, *args, EXECUTION_RETENTION_BATCH_SIZE)
+        total += affected
+        if affected < EXECUTION_RETENTION_BATCH_SIZE:
+            break
+        await asyncio.sleep(EXECUTION_RETENTION_BATCH_PAUSE_SECONDS)
+    return total
+
+
+async def apply_tenant_retention(conn: asyncpg.Connection, tenant_id, detail_days: int, retention_days: int) -> Dict[str, int]:
+    now = datetime.now(timezone.utc)
+    detail_cutoff = now - timedelta(days=detail_days)
+    retention_cutoff = now - timedelta(days=max(retention_days, detail_days))
+    return {
+        "executions_deleted": await _run_batches(conn, _DELETE_EXECUTIONS, tenant_id, retention_cutoff),
+        "payloads_dropped": (
+            await _run_batches(conn, _DROP_PAYLOADS, tenant_id, detail_cutoff)
+            + await _run_batches(conn, _DROP_INLINE_PAYLOADS, tenant_id, detail_cutoff)
+        ),
+    }
+
+
+async def fold_hourly_rollups(conn: asyncpg.Connection, older_than_days: int = EXECUTION_ROLLUP_HOURLY_DAYS) -> int:
+    """Fold hourly rollup rows older than the cutoff into daily rows; returns hourly rows folded"""
+    cutoff = datetime.now(timezone.utc) - timedelta(days=older_than_days)
+    # Only whole days, so a day is never left half hourly, half daily
+    cutoff = cutoff.replace(hour=0, minute=0, second=0, microsecond=0)
+    return await _run_batches(conn, _FOLD_ROLLUPS, cutoff)
+
+
+async def run_execution_retention() -> Dict[str, int]:
+    """Maintenance entry point: apply every tenant's retention policy, then downsample rollups"""
+    conn = await get_db_connection()
+    try:
+        tenants = await conn.fetch(
+            """SELECT id,
+                      COALESCE(execution_detail_days, $1) AS detail_days,
+                      COALESCE(execution_retention_days, $2) AS retention_days
+               FROM tenants""",
+            EXECUTION_DETAIL_DAYS, EXECUTION_RETENTION_DAYS
+        )
+        totals = {"tenants": len(tenants), "executions_deleted": 0, "payloads_dropped": 0}
+        for tenant in tenants:
+            stats = await apply_tenant_retention(conn, tenant["id"], tenant["detail_days"], tenant["retention_days"])
+            totals["executions_deleted"] += stats["executions_deleted"]
+            totals["payloads_dropped"] += stats["payloads_dropped"]
+        totals["rollup_rows_folded"] = await fold_hourly_rollups(conn)
+
+        if totals["executions_deleted"] or totals["payloads_dropped"] or totals["rollup_rows_folded"]:
+            print(
+                f"EXECUTION_RETENTION: deleted {totals['executions_deleted']} executions, "
+                f"dropped {totals['payloads_dropped']} payloads, folded {totals['rollup_rows_folded']} hourly rollups"
+            )
+        return totals
+    finally:
+        await conn.close()
+
+
+__all__ = [
+    "apply_tenant_retention",
+    "fold_hourly_rollups",
+    "run_execution_retention",
+]
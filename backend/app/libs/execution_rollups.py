@@ -0,0 +1,252 @@
+"""Hourly rollups of workflow execution statistics.
+
+Every execution contributes to exactly one ``workflow_execution_rollups`` row,
+keyed by (tenant_id, workflow_id, UTC hour of started_at, status). That row
+holds an execution count, a duration sum and count for finished executions,
+and a DDSketch of those durations so p50/p90/p99 for any window come from
+merging hourly sketches. Writers report each change as an (old row, new row) pair, and
+``apply_execution_change`` moves the execution's contribution from its old
+bucket to its new one. For example, a ``running`` -> ``success`` update
+decrements the running count and adds the duration to the success bucket.
+
+Stats endpoints read the rollup, which holds at most one row per workflow per
+hour per status, instead of aggregating raw executions.
+
+The retention job folds old hourly rows into daily ones (bucket = UTC
+midnight). An execution can outlive its hourly row when the tenant keeps
+executions longer than EXECUTION_ROLLUP_HOURLY_DAYS, so a change that removes
+a contribution whose hourly row is gone applies it to the day row instead.
+
+Usage:
+
+    from app.libs.execution_rollups import apply_execution_change, summarize_executions
+
+    await apply_execution_change(conn, old_row, new_row)
+    stats = await summarize_executions(conn, days=30, tenant_id=tenant_id)
+    slowest = await workflow_latency(conn, days=1, tenant_id=tenant_id)
+"""
+
+import json
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import asyncpg
+
+from app.libs.ddsketch import DDSketch
+
+PERCENTILES = (("p50", 0.5), ("p90", 0.9), ("p99", 0.99))
+
+# $9: the delta removes a contribution; if its hourly row was folded away, it lives in the day row
+_UPSERT_ROLLUP = """
+    INSERT INTO workflow_execution_rollups AS r
+        (tenant_id, workflow_id, bucket, status, executions, duration_ms_sum, duration_count, duration_sketch)
+    VALUES (
+        $1, $2,
+        CASE WHEN $9::boolean AND NOT EXISTS (
+                 SELECT 1 FROM workflow_execution_rollups
+                 WHERE tenant_id = $1 AND workflow_id = $2 AND bucket = $3 AND status = $4
+             )
+             THEN date_trunc('day', $3 AT TIME ZONE 'UTC') AT TIME ZONE 'UTC'
+             ELSE $3
+        END,
+        $4, $5, $6, $7, $8::jsonb
+    )
+    ON CONFLICT (tenant_id, workflow_id, bucket, status) DO UPDATE SET
+        executions = r.executions + EXCLUDED.executions,
+        duration_ms_sum = r.duration_ms_sum + EXCLUDED.duration_ms_sum,
+        duration_count = r.duration_count + EXCLUDED.duration_count,
+        duration_sketch = ddsketch_merge(r.duration_sketch, EXCLUDED.duration_sketch),
+        updated_at = NOW()
+"""
+
+# UTC hour of a timestamptz, independent of the session time zone
+HOUR_BUCKET_SQL = "date_trunc('hour', {column} AT TIME ZONE 'UTC') AT TIME ZONE 'UTC'"
+
+
+def hour_bucket(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+
+def duration_ms(row) -> Optional[int]:
+    if row["finished_at"] is None or row["started_at"] is None:
+        return None
+    return max(0, round((row["finished_at"] - row["started_at"]).total_seconds() * 1000))
+
+
+def _contribution(row) -> Optional[Tuple[tuple, Optional[int]]]:
+    if row is None or row["started_at"] is None:
+        return None
+    key = (row["tenant_id"], row["workflow_id"], hour_bucket(row["started_at"]), row["status"] or "running")
+    return key, duration_ms(row)
+
+
+async def apply_execution_change(conn: asyncpg.Connection, old=None, new=None) -> None:
+    """Move one execution's contribution from ``old`` to ``new`` (either may be None).
+
+    Call it in the same transaction as the write to workflow_executions.
+    """
+    await apply_execution_changes(conn, [(old, new)])
+
+
+async def apply_execution_changes(conn: asyncpg.Connection, changes: Iterable[Tuple[Any, Any]]) -> None:
+    """Apply many (old, new) changes with one upsert per touched rollup row"""
+    deltas: Dict[tuple, list] = {}
+    for old, new in changes:
+        for row, sign in ((old, -1), (new, 1)):
+            contribution = _contribution(row)
+            if contribution is None:
+                continue
+            key, duration = contribution
+            delta = deltas.setdefault(key, [0, 0, 0, DDSketch(), False])
+            delta[0] += sign
+            delta[4] = delta[4] or sign < 0
+            if duration is not None:
+                delta[1] += sign * duration
+                delta[2] += sign
+                delta[3].add(duration, sign)
+
+    rows = [
+        (*key, executions, duration_sum, duration_count, json.dumps(sketch.to_dict()), removes)
+        for key, (executions, duration_sum, duration_count, sketch, removes) in deltas.items()
+        if executions or duration_sum or duration_count or sketch.counts
+    ]
+    if rows:
+        await conn.executemany(_UPSERT_ROLLUP, rows)
+
+
+def _filters(tenant_id: Optional[str], workflow_id: Optional[str], params: list, alias: str = "") -> str:
+    conditions = []
+    if tenant_id:
+        params.append(tenant_id)
+        conditions.append(f"{alias}tenant_id = ${len(params)}")
+    if workflow_id:
+        params.append(workflow_id)
+        conditions.append(f"{alias}workflow_id = ${len(params)}")
+    return "".join(f" AND {condition}" for condition in conditions)
+
+
+async def summarize_executions(
+    conn: asyncpg.Connection,
+    days: int,
+    tenant_id: Optional[str] = None,
+    workflow_id: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Totals over the last ``days`` days (whole UTC hours)"""
+    params: list = [days]
+    extra = _filters(tenant_id, workflow_id, params, alias="r.")
+    since = f"r.bucket >= {HOUR_BUCKET_SQL.format(column='NOW()')} - make_interval(days => $1)"
+    row = await conn.fetchrow(
+        f"""SELECT COALESCE(SUM(executions), 0) AS total_executions,
+                   COALESCE(SUM(executions) FILTER (WHERE status = 'success'), 0) AS successful,
+                   COALESCE(SUM(executions) FILTER (WHERE status = 'error'), 0) AS failed,
+                   COALESCE(SUM(executions) FILTER (WHERE status = 'running'), 0) AS running,
+                   SUM(duration_ms_sum)::bigint AS duration_ms_sum,
+                   SUM(duration_count) AS duration_count
+            FROM workflow_execution_rollups r
+            WHERE {since}{extra}""",
+        *params
+    )
+    # Merge the hourly sketches in the database; only the merged buckets come back
+    sketch_rows = await conn.fetch(
+        f"""SELECT s.key, SUM(s.value::bigint) AS count
+            FROM workflow_execution_rollups r, jsonb_each_text(r.duration_sketch) s
+            WHERE {since}{extra}
+            GROUP BY s.key""",
+        *params
+    )
+    sketch = DDSketch.from_dict({row["key"]: row["count"] for row in sketch_rows})
+    return {**_shape(row), **percentiles_seconds(sketch)}
+
+
+async def workflow_latency(
+    conn: asyncpg.Connection,
+    days: int,
+    tenant_id: Optional[str] = None,
+    min_executions: int = 1,
+    limit: int = 50,
+) -> List[Dict[str, Any]]:
+    """Per-workflow duration percentiles over the last ``days`` days, slowest p99 first"""
+    params: list = [days]
+    extra = _filters(tenant_id, None, params, alias="r.")
+    rows = await conn.fetch(
+        f"""SELECT r.workflow_id, s.key, SUM(s.value::bigint) AS count
+            FROM workflow_execution_rollups r, jsonb_each_text(r.duration_sketch) s
+            WHERE r.bucket >= {HOUR_BUCKET_SQL.format(column='NOW()')} - make_interval(days => $1){extra}
+            GROUP BY r.workflow_id, s.key""",
+        *params
+    )
+    sketches: Dict[Any, DDSketch] = defaultdict(DDSketch)
+    for row in rows:
+        sketches[row["workflow_id"]].counts[int(row["key"])] = row["count"]
+
+    results = [
+        {"workflow_id": str(workflow_id), "finished_executions": sketch.count, **percentiles_seconds(sketch)}
+        for workflow_id, sketch in sketches.items()
+        if sketch.count >= min_executions
+    ]
+    results.sort(key=lambda item: item["p99_seconds"] or 0, reverse=True)
+    return results[:limit]
+
+
+def percentiles_seconds(sketch: DDSketch) -> Dict[str, Optional[float]]:
+    """p50/p90/p99 of a millisecond duration sketch, in seconds"""
+    result = {}
+    for name, q in PERCENTILES:
+        value = sketch.quantile(q)
+        result[f"{name}_seconds"] = round(value / 1000, 3) if value is not None else None
+    return result
+
+
+async def execution_timeseries(
+    conn: asyncpg.Connection,
+    hours: int,
+    tenant_id: Optional[str] = None,
+    workflow_id: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """One point per UTC hour for the last ``hours`` hours, zero-filled"""
+    params: list = [hours]
+    extra = _filters(tenant_id, workflow_id, params, alias="r.")
+    current_hour = HOUR_BUCKET_SQL.format(column="NOW()")
+    rows = await conn.fetch(
+        f"""SELECT h.bucket,
+                   COALESCE(SUM(r.executions), 0) AS total_executions,
+                   COALESCE(SUM(r.executions) FILTER (WHERE r.status = 'success'), 0) AS successful,
+                   COALESCE(SUM(r.executions) FILTER (WHERE r.status = 'error'), 0) AS failed,
+                   COALESCE(SUM(r.executions) FILTER (WHERE r.status = 'running'), 0) AS running,
+                   SUM(r.duration_ms_sum)::bigint AS duration_ms_sum,
+                   SUM(r.duration_count) AS duration_count
+            FROM generate_series({current_hour} - make_interval(hours => $1 - 1), {current_hour}, INTERVAL '1 hour') AS h(bucket)
+            LEFT JOIN workflow_execution_rollups r ON r.bucket = h.bucket{extra}
+            GROUP BY h.bucket
+            ORDER BY h.bucket""",
+        *params
+    )
+    return [{"bucket": row["bucket"], **_shape(row)} for row in rows]
+
+
+def _shape(row) -> Dict[str, Any]:
+    total = row["total_executions"]
+    duration_count = row["duration_count"] or 0
+    return {
+        "total_executions": total,
+        "successful": row["successful"],
+        "failed": row["failed"],
+        "running": row["running"],
+        "success_rate": round((row["successful"] / total) * 100, 2) if total > 0 else 0,
+        "avg_duration_seconds": round(row["duration_ms_sum"] / duration_count / 1000, 2) if duration_count else 0,
+    }
+
+
+__all__ = [
+    "HOUR_BUCKET_SQL",
+    "apply_execution_change",
+    "apply_execution_changes",
+    "execution_timeseries",
+    "hour_bucket",
+    "percentiles_seconds",
+    "summarize_executions",
+    "workflow_latency",
+]
@@ -0,0 +1,199 @@
+"""Streaming HTML to Markdown conversion.
+
+``HTMLMarkdownConverter`` wraps the stdlib ``HTMLParser`` so HTML can be fed in
+arbitrary chunks as it is downloaded; each ``feed`` returns the markdown that
+became complete. Boilerplate (scripts, styles, navigation, headers, footers,
+forms, asides) is dropped.
+
+Usage:
+
+    converter = HTMLMarkdownConverter()
+    for chunk in html_chunks:
+        parts.append(converter.feed(chunk))
+    parts.append(converter.close())
+    title = converter.title
+"""
+
+import re
+from html.parser import HTMLParser
+from typing import List, Optional
+
+# Elements whose whole subtree is skipped
+BOILERPLATE_TAGS = {
+    "script", "style", "noscript", "template", "svg", "canvas", "iframe",
+    "nav", "header", "footer", "aside", "form", "button", "select", "head",
+}
+VOID_TAGS = {"br", "hr", "img", "input", "meta", "link", "area", "base", "col", "embed", "source", "wbr"}
+BLOCK_TAGS = {"p", "div", "section", "article", "main", "table", "tr", "ul", "ol", "dl", "figure", "figcaption"}
+HEADING_LEVELS = {"h1": 1, "h2": 2, "h3": 3, "h4": 4, "h5": 5, "h6": 6}
+
+_SPACE_RE = re.compile(r"[ \t\r\n\f\v]+")
+_BLANK_LINES_RE = re.compile(r"\n{3,}")
+
+
+class HTMLMarkdownConverter(HTMLParser):
+    """Incremental HTML -> Markdown converter"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.title: Optional[str] = None
+        self._out: List[str] = []
+        # Boilerplate element being skipped and how many of that tag are open
+        self._skip_tag: Optional[str] = None
+        self._skip_depth = 0
+        self._in_title = False
+        self._title_parts: List[str] = []
+        self._pre_depth = 0
+        self._list_stack: List[List] = []  # [tag, item counter]
+        self._href_stack: List[Optional[str]] = []
+        self._pending_newlines = 0
+        self._line_started = False
+        self._has_output = False
+
+    # Output helpers
+
+    def _newlines(self, count: int) -> None:
+        if self._has_output:
+            self._pending_newlines = max(self._pending_newlines, count)
+        self._line_started = False
+
+    def _write(self, text: str) -> None:
+        if not text:
+            return
+        if self._pending_newlines:
+            self._out.append("\n" * self._pending_newlines)
+            self._pending_newlines = 0
+        self._out.append(text)
+        self._line_started = True
+        self._has_output = True
+
+    def _drain(self) -> str:
+        markdown = "".join(self._out)
+        self._out = []
+        return _BLANK_LINES_RE.sub("\n\n", markdown)
+
+    # HTMLParser callbacks
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "title":
+            self._in_title = True
+            return
+        if self._skip_tag:
+            # Only the skipped tag is counted: inner <li>/<p> are often left unclosed
+            if tag == self._skip_tag:
+                self._skip_depth += 1
+            return
+        if tag in BOILERPLATE_TAGS:
+            self._skip_tag = tag
+            self._skip_depth = 1
+            return
+
+        if tag in HEADING_LEVELS:
+            self._newlines(2)
+            self._write("#" * HEADING_LEVELS[tag] + " ")
+        elif tag in ("ul", "ol"):
+            self._newlines(1 if self._list_stack else 2)
+            self._list_stack.append([tag, 0])
+        elif tag == "li":
+            self._newlines(1)
+            indent = "  " * max(len(self._list_stack) - 1, 0)
+            if self._list_stack and self._list_stack[-1][0] == "ol":
+                self._list_stack[-1][1] += 1
+                self._write(f"{indent}{self._list_stack[-1][1]}. ")
+            else:
+                self._write(f"{indent}- ")
+        elif tag == "pre":
+            self._newlines(2)
+            self._write("```\n")
+            self._pre_depth += 1
+        elif tag == "code" and not self._pre_depth:
+            self._write("`")
+        elif tag in ("strong", "b"):
+            self._write("**")
+        elif tag in ("em", "i"):
+            self._write("_")
+        elif tag == "a":
+            self._href_stack.append(dict(attrs).get("href"))
+            self._write("[")
+        elif tag == "blockquote":
+            self._newlines(2)
+            self._write("> ")
+        elif tag == "br":
+            self._newlines(1)
+        elif tag == "hr":
+            self._newlines(2)
+            self._write("---")
+            self._newlines(2)
+        elif tag in ("td", "th"):
+            self._write(" | ")
+        elif tag in BLOCK_TAGS:
+            self._newlines(2)
+
+    def handle_endtag(self, tag):
+        if tag == "title":
+            self._in_title = False
+            self.title = _SPACE_RE.sub(" ", "".join(self._title_parts)).strip() or None
+            return
+        if self._skip_tag:
+            if tag == self._skip_tag:
+                self._skip_depth -= 1
+                if not self._skip_depth:
+                    self._skip_tag = None
+            return
+
+        if tag in HEADING_LEVELS:
+            self._newlines(2)
+        elif tag in ("ul", "ol"):
+            if self._list_stack:
+                self._list_stack.pop()
+            self._newlines(1 if self._list_stack else 2)
+        elif tag == "pre":
+            self._pre_depth = max(self._pre_depth - 1, 0)
+            self._write("\n```")
+            self._newlines(2)
+        elif tag == "code" and not self._pre_depth:
+            self._write("`")
+        elif tag in ("strong", "b"):
+            self._write("**")
+        elif tag in ("em", "i"):
+            self._write("_")
+        elif tag == "a":
+            href = self._href_stack.pop() if self._href_stack else None
+            self._write(f"]({href})" if href and not href.startswith(("javascript:", "#")) else "]")
+        elif tag in BLOCK_TAGS or tag == "blockquote":
+            self._newlines(2)
+
+    def handle_data(self, data):
+        if self._in_title:
+            self._title_parts.append(data)
+            return
+        if self._skip_tag:
+            return
+        if self._pre_depth:
+            self._write(data)
+            return
+        text = _SPACE_RE.sub(" ", data)
+        if not self._line_started:
+            text = text.lstrip()
+        self._write(text)
+
+    # Public API
+
+    def feed(self, data: str) -> str:
+        """Feed an HTML chunk; returns markdown completed so far"""
+        super().feed(data)
+        return self._drain()
+
+    def close(self) -> str:
+        """Flush the parser; returns the remaining markdown"""
+        super().close()
+        return self._drain()
+
+
+def html_to_markdown(html: str) -> str:
+    """Convert a complete HTML document to markdown"""
+    converter = HTMLMarkdownConverter()
+    return (converter.feed(html) + converter.close()).strip()
+
+
+__all__ = ["HTMLMarkdownConverter", "html_to_markdown"]
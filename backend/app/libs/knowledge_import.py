@@ -0,0 +1,466 @@
+"""Job-tracked bulk knowledge import.
+
+A bulk import turns a zip archive, a set of uploaded files and/or a list of
+URLs into one ``knowledge_import_jobs`` row with one ``knowledge_import_items``
+row per document. Uploads are staged to a per-job temp directory while the
+request is still open; the documents are then processed in the background by
+a bounded worker pool (convert -> chunk -> embed -> write) fed from a bounded
+queue, so a 5,000-document archive never has more than
+KNOWLEDGE_IMPORT_WORKERS documents in memory or in flight to the embedding API.
+Progress, throughput and per-document errors are written back as each
+document finishes and can be polled from the database.
+
+A running job heartbeats ``updated_at``. Cancellation requested on another
+process is recorded as status 'cancelling' and picked up by the heartbeat.
+Jobs whose process died (restart, deploy) stop heartbeating; the
+``knowledge_import_recovery`` maintenance job resumes them: interrupted
+items are re-queued, items whose staged upload did not survive are failed
+with a reason, and URL items are fetched again.
+
+Usage:
+
+    from app.libs.knowledge_import import create_import_job, start_import_job
+
+    job_id = await create_import_job(conn, tenant_id, created_by, sources, staging_dir)
+    start_import_job(job_id)
+
+    # Maintenance: resume jobs orphaned by a restart
+    await recover_import_jobs()
+"""
+
+import asyncio
+import os
+import shutil
+import tempfile
+import uuid
+import zipfile
+from typing import Dict, List, Optional, Set
+
+import asyncpg
+
+from app.libs.db_connection import get_db_connection
+from app.libs.html_markdown import html_to_markdown
+from app.libs.knowledge_ingestion import upsert_document
+from app.libs.pdf_extraction import UPLOAD_MAX_BYTES, iter_pdf_pages
+from app.libs.url_fetcher import fetch_url_markdown
+
+# Configuration
+KNOWLEDGE_IMPORT_WORKERS = int(os.getenv("KNOWLEDGE_IMPORT_WORKERS", "4"))
+KNOWLEDGE_IMPORT_QUEUE_DEPTH = int(os.getenv("KNOWLEDGE_IMPORT_QUEUE_DEPTH", "16"))
+KNOWLEDGE_IMPORT_MAX_DOCUMENTS = int(os.getenv("KNOWLEDGE_IMPORT_MAX_DOCUMENTS", "10000"))
+# Documents in flight across all jobs in this process
+KNOWLEDGE_IMPORT_MAX_INFLIGHT = int(os.getenv("KNOWLEDGE_IMPORT_MAX_INFLIGHT", "8"))
+KNOWLEDGE_IMPORT_HEARTBEAT_SECONDS = float(os.getenv("KNOWLEDGE_IMPORT_HEARTBEAT_SECONDS", "30"))
+# A queued/running job without a heartbeat for this long is considered orphaned
+KNOWLEDGE_IMPORT_STALE_SECONDS = int(os.getenv("KNOWLEDGE_IMPORT_STALE_SECONDS", "300"))
+
+# pg_try_advisory_lock key: one recovery sweep at a time across processes
+KNOWLEDGE_IMPORT_RECOVERY_LOCK_KEY = 727003
+
+SUPPORTED_EXTENSIONS = (".pdf", ".md", ".markdown", ".txt", ".html", ".htm", ".csv", ".json")
+TERMINAL_JOB_STATUSES = ("completed", "completed_with_errors", "failed", "cancelled")
+ACTIVE_JOB_STATUSES = ("queued", "running", "cancelling")
+
+_inflight: Optional[asyncio.Semaphore] = None
+# job_id -> running task, so jobs are not garbage collected and can be cancelled
+_running: Dict[uuid.UUID, asyncio.Task] = {}
+# Jobs cancelled on request, as opposed to tasks cancelled by a shutdown (those are left to recovery)
+_cancel_requested: Set[uuid.UUID] = set()
+
+
+class ImportSource:
+    """One document to import: an uploaded file, a zip member, or a URL"""
+
+    def __init__(self, source_type: str, source_ref: str, path: Optional[str] = None):
+        self.source_type = source_type  # 'file', 'zip' or 'url'
+        self.source_ref = source_ref    # filename, member name or URL
+        self.path = path                # staged file (for 'zip' the archive)
+
+
+def _get_inflight() -> asyncio.Semaphore:
+    global _inflight
+    if _inflight is None:
+        _inflight = asyncio.Semaphore(KNOWLEDGE_IMPORT_MAX_INFLIGHT)
+    return _inflight
+
+
+def is_supported(name: str) -> bool:
+    return name.lower().endswith(SUPPORTED_EXTENSIONS)
+
+
+def list_zip_sources(archive_path: str) -> List[ImportSource]:
+    """Enumerate importable members from the archive's central directory"""
+    sources = []
+    with zipfile.ZipFile(archive_path) as archive:
+        for info in archive.infolist():
+            name = info.filename
+            basename = os.path.basename(name)
+            if info.is_dir() or not basename or basename.startswith(".") or name.startswith("__MACOSX/"):
+                continue
+            if is_supported(name):
+                sources.append(ImportSource("zip", name, archive_path))
+    return sources
+
+
+def _decode(data: bytes) -> str:
+    try:
+        return data.decode("utf-8")
+    except UnicodeDecodeError:
+        return data.decode("latin-1")
+
+
+def _read_zip_member(archive_path: str, member: str, staging_dir: str) -> str:
+    """Extract one member to the staging dir, refusing oversized entries"""
+    with zipfile.ZipFile(archive_path) as archive:
+        info = archive.getinfo(member)
+        if info.file_size > UPLOAD_MAX_BYTES:
+            raise ValueError(f"Archive entry too large ({info.file_size} bytes, max {UPLOAD_MAX_BYTES})")
+        fd, path = tempfile.mkstemp(dir=staging_dir, suffix=os.path.splitext(member)[1])
+        with os.fdopen(fd, "wb") as out, archive.open(info) as src:
+            shutil.copyfileobj(src, out)
+    return path
+
+
+async def _convert_file(path: str, name: str) -> str:
+    lowered = name.lower()
+    if lowered.endswith(".pdf"):
+        pages = [page async for page in iter_pdf_pages(path)]
+        return "\n".join(pages)
+    with open(path, "rb") as f:
+        text = _decode(await asyncio.to_thread(f.read))
+    if lowered.endswith((".html", ".htm")):
+        return await asyncio.to_thread(html_to_markdown, text)
+    return text
+
+
+async def convert_source(source: ImportSource, staging_dir: str):
+    """Return (title, markdown, source_metadata) for one import source"""
+    if source.source_type == "url":
+        result = await fetch_url_markdown(source.source_ref)
+        metadata = {"source": "bulk_import", "url": source.source_ref, "page_title": result.title}
+        return source.source_ref, result.markdown, metadata
+
+    if source.source_type == "zip":
+        path = await asyncio.to_thread(_read_zip_member, source.path, source.source_ref, staging_dir)
+        try:
+            text = await _convert_file(path, source.source_ref)
+        finally:
+            os.unlink(path)
+    else:
+        text = await _convert_file(source.path, source.source_ref)
+    return source.source_ref, text, {"source": "bulk_import", "filename": source.source_ref}
+
+
+async def create_import_job(
+    conn: asyncpg.Connection,
+    tenant_id,
+    created_by: Optional[str],
+    sources: List[ImportSource],
+    staging_dir: str,
+) -> uuid.UUID:
+    """Persist the job and one pending item per source; returns the job id"""
+    job_id = uuid.uuid4()
+    async with conn.transaction():
+        await conn.execute(
+            """INSERT INTO knowledge_import_jobs (id, tenant_id, status, total_items, created_by, staging_dir)
+               VALUES ($1, $2, 'queued', $3, $4, $5)""",
+            job_id, tenant_id, len(sources), created_by, staging_dir
+        )
+        await conn.executemany(
+            """INSERT INTO knowledge_import_items (job_id, tenant_id, position, source_type, source_ref, staged_path)
+               VALUES ($1, $2, $3, $4, $5, $6)""",
+            [
+                (job_id, tenant_id, position, source.source_type, source.source_ref, source.path)
+                for position, source in enumerate(sources)
+            ]
+        )
+    return job_id
+
+
+async def _process_item(conn: asyncpg.Connection, job_id, tenant_id, item, staging_dir: str) -> None:
+    source = ImportSource(item["source_type"], item["source_ref"], item["staged_path"])
+    await conn.execute(
+        "UPDATE knowledge_import_items SET status = 'processing', started_at = NOW() WHERE id = $1",
+        item["id"]
+    )
+    try:
+        async with _get_inflight():
+            title, text, metadata = await convert_source(source, staging_dir)
+            if not text or not text.strip():
+                raise ValueError("No text content could be extracted")
+            result = await upsert_document(conn, tenant_id, title, text, metadata, source_type="bulk_import")
+    except Exception as e:
+        detail = getattr(e, "detail", None) or str(e) or type(e).__name__
+        await conn.execute(
+            """UPDATE knowledge_import_items SET status = 'failed', error = $2, finished_at = NOW()
+               WHERE id = $1""",
+            item["id"], str(detail)[:2000]
+        )
+        await conn.execute(
+            """UPDATE knowledge_import_jobs
+               SET processed_items = processed_items + 1, failed_items = failed_items + 1, updated_at = NOW()
+               WHERE id = $1""",
+            job_id
+        )
+        return
+
+    status = "unchanged" if result["status"] == "unchanged" else "succeeded"
+    chunks_added = result.get("chunks_added", 0)
+    await conn.execute(
+        """UPDATE knowledge_import_items
+           SET status = $2, knowledge_base_id = $3, chunks_added = $4, finished_at = NOW()
+           WHERE id = $1""",
+        item["id"], status, result["id"], chunks_added
+    )
+    await conn.execute(
+        """UPDATE knowledge_import_jobs
+           SET processed_items = processed_items + 1,
+               succeeded_items = succeeded_items + CASE WHEN $2 = 'succeeded' THEN 1 ELSE 0 END,
+               unchanged_items = unchanged_items + CASE WHEN $2 = 'unchanged' THEN 1 ELSE 0 END,
+               chunks_added = chunks_added + $3,
+               updated_at = NOW()
+           WHERE id = $1""",
+        job_id, status, chunks_added
+    )
+
+
+async def _worker(job_id, tenant_id, queue: asyncio.Queue, staging_dir: str) -> None:
+    # Each worker owns one connection for the lifetime of the job
+    conn = await get_db_connection()
+    try:
+        while True:
+            item = await queue.get()
+            try:
+                if item is None:
+                    return
+                await _process_item(conn, job_id, tenant_id, item, staging_dir)
+            finally:
+                queue.task_done()
+    finally:
+        await conn.close()
+
+
+async def _heartbeat(job_id: uuid.UUID, job_task: asyncio.Task) -> None:
+    """Keep updated_at fresh while the job runs; cancel it when another process asked to"""
+    conn = await get_db_connection()
+    try:
+        while True:
+            await asyncio.sleep(KNOWLEDGE_IMPORT_HEARTBEAT_SECONDS)
+            status = await conn.fetchval(
+                "UPDATE knowledge_import_jobs SET updated_at = NOW() WHERE id = $1 RETURNING status",
+                job_id
+            )
+            if status == "cancelling":
+                _cancel_requested.add(job_id)
+                job_task.cancel()
+                return
+    finally:
+        await conn.close()
+
+
+async def run_import_job(job_id: uuid.UUID) -> None:
+    """Process every pending item of a job through the bounded worker pool"""
+    conn = await get_db_connection()
+    staging_dir = None
+    heartbeat = None
+    try:
+        job = await conn.fetchrow(
+            """UPDATE knowledge_import_jobs SET status = 'running', started_at = COALESCE(started_at, NOW()),
+                      updated_at = NOW()
+               WHERE id = $1 AND status IN ('queued', 'running') RETURNING tenant_id, staging_dir""",
+            job_id
+        )
+        if not job:
+            return
+        staging_dir = job["staging_dir"]
+        heartbeat = asyncio.create_task(_heartbeat(job_id, asyncio.current_task()))
+
+        queue: asyncio.Queue = asyncio.Queue(maxsize=KNOWLEDGE_IMPORT_QUEUE_DEPTH)
+        workers = [
+            asyncio.create_task(_worker(job_id, job["tenant_id"], queue, staging_dir))
+            for _ in range(KNOWLEDGE_IMPORT_WORKERS)
+        ]
+        try:
+            # Items are paged in by position; put() blocks while the workers are saturated
+            last_position = -1
+            while True:
+                items = await conn.fetch(
+                    """SELECT id, position, source_type, source_ref, staged_path FROM knowledge_import_items
+                       WHERE job_id = $1 AND status = 'pending' AND position > $2
+                       ORDER BY position LIMIT $3""",
+                    job_id, last_position, KNOWLEDGE_IMPORT_QUEUE_DEPTH * 4
+                )
+                if not items:
+                    break
+                for item in items:
+                    await queue.put(item)
+                last_position = items[-1]["position"]
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+        except BaseException:
+            for worker in workers:
+                worker.cancel()
+            raise
+
+        await conn.execute(
+            """UPDATE knowledge_import_jobs
+               SET status = CASE WHEN failed_items > 0 THEN 'completed_with_errors' ELSE 'completed' END,
+                   finished_at = NOW(), updated_at = NOW()
+               WHERE id = $1 AND status IN ('running', 'cancelling')""",
+            job_id
+        )
+        print(f"KNOWLEDGE_IMPORT: job {job_id} finished")
+
+    except asyncio.CancelledError:
+        if job_id not in _cancel_requested:
+            # Shutdown: keep the job queued/running so recovery resumes it elsewhere
+            staging_dir = None
+            raise
+        await conn.execute(
+            """UPDATE knowledge_import_jobs SET status = 'cancelled', finished_at = NOW(), updated_at = NOW()
+               WHERE id = $1""",
+            job_id
+        )
+        await conn.execute(
+            """UPDATE knowledge_import_items SET status = 'cancelled', finished_at = NOW()
+               WHERE job_id = $1 AND status IN ('pending', 'processing')""",
+            job_id
+        )
+        raise
+    except Exception as e:
+        print(f"KNOWLEDGE_IMPORT: job {job_id} failed: {e}")
+        await conn.execute(
+            """UPDATE knowledge_import_jobs SET status = 'failed', error = $2, finished_at = NOW(), updated_at = NOW()
+               WHERE id = $1""",
+            job_id, str(e)[:2000]
+        )
+    finally:
+        if heartbeat:
+            heartbeat.cancel()
+        await conn.close()
+        _running.pop(job_id, None)
+        _cancel_requested.discard(job_id)
+        if staging_dir:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+
+
+def start_import_job(job_id: uuid.UUID) -> None:
+    """Schedule a job on the running event loop"""
+    _running[job_id] = asyncio.create_task(run_import_job(job_id))
+
+
+def cancel_import_job(job_id: uuid.UUID) -> bool:
+    """Cancel a job running in this process; returns False if it is not running here"""
+    task = _running.get(job_id)
+    if not task or task.done():
+        return False
+    _cancel_requested.add(job_id)
+    task.cancel()
+    return True
+
+
+async def request_import_cancel(conn: asyncpg.Connection, job_id: uuid.UUID) -> bool:
+    """Ask whichever process runs the job to cancel it (seen at its next heartbeat)"""
+    if cancel_import_job(job_id):
+        return True
+    return await conn.fetchval(
+        """UPDATE knowledge_import_jobs SET status = 'cancelling'
+           WHERE id = $1 AND status IN ('queued', 'running') RETURNING TRUE""",
+        job_id
+    ) or False
+
+
+async def _recover_job(conn: asyncpg.Connection, job) -> str:
+    """Cancel, or re-queue and resume, one orphaned job; returns what was done"""
+    job_id = job["id"]
+    if job["status"] == "cancelling":
+        await conn.execute(
+            """UPDATE knowledge_import_jobs SET status = 'cancelled', finished_at = NOW(), updated_at = NOW()
+               WHERE id = $1""",
+            job_id
+        )
+        await conn.execute(
+            """UPDATE knowledge_import_items SET status = 'cancelled', finished_at = NOW()
+               WHERE job_id = $1 AND status IN ('pending', 'processing')""",
+            job_id
+        )
+        return "cancelled"
+
+    async with conn.transaction():
+        # Interrupted mid-document; upsert_document is idempotent, so redo it
+        await conn.execute(
+            """UPDATE knowledge_import_items SET status = 'pending', started_at = NULL
+               WHERE job_id = $1 AND status = 'processing'""",
+            job_id
+        )
+        staged = await conn.fetch(
+            """SELECT id, staged_path FROM knowledge_import_items
+               WHERE job_id = $1 AND status = 'pending' AND source_type IN ('file', 'zip')""",
+            job_id
+        )
+        lost = [item["id"] for item in staged if not (item["staged_path"] and os.path.exists(item["staged_path"]))]
+        if lost:
+            await conn.execute(
+                """UPDATE knowledge_import_items
+                   SET status = 'failed', error = 'Staged upload was lost when the server restarted; re-upload the file',
+                       finished_at = NOW()
+                   WHERE id = ANY($1::bigint[])""",
+                lost
+            )
+            await conn.execute(
+                """UPDATE knowledge_import_jobs
+                   SET processed_items = processed_items + $2, failed_items = failed_items + $2, updated_at = NOW()
+                   WHERE id = $1""",
+                job_id, len(lost)
+            )
+    # Remaining pending items (URLs, uploads still on this host) are processed here; the job is then finalised
+    start_import_job(job_id)
+    return "resumed"
+
+
+async def recover_import_jobs() -> Dict[str, int]:
+    """Maintenance entry point: finish or resume import jobs whose process stopped heartbeating"""
+    stats = {"resumed": 0, "cancelled": 0}
+    conn = await get_db_connection()
+    try:
+        if not await conn.fetchval("SELECT pg_try_advisory_lock($1)", KNOWLEDGE_IMPORT_RECOVERY_LOCK_KEY):
+            return stats
+        try:
+            # Claim by touching updated_at, so a second sweep cannot pick the same job
+            orphaned = await conn.fetch(
+                """UPDATE knowledge_import_jobs SET updated_at = NOW()
+                   WHERE status = ANY($1::text[])
+                     AND updated_at < NOW() - make_interval(secs => $2)
+                     AND NOT (id = ANY($3::uuid[]))
+                   RETURNING id, status""",
+                list(ACTIVE_JOB_STATUSES), KNOWLEDGE_IMPORT_STALE_SECONDS, list(_running)
+            )
+            for job in orphaned:
+                try:
+                    stats[await _recover_job(conn, job)] += 1
+                except Exception as e:
+                    print(f"KNOWLEDGE_IMPORT: recovery of job {job['id']} failed: {e}")
+        finally:
+            await conn.execute("SELECT pg_advisory_unlock($1)", KNOWLEDGE_IMPORT_RECOVERY_LOCK_KEY)
+    finally:
+        await conn.close()
+    if stats["resumed"] or stats["cancelled"]:
+        print(f"KNOWLEDGE_IMPORT: recovered orphaned jobs: {stats['resumed']} resumed, {stats['cancelled']} cancelled")
+    return stats
+
+
+__all__ = [
+    "ImportSource",
+    "KNOWLEDGE_IMPORT_MAX_DOCUMENTS",
+    "TERMINAL_JOB_STATUSES",
+    "cancel_import_job",
+    "convert_source",
+    "create_import_job",
+    "is_supported",
+    "list_zip_sources",
+    "recover_import_jobs",
+    "request_import_cancel",
+    "run_import_job",
+    "start_import_job",
+]
@@ -0,0 +1,283 @@
+"""Incremental knowledge ingestion with chunk-level diffing.
+
+Documents are split into deterministic, content-defined chunks and every
+chunk is identified by the sha256 of its text. On re-upload only chunks whose
+hash is new get embedded and inserted; chunks that disappeared are deleted
+and unchanged chunks are kept (only their ``chunk_index`` is renumbered).
+``knowledge_bases.document_count`` / ``total_chunks`` are recomputed in the
+same transaction as the chunk writes.
+
+Chunk boundaries are chosen per paragraph from the paragraph's own hash, so an
+edit to one paragraph only changes the chunk that contains it; boundaries
+re-synchronise right after it instead of shifting every later chunk.
+
+Usage:
+
+    from app.libs.knowledge_ingestion import ingest_document
+
+    stats = await ingest_document(conn, tenant_id, knowledge_base_id, title, content)
+"""
+
+import hashlib
+import json
+import os
+import re
+import uuid
+from typing import Dict, List, Optional, Tuple
+
+import asyncpg
+
+# Configuration
+KNOWLEDGE_EMBEDDING_MODEL = os.getenv("KNOWLEDGE_EMBEDDING_MODEL", "text-embedding-3-small")
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "100"))
+CHUNK_MIN_CHARS = int(os.getenv("CHUNK_MIN_CHARS", "800"))
+CHUNK_MAX_CHARS = int(os.getenv("CHUNK_MAX_CHARS", "2400"))
+# On average one paragraph in CHUNK_CUT_DIVISOR ends a chunk once CHUNK_MIN_CHARS is reached
+CHUNK_CUT_DIVISOR = int(os.getenv("CHUNK_CUT_DIVISOR", "4"))
+
+_PARAGRAPH_SPLIT_RE = re.compile(r"\n\s*\n")
+_SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?])\s+")
+
+
+def hash_text(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _split_long_paragraph(paragraph: str, max_chars: int) -> List[str]:
+    """Split an oversized paragraph on sentence boundaries, then hard-wrap"""
+    pieces, current = [], ""
+    for sentence in _SENTENCE_SPLIT_RE.split(paragraph):
+        while len(sentence) > max_chars:
+            if current:
+                pieces.append(current)
+                current = ""
+            pieces.append(sentence[:max_chars])
+            sentence = sentence[max_chars:]
+        if current and len(current) + 1 + len(sentence) > max_chars:
+            pieces.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}" if current else sentence
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def chunk_document(
+    text: str,
+    min_chars: int = CHUNK_MIN_CHARS,
+    max_chars: int = CHUNK_MAX_CHARS,
+    cut_divisor: int = CHUNK_CUT_DIVISOR,
+) -> List[str]:
+    """Split text into deterministic content-defined chunks"""
+    paragraphs: List[str] = []
+    for raw in _PARAGRAPH_SPLIT_RE.split(text.replace("\r\n", "\n")):
+        paragraph = raw.strip()
+        if not paragraph:
+            continue
+        if len(paragraph) > max_chars:
+            paragraphs.extend(_split_long_paragraph(paragraph, max_chars))
+        else:
+            paragraphs.append(paragraph)
+
+    chunks: List[str] = []
+    current: List[str] = []
+    size = 0
+    for paragraph in paragraphs:
+        if current and size + len(paragraph) + 2 > max_chars:
+            chunks.append("\n\n".join(current))
+            current, size = [], 0
+        current.append(paragraph)
+        size += len(paragraph) + 2
+        if size >= min_chars and int(hash_text(paragraph)[:8], 16) % cut_divisor == 0:
+            chunks.append("\n\n".join(current))
+            current, size = [], 0
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+
+async def embed_texts(texts: List[str], model: str = KNOWLEDGE_EMBEDDING_MODEL) -> List[List[float]]:
+    """Embed texts in batches through the shared OpenAI client"""
+    # Imported lazily: synthesis owns the shared client
+    from app.libs.synthesis import get_openai_client
+
+    if not texts:
+        return []
+    client = get_openai_client()
+    vectors: List[List[float]] = []
+    for start in range(0, len(texts), EMBEDDING_BATCH_SIZE):
+        response = await client.embeddings.create(model=model, input=texts[start:start + EMBEDDING_BATCH_SIZE])
+        vectors.extend(item.embedding for item in response.data)
+    return vectors
+
+
+async def _existing_chunks(conn: asyncpg.Connection, knowledge_base_id, document_name: str) -> List[asyncpg.Record]:
+    return await conn.fetch(
+        """SELECT id, chunk_hash, chunk_index FROM embeddings
+           WHERE knowledge_base_id = $1 AND document_name = $2""",
+        knowledge_base_id, document_name
+    )
+
+
+def _diff(chunks: List[Tuple[str, str]], existing: List[asyncpg.Record]):
+    """Match new (hash, text) chunks against stored rows.
+
+    Returns (keep: [(row_id, new_index)], insert: [(index, hash, text)], delete: [row_id]).
+    Duplicate chunks are matched one stored row per occurrence.
+    """
+    available: Dict[str, List] = {}
+    for row in existing:
+        available.setdefault(row["chunk_hash"], []).append(row)
+
+    keep, insert = [], []
+    for index, (chunk_hash, text) in enumerate(chunks):
+        rows = available.get(chunk_hash)
+        if rows:
+            row = rows.pop()
+            if row["chunk_index"] != index:
+                keep.append((row["id"], index))
+        else:
+            insert.append((index, chunk_hash, text))
+
+    delete = [row["id"] for rows in available.values() for row in rows]
+    return keep, insert, delete
+
+
+async def ingest_document(
+    conn: asyncpg.Connection,
+    tenant_id,
+    knowledge_base_id,
+    document_name: str,
+    text: str,
+    source_metadata: Optional[dict] = None,
+) -> Dict[str, int]:
+    """Diff a document against its stored chunks and apply only the changes"""
+    chunks = [(hash_text(chunk), chunk) for chunk in chunk_document(text)]
+
+    # Embed outside the transaction so no locks are held during network calls
+    existing = await _existing_chunks(conn, knowledge_base_id, document_name)
+    _, pending, _ = _diff(chunks, existing)
+    vectors: Dict[str, List[float]] = {}
+    pending_texts = {chunk_hash: chunk for _, chunk_hash, chunk in pending}
+    embedding_calls = 0
+    if pending_texts:
+        embedded = await embed_texts(list(pending_texts.values()))
+        vectors.update(zip(pending_texts.keys(), embedded))
+        embedding_calls += 1
+
+    async with conn.transaction():
+        # Serialise concurrent uploads of the same knowledge base and re-diff under the lock
+        await conn.execute("SELECT 1 FROM knowledge_bases WHERE id = $1 FOR UPDATE", knowledge_base_id)
+        existing = await _existing_chunks(conn, knowledge_base_id, document_name)
+        keep, insert, delete = _diff(chunks, existing)
+
+        late = {chunk_hash: chunk for _, chunk_hash, chunk in insert if chunk_hash not in vectors}
+        if late:
+            vectors.update(zip(late.keys(), await embed_texts(list(late.values()))))
+            embedding_calls += 1
+
+        if delete:
+            await conn.execute("DELETE FROM embeddings WHERE id = ANY($1::uuid[])", delete)
+
+        if keep:
+            await conn.execute(
+                """UPDATE embeddings e SET chunk_index = v.chunk_index
+                   FROM unnest($1::uuid[], $2::int[]) AS v(id, chunk_index)
+                   WHERE e.id = v.id""",
+                [row_id for row_id, _ in keep], [index for _, index in keep]
+            )
+
+        if insert:
+            await conn.executemany(
+                """INSERT INTO embeddings
+                       (knowledge_base_id, tenant_id, chunk_text, chunk_hash, chunk_metadata,
+                        embedding_vector, document_name, chunk_index)
+                   VALUES ($1, $2, $3, $4, $5, $6, $7, $8)""",
+                [
+                    (knowledge_base_id, tenant_id, chunk, chunk_hash, json.dumps(source_metadata or {}),
+                     vectors[chunk_hash], document_name, index)
+                    for index, chunk_hash, chunk in insert
+                ]
+            )
+
+        await conn.execute(
+            """UPDATE knowledge_bases kb SET
+                   total_chunks = c.total_chunks,
+                   document_count = c.document_count,
+                   content_hash = $2,
+                   last_updated = NOW(),
+                   updated_at = NOW()
+               FROM (SELECT COUNT(*) AS total_chunks, COUNT(DISTINCT document_name) AS document_count
+                     FROM embeddings WHERE knowledge_base_id = $1) c
+               WHERE kb.id = $1""",
+            knowledge_base_id, hash_text(text)
+        )
+
+    return {
+        "chunks_total": len(chunks),
+        "chunks_added": len(insert),
+        "chunks_removed": len(delete),
+        "chunks_unchanged": len(chunks) - len(insert),
+        "embedding_calls": embedding_calls,
+    }
+
+
+async def upsert_document(
+    conn: asyncpg.Connection,
+    tenant_id,
+    title: str,
+    content: str,
+    metadata: Optional[dict] = None,
+    source_type: Optional[str] = None,
+) -> Dict:
+    """Create or update the tenant's knowledge base entry for ``title`` and ingest its content.
+
+    Returns ``{"id", "status", "content_hash", **chunk stats}`` where status is
+    'unchanged' when the stored content hash already matches.
+    """
+    content_hash = hash_text(content)
+
+    # Identical re-upload: nothing to chunk or embed
+    existing = await conn.fetchrow(
+        "SELECT id, content_hash, total_chunks FROM knowledge_bases WHERE tenant_id = $1 AND name = $2",
+        tenant_id, title
+    )
+    if existing and existing["content_hash"] == content_hash:
+        total = existing["total_chunks"] or 0
+        return {
+            "id": existing["id"],
+            "status": "unchanged",
+            "content_hash": content_hash,
+            "chunks_total": total,
+            "chunks_added": 0,
+            "chunks_removed": 0,
+            "chunks_unchanged": total,
+            "embedding_calls": 0,
+        }
+
+    row = await conn.fetchrow(
+        """INSERT INTO knowledge_bases (id, tenant_id, name, description, source_type, source_metadata,
+                                        created_at, updated_at)
+           VALUES ($1, $2, $3, $4, $5, $6, NOW(), NOW())
+           ON CONFLICT (tenant_id, name)
+           DO UPDATE SET
+               description = EXCLUDED.description,
+               source_type = COALESCE(EXCLUDED.source_type, knowledge_bases.source_type),
+               source_metadata = EXCLUDED.source_metadata,
+               updated_at = EXCLUDED.updated_at
+           RETURNING id""",
+        uuid.uuid4(), tenant_id, title, content, source_type, json.dumps(metadata or {})
+    )
+
+    stats = await ingest_document(conn, tenant_id, row["id"], title, content, metadata)
+    return {"id": row["id"], "status": "success", "content_hash": content_hash, **stats}
+
+
+__all__ = [
+    "chunk_document",
+    "embed_texts",
+    "hash_text",
+    "ingest_document",
+    "upsert_document",
+]
@@ -0,0 +1,152 @@
+"""Periodic background maintenance jobs.
+
+Libraries register coroutine functions with an interval; ``start_maintenance``
+(called once from the app's startup hook) runs each one in its own loop on the
+event loop. A failing run is logged and retried on the next tick, and a job
+never overlaps with itself.
+
+Every worker and replica starts the same loops, so by default a job is a
+singleton: each run first takes a per-job ``pg_try_advisory_lock`` and the
+run is skipped when another process holds it. Jobs that refresh per-process
+state register with ``singleton=False`` and coordinate themselves.
+
+Usage:
+
+    from app.libs.maintenance import register_periodic_job
+
+    register_periodic_job("message_partitions", 6 * 3600, run_partition_maintenance)
+    register_periodic_job("n8n_health", 30, run_n8n_health_probe, singleton=False)
+"""
+
+import asyncio
+import os
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from app.libs.db_connection import get_db_connection
+
+# Configuration
+MAINTENANCE_ENABLED = os.getenv("MAINTENANCE_ENABLED", "true").lower() == "true"
+# Delay before the first run so startup is not slowed down
+MAINTENANCE_INITIAL_DELAY_SECONDS = float(os.getenv("MAINTENANCE_INITIAL_DELAY_SECONDS", "30"))
+
+# First half of the two-key advisory lock; the second is hashtext(job name)
+MAINTENANCE_LOCK_NAMESPACE = 727
+
+
+class PeriodicJob:
+    def __init__(self, name: str, interval_seconds: float, func: Callable[[], Awaitable], singleton: bool = True):
+        self.name = name
+        self.interval_seconds = interval_seconds
+        self.func = func
+        self.singleton = singleton
+        self.last_started: Optional[float] = None
+        self.last_finished: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.last_result = None
+        self.runs = 0
+        self.skipped = 0
+
+
+_jobs: Dict[str, PeriodicJob] = {}
+_tasks: List[asyncio.Task] = []
+
+
+def register_periodic_job(
+    name: str,
+    interval_seconds: float,
+    func: Callable[[], Awaitable],
+    singleton: bool = True,
+) -> None:
+    """Register (or replace) a job; takes effect at the next ``start_maintenance``"""
+    _jobs[name] = PeriodicJob(name, interval_seconds, func, singleton)
+
+
+async def run_job_once(name: str):
+    """Run a registered job now; a singleton job is skipped (returns None) while another process runs it"""
+    job = _jobs[name]
+    if not job.singleton:
+        return await _run(job)
+
+    # Held on its own connection for the whole run; released if this process dies
+    conn = await get_db_connection()
+    try:
+        locked = await conn.fetchval(
+            "SELECT pg_try_advisory_lock($1, hashtext($2))", MAINTENANCE_LOCK_NAMESPACE, name
+        )
+        if not locked:
+            job.skipped += 1
+            return None
+        try:
+            return await _run(job)
+        finally:
+            await conn.execute("SELECT pg_advisory_unlock($1, hashtext($2))", MAINTENANCE_LOCK_NAMESPACE, name)
+    finally:
+        await conn.close()
+
+
+async def _run(job: PeriodicJob):
+    name = job.name
+    job.last_started = time.time()
+    try:
+        job.last_result = await job.func()
+        job.last_error = None
+        return job.last_result
+    except Exception as e:
+        job.last_error = str(e)
+        print(f"MAINTENANCE: job '{name}' failed: {e}")
+        raise
+    finally:
+        job.last_finished = time.time()
+        job.runs += 1
+
+
+async def _loop(job: PeriodicJob) -> None:
+    await asyncio.sleep(MAINTENANCE_INITIAL_DELAY_SECONDS)
+    while True:
+        try:
+            await run_job_once(job.name)
+        except Exception:
+            pass
+        await asyncio.sleep(job.interval_seconds)
+
+
+def start_maintenance() -> None:
+    """Start one loop per registered job (idempotent)"""
+    if not MAINTENANCE_ENABLED or _tasks:
+        return
+    for job in _jobs.values():
+        _tasks.append(asyncio.create_task(_loop(job)))
+    print(f"MAINTENANCE: started {len(_tasks)} periodic jobs: {', '.join(_jobs)}")
+
+
+async def stop_maintenance() -> None:
+    for task in _tasks:
+        task.cancel()
+    await asyncio.gather(*_tasks, return_exceptions=True)
+    _tasks.clear()
+
+
+def maintenance_status() -> List[dict]:
+    return [
+        {
+            "name": job.name,
+            "interval_seconds": job.interval_seconds,
+            "singleton": job.singleton,
+            "runs": job.runs,
+            "skipped": job.skipped,
+            "last_started": job.last_started,
+            "last_finished": job.last_finished,
+            "last_error": job.last_error,
+        }
+        for job in _jobs.values()
+    ]
+
+
+__all__ = [
+    "maintenance_status",
+    "register_periodic_job",
+    "run_job_once",
+    "start_maintenance",
+    "stop_maintenance",
+]
@@ -0,0 +1,237 @@
+"""Monthly range partitioning and retention for messages_archive.
+
+``messages_archive`` is declaratively partitioned by ``message_timestamp``,
+one partition per calendar month (``messages_archive_YYYY_MM``). Maintenance
+keeps MESSAGE_PARTITION_MONTHS_AHEAD future partitions created. Rows outside
+every monthly range (a clock-skewed or far-future ``message_timestamp``) land
+in the ``messages_archive_default`` partition instead of failing the insert;
+when their month's partition is created they are moved into it. Maintenance
+also enforces ``tenants.hot_ttl_days``:
+
+- partitions that end before the longest tenant TTL are detached (and dropped
+  when MESSAGE_ARCHIVE_RETENTION_ACTION=drop), a metadata-only operation;
+- tenants with a shorter TTL have their older rows deleted in bounded
+  batches, which partition pruning limits to the expired months.
+
+Migration 0005 converts an existing unpartitioned table; until then
+maintenance does nothing.
+
+Usage:
+
+    from app.libs.message_partitions import run_partition_maintenance
+
+    stats = await run_partition_maintenance()
+"""
+
+import asyncio
+import os
+import re
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+import asyncpg
+
+from app.libs.db_connection import get_db_connection
+
+# Configuration
+MESSAGE_PARTITION_MONTHS_AHEAD = int(os.getenv("MESSAGE_PARTITION_MONTHS_AHEAD", "2"))
+MESSAGE_ARCHIVE_RETENTION_ACTION = os.getenv("MESSAGE_ARCHIVE_RETENTION_ACTION", "detach")  # 'detach' or 'drop'
+MESSAGE_RETENTION_BATCH_SIZE = int(os.getenv("MESSAGE_RETENTION_BATCH_SIZE", "5000"))
+DEFAULT_HOT_TTL_DAYS = 30
+
+PARENT_TABLE = "messages_archive"
+DEFAULT_PARTITION = "messages_archive_default"
+_PARTITION_RE = re.compile(r"^messages_archive_(\d{4})_(\d{2})$")
+
+
+def month_start(value) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(month: date, count: int) -> date:
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{PARENT_TABLE}_{month.year}_{month.month:02d}"
+
+
+async def is_partitioned(conn: asyncpg.Connection) -> bool:
+    relkind = await conn.fetchval("SELECT relkind FROM pg_class WHERE oid = to_regclass($1)", PARENT_TABLE)
+    return relkind == "p"
+
+
+async def attached_partitions(conn: asyncpg.Connection) -> Dict[date, str]:
+    """Map of month -> partition name for partitions currently attached"""
+    rows = await conn.fetch(
+        """SELECT c.relname FROM pg_inherits i
+           JOIN pg_class c ON c.oid = i.inhrelid
+           WHERE i.inhparent = to_regclass($1)""",
+        PARENT_TABLE
+    )
+    partitions = {}
+    for row in rows:
+        match = _PARTITION_RE.match(row["relname"])
+        if match:
+            partitions[date(int(match.group(1)), int(match.group(2)), 1)] = row["relname"]
+    return partitions
+
+
+async def detached_partitions(conn: asyncpg.Connection) -> List[str]:
+    """Monthly partitions that retention detached but did not drop"""
+    rows = await conn.fetch(
+        """SELECT relname FROM pg_class
+           WHERE relkind = 'r' AND NOT relispartition AND pg_table_is_visible(oid)
+             AND relname ~ '^messages_archive_[0-9]{4}_[0-9]{2}$'
+           ORDER BY relname"""
+    )
+    return [row["relname"] for row in rows]
+
+
+async def ensure_default_partition(conn: asyncpg.Connection) -> bool:
+    """Create the DEFAULT partition if missing; returns True when created"""
+    if await conn.fetchval("SELECT to_regclass($1) IS NOT NULL", DEFAULT_PARTITION):
+        return False
+    await conn.execute(f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF {PARENT_TABLE} DEFAULT")
+    print(f"MESSAGE_PARTITIONS: created {DEFAULT_PARTITION}")
+    return True
+
+
+async def _create_partition(conn: asyncpg.Connection, month: date, has_default: bool) -> None:
+    name = partition_name(month)
+    bounds = f"FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+    spilled = has_default and await conn.fetchval(
+        f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} WHERE message_timestamp >= $1 AND message_timestamp < $2)",
+        month, add_months(month, 1)
+    )
+    if not spilled:
+        await conn.execute(f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {PARENT_TABLE} FOR VALUES {bounds}")
+        return
+
+    # The month's rows already sit in the default partition; attaching would fail until they are moved out
+    async with conn.transaction():
+        await conn.execute(f"CREATE TABLE {name} (LIKE {PARENT_TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)")
+        moved = await conn.execute(
+            f"""WITH moved AS (
+                    DELETE FROM {DEFAULT_PARTITION} WHERE message_timestamp >= $1 AND message_timestamp < $2
+                    RETURNING *
+                )
+                INSERT INTO {name} SELECT * FROM moved""",
+            month, add_months(month, 1)
+        )
+        await conn.execute(f"ALTER TABLE {PARENT_TABLE} ATTACH PARTITION {name} FOR VALUES {bounds}")
+    print(f"MESSAGE_PARTITIONS: moved {moved.split()[-1]} rows from {DEFAULT_PARTITION} into {name}")
+
+
+async def ensure_partitions(
+    conn: asyncpg.Connection,
+    first_month: Optional[date] = None,
+    months_ahead: int = MESSAGE_PARTITION_MONTHS_AHEAD,
+) -> List[str]:
+    """Create monthly partitions from first_month (default: this month) through months_ahead"""
+    current = month_start(datetime.now(timezone.utc))
+    month = first_month or current
+    last = add_months(current, months_ahead)
+    existing = await attached_partitions(conn)
+    has_default = await conn.fetchval("SELECT to_regclass($1) IS NOT NULL", DEFAULT_PARTITION)
+    created = []
+    while month <= last:
+        if month not in existing:
+            await _create_partition(conn, month, has_default)
+            created.append(partition_name(month))
+        month = add_months(month, 1)
+    if created:
+        print(f"MESSAGE_PARTITIONS: created {', '.join(created)}")
+    return created
+
+
+async def apply_retention(conn: asyncpg.Connection) -> Dict[str, int]:
+    """Detach partitions past every tenant's TTL, batch-delete rows past shorter TTLs"""
+    now = datetime.now(timezone.utc)
+    ttls = await conn.fetch(
+        f"SELECT id, COALESCE(hot_ttl_days, {DEFAULT_HOT_TTL_DAYS}) AS ttl_days FROM tenants"
+    )
+    horizon_days = max((row["ttl_days"] for row in ttls), default=DEFAULT_HOT_TTL_DAYS)
+    horizon = now - timedelta(days=horizon_days)
+
+    detached = 0
+    for month, name in sorted((await attached_partitions(conn)).items()):
+        if datetime.combine(add_months(month, 1), datetime.min.time(), timezone.utc) > horizon:
+            break
+        await conn.execute(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {name}")
+        if MESSAGE_ARCHIVE_RETENTION_ACTION == "drop":
+            await conn.execute(f"DROP TABLE {name}")
+        detached += 1
+        print(f"MESSAGE_PARTITIONS: {MESSAGE_ARCHIVE_RETENTION_ACTION} {name} (older than {horizon_days} days)")
+
+    # Stray rows in the default partition are not covered by detaching monthly partitions
+    deleted = 0
+    if await conn.fetchval("SELECT to_regclass($1) IS NOT NULL", DEFAULT_PARTITION):
+        while True:
+            batch = await conn.fetchval(
+                f"""WITH expired AS (
+                        DELETE FROM {DEFAULT_PARTITION}
+                        WHERE ctid IN (
+                            SELECT ctid FROM {DEFAULT_PARTITION} WHERE message_timestamp < $1 LIMIT $2
+                        )
+                        RETURNING 1
+                    )
+                    SELECT COUNT(*) FROM expired""",
+                horizon, MESSAGE_RETENTION_BATCH_SIZE
+            )
+            deleted += batch
+            if batch < MESSAGE_RETENTION_BATCH_SIZE:
+                break
+            await asyncio.sleep(0)
+
+    for row in ttls:
+        if row["ttl_days"] >= horizon_days:
+            continue
+        cutoff = now - timedelta(days=row["ttl_days"])
+        while True:
+            batch = await conn.fetchval(
+                f"""WITH expired AS (
+                        DELETE FROM {PARENT_TABLE}
+                        WHERE (message_id, message_timestamp) IN (
+                            SELECT message_id, message_timestamp FROM {PARENT_TABLE}
+                            WHERE tenant_id = $1 AND message_timestamp < $2
+                            LIMIT $3
+                        )
+                        RETURNING 1
+                    )
+                    SELECT COUNT(*) FROM expired""",
+                row["id"], cutoff, MESSAGE_RETENTION_BATCH_SIZE
+            )
+            deleted += batch
+            if batch < MESSAGE_RETENTION_BATCH_SIZE:
+                break
+            await asyncio.sleep(0)
+
+    return {"partitions_detached": detached, "rows_deleted": deleted, "horizon_days": horizon_days}
+
+
+async def run_partition_maintenance() -> Dict[str, int]:
+    """Create upcoming partitions and enforce retention (no-op until the table is partitioned)"""
+    conn = await get_db_connection()
+    try:
+        if not await is_partitioned(conn):
+            return {"partitioned": 0}
+        await ensure_default_partition(conn)
+        created = await ensure_partitions(conn)
+        stats = await apply_retention(conn)
+        return {"partitioned": 1, "partitions_created": len(created), **stats}
+    finally:
+        await conn.close()
+
+
+__all__ = [
+    "apply_retention",
+    "attached_partitions",
+    "detached_partitions",
+    "ensure_default_partition",
+    "ensure_partitions",
+    "is_partitioned",
+    "partition_name",
+    "run_partition_maintenance",
+]
@@ -0,0 +1,202 @@
+"""Versioned, idempotent schema migrations.
+
+Migrations live in ``backend/migrations`` and are applied in filename order,
+once each, recording every applied version in ``schema_migrations``. A
+Postgres advisory lock serialises concurrent deploys.
+
+Two kinds of migration are supported:
+
+- ``NNNN_name.sql``: executed in one transaction. A file whose first line is
+  ``-- migrate: no-transaction`` is instead split into statements (one per
+  ``;`` at end of line) and run outside a transaction, which is what
+  ``CREATE INDEX CONCURRENTLY`` requires. An index left INVALID by an
+  interrupted concurrent build is dropped and rebuilt on the next run.
+- ``NNNN_name.py``: a module defining ``async def migrate(conn)``; it runs in
+  a transaction unless it sets ``TRANSACTIONAL = False``.
+
+Usage:
+
+    python migrate.py            # apply pending migrations
+    python migrate.py --status   # list applied and pending migrations
+"""
+
+import hashlib
+import importlib.util
+import os
+import re
+import time
+from typing import List, Optional
+
+import asyncpg
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "migrations")
+# Arbitrary constant shared by every deploy of this app
+MIGRATION_LOCK_ID = 727_001
+
+_FILENAME_RE = re.compile(r"^(\d{4})_([a-z0-9_]+)\.(sql|py)$")
+_NO_TRANSACTION_MARKER = "-- migrate: no-transaction"
+_CONCURRENT_INDEX_RE = re.compile(
+    r"CREATE\s+(?:UNIQUE\s+)?INDEX\s+CONCURRENTLY\s+IF\s+NOT\s+EXISTS\s+(\w+)", re.IGNORECASE
+)
+
+
+class Migration:
+    def __init__(self, version: str, name: str, path: str):
+        self.version = version
+        self.name = name
+        self.path = path
+        with open(path, "rb") as f:
+            self.checksum = hashlib.sha256(f.read()).hexdigest()
+
+    @property
+    def is_python(self) -> bool:
+        return self.path.endswith(".py")
+
+
+def discover_migrations(directory: str = MIGRATIONS_DIR) -> List[Migration]:
+    migrations = []
+    for filename in sorted(os.listdir(directory)):
+        match = _FILENAME_RE.match(filename)
+        if match:
+            migrations.append(Migration(match.group(1), match.group(2), os.path.join(directory, filename)))
+    versions = [m.version for m in migrations]
+    if len(versions) != len(set(versions)):
+        raise ValueError(f"Duplicate migration versions in {directory}")
+    return migrations
+
+
+def split_statements(sql: str) -> List[str]:
+    """Split a no-transaction script on statement-terminating semicolons"""
+    statements, current = [], []
+    for line in sql.splitlines():
+        if line.strip().startswith("--") and not current:
+            continue
+        current.append(line)
+        if line.rstrip().endswith(";"):
+            statement = "\n".join(current).strip()
+            if statement:
+                statements.append(statement)
+            current = []
+    if "\n".join(current).strip():
+        statements.append("\n".join(current).strip())
+    return statements
+
+
+async def drop_invalid_index(conn: asyncpg.Connection, index_name: str) -> None:
+    """Drop an index left INVALID by a failed CONCURRENTLY build so it can be rebuilt"""
+    invalid = await conn.fetchval(
+        """SELECT NOT i.indisvalid FROM pg_index i
+           JOIN pg_class c ON c.oid = i.indexrelid
+           WHERE c.relname = $1""",
+        index_name
+    )
+    if invalid:
+        print(f"  ⚠️ Rebuilding invalid index {index_name}")
+        await conn.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {index_name}")
+
+
+async def execute_concurrently(conn: asyncpg.Connection, statement: str) -> None:
+    """Run one statement outside a transaction, repairing invalid concurrent indexes first"""
+    match = _CONCURRENT_INDEX_RE.search(statement)
+    if match:
+        await drop_invalid_index(conn, match.group(1))
+    await conn.execute(statement)
+
+
+def _load_module(migration: Migration):
+    spec = importlib.util.spec_from_file_location(f"migration_{migration.version}", migration.path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+async def apply_migration(conn: asyncpg.Connection, migration: Migration) -> None:
+    if migration.is_python:
+        module = _load_module(migration)
+        if getattr(module, "TRANSACTIONAL", True):
+            async with conn.transaction():
+                await module.migrate(conn)
+        else:
+            await module.migrate(conn)
+        return
+
+    with open(migration.path) as f:
+        sql = f.read()
+    if sql.lstrip().startswith(_NO_TRANSACTION_MARKER):
+        for statement in split_statements(sql):
+            await execute_concurrently(conn, statement)
+    else:
+        async with conn.transaction():
+            await conn.execute(sql)
+
+
+async def ensure_migrations_table(conn: asyncpg.Connection) -> None:
+    await conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version VARCHAR(16) PRIMARY KEY,
+            name VARCHAR(255) NOT NULL,
+            checksum CHAR(64) NOT NULL,
+            applied_at TIMESTAMPTZ DEFAULT NOW(),
+            duration_ms INTEGER
+        );
+    """)
+
+
+async def applied_migrations(conn: asyncpg.Connection) -> dict:
+    rows = await conn.fetch("SELECT version, name, checksum, applied_at FROM schema_migrations ORDER BY version")
+    return {row["version"]: row for row in rows}
+
+
+async def run_migrations(conn: asyncpg.Connection, directory: str = MIGRATIONS_DIR,
+                         target: Optional[str] = None) -> List[str]:
+    """Apply every pending migration up to ``target`` (inclusive); returns the versions applied"""
+    await conn.execute("SELECT pg_advisory_lock($1)", MIGRATION_LOCK_ID)
+    try:
+        await ensure_migrations_table(conn)
+        applied = await applied_migrations(conn)
+        done = []
+        for migration in discover_migrations(directory):
+            if target and migration.version > target:
+                break
+            if migration.version in applied:
+                if applied[migration.version]["checksum"] != migration.checksum:
+                    print(f"  ⚠️ {migration.version}_{migration.name} changed after it was applied")
+                continue
+
+            print(f"📋 Applying {migration.version}_{migration.name}...")
+            started = time.monotonic()
+            await apply_migration(conn, migration)
+            duration_ms = int((time.monotonic() - started) * 1000)
+            await conn.execute(
+                """INSERT INTO schema_migrations (version, name, checksum, duration_ms)
+                   VALUES ($1, $2, $3, $4)""",
+                migration.version, migration.name, migration.checksum, duration_ms
+            )
+            print(f"  ✅ {migration.version}_{migration.name} applied in {duration_ms} ms")
+            done.append(migration.version)
+        return done
+    finally:
+        await conn.execute("SELECT pg_advisory_unlock($1)", MIGRATION_LOCK_ID)
+
+
+async def migration_status(conn: asyncpg.Connection, directory: str = MIGRATIONS_DIR) -> List[dict]:
+    await ensure_migrations_table(conn)
+    applied = await applied_migrations(conn)
+    return [
+        {
+            "version": m.version,
+            "name": m.name,
+            "applied_at": applied[m.version]["applied_at"] if m.version in applied else None,
+            "modified": m.version in applied and applied[m.version]["checksum"] != m.checksum,
+        }
+        for m in discover_migrations(directory)
+    ]
+
+
+__all__ = [
+    "MIGRATIONS_DIR",
+    "discover_migrations",
+    "migration_status",
+    "run_migrations",
+    "split_statements",
+]
@@ -0,0 +1,301 @@
+"""Health and latency probing of tenant n8n instances.
+
+The ``n8n_health`` maintenance job probes every active tenant's n8n
+``/healthz`` concurrently (bounded by ``N8N_HEALTH_PROBE_CONCURRENCY``, with
+a short timeout). It keeps per tenant:
+
+- up/down state: down after ``N8N_HEALTH_DOWN_AFTER_FAILURES`` failed probes
+  in a row, up again on the first success;
+- a rolling window of successful probe latencies, with p50/p90/p99.
+
+The state lives in memory for fast checks and in ``tenant_n8n_health``.
+Only one process probes at a time (``pg_try_advisory_lock``), and a round
+is skipped when another worker probed within the current interval, so each
+tenant is probed about once per interval however many workers run. Processes
+that do not probe reload the table instead, so every worker fails fast on the
+same information.
+
+Outbound calls to a tenant's n8n (add-paste, workflow installs and rollouts)
+call ``ensure_n8n_available`` first. When the instance is known to be down,
+they get an immediate 503 instead of waiting out a 30 second timeout. An
+instance that has not been probed yet is assumed up.
+
+Usage:
+
+    from app.libs.n8n_health import ensure_n8n_available
+
+    ensure_n8n_available(tenant_slug)  # raises HTTPException(503) when down
+"""
+
+import asyncio
+import os
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+import asyncpg
+import httpx
+from fastapi import HTTPException
+
+from app.libs.db_connection import get_db_connection
+
+# Configuration
+N8N_HEALTH_PROBE_INTERVAL_SECONDS = int(os.getenv("N8N_HEALTH_PROBE_INTERVAL_SECONDS", "30"))
+N8N_HEALTH_PROBE_TIMEOUT_SECONDS = float(os.getenv("N8N_HEALTH_PROBE_TIMEOUT_SECONDS", "5"))
+N8N_HEALTH_PROBE_CONCURRENCY = int(os.getenv("N8N_HEALTH_PROBE_CONCURRENCY", "50"))
+N8N_HEALTH_DOWN_AFTER_FAILURES = int(os.getenv("N8N_HEALTH_DOWN_AFTER_FAILURES", "2"))
+N8N_HEALTH_WINDOW = int(os.getenv("N8N_HEALTH_WINDOW", "60"))
+N8N_HEALTH_PATH = os.getenv("N8N_HEALTH_PATH", "/healthz")
+
+# A round younger than this counts as the current tick; below the interval so worker timer drift does not skip a round
+N8N_HEALTH_MIN_PROBE_SPACING_SECONDS = N8N_HEALTH_PROBE_INTERVAL_SECONDS * 0.8
+
+# pg_try_advisory_lock key: one prober per tick across processes
+N8N_HEALTH_LOCK_KEY = 727002
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the shared probe client, creating it on first use"""
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            timeout=httpx.Timeout(N8N_HEALTH_PROBE_TIMEOUT_SECONDS, connect=min(N8N_HEALTH_PROBE_TIMEOUT_SECONDS, 3.0)),
+            limits=httpx.Limits(max_connections=N8N_HEALTH_PROBE_CONCURRENCY, max_keepalive_connections=N8N_HEALTH_PROBE_CONCURRENCY),
+        )
+    return _client
+
+
+def tenant_n8n_url(tenant_slug: str, n8n_url: Optional[str] = None) -> str:
+    """Base URL of a tenant's n8n: tenants.n8n_url when set, else the slug subdomain"""
+    if n8n_url:
+        return n8n_url.rstrip("/")
+    return f"https://{tenant_slug}.n8n.flomastr.com"
+
+
+def _percentile(sorted_values: List[float], q: float) -> Optional[float]:
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+class TenantN8nHealth:
+    def __init__(self, tenant_id, tenant_slug: str):
+        self.tenant_id = tenant_id
+        self.tenant_slug = tenant_slug
+        self.is_up: Optional[bool] = None
+        self.consecutive_failures = 0
+        self.last_status_code: Optional[int] = None
+        self.last_latency_ms: Optional[float] = None
+        self.latencies: deque = deque(maxlen=N8N_HEALTH_WINDOW)
+        self.last_error: Optional[str] = None
+        self.checked_at: Optional[datetime] = None
+        self.last_up_at: Optional[datetime] = None
+        self.state_changed_at: Optional[datetime] = None
+
+    @classmethod
+    def from_row(cls, row: asyncpg.Record) -> "TenantN8nHealth":
+        health = cls(row["tenant_id"], row["tenant_slug"])
+        health.is_up = row["is_up"]
+        health.consecutive_failures = row["consecutive_failures"]
+        health.last_status_code = row["last_status_code"]
+        health.last_latency_ms = row["last_latency_ms"]
+        health.latencies.extend(row["recent_latencies_ms"] or [])
+        health.last_error = row["last_error"]
+        health.checked_at = row["checked_at"]
+        health.last_up_at = row["last_up_at"]
+        health.state_changed_at = row["state_changed_at"]
+        return health
+
+    def record(self, ok: bool, status_code: Optional[int], latency_ms: float, error: Optional[str]) -> bool:
+        """Apply one probe result; returns True when the up/down state changed"""
+        now = datetime.now(timezone.utc)
+        self.checked_at = now
+        self.last_status_code = status_code
+        self.last_latency_ms = latency_ms
+        if ok:
+            self.consecutive_failures = 0
+            self.last_error = None
+            self.last_up_at = now
+            self.latencies.append(latency_ms)
+            is_up = True
+        else:
+            self.consecutive_failures += 1
+            self.last_error = error
+            # A single blip does not mark an instance down (nor a new one up)
+            is_up = self.is_up if self.consecutive_failures < N8N_HEALTH_DOWN_AFTER_FAILURES else False
+
+        changed = is_up != self.is_up
+        if changed:
+            self.state_changed_at = now
+        self.is_up = is_up
+        return changed
+
+    def percentiles(self) -> Dict[str, Optional[float]]:
+        values = sorted(self.latencies)
+        return {
+            "p50_latency_ms": _percentile(values, 0.50),
+            "p90_latency_ms": _percentile(values, 0.90),
+            "p99_latency_ms": _percentile(values, 0.99),
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "tenant_id": self.tenant_id,
+            "tenant_slug": self.tenant_slug,
+            "is_up": self.is_up,
+            "consecutive_failures": self.consecutive_failures,
+            "last_status_code": self.last_status_code,
+            "last_latency_ms": self.last_latency_ms,
+            **self.percentiles(),
+            "samples": len(self.latencies),
+            "last_error": self.last_error,
+            "checked_at": self.checked_at,
+            "last_up_at": self.last_up_at,
+            "state_changed_at": self.state_changed_at,
+        }
+
+
+# tenant slug -> health
+_health: Dict[str, TenantN8nHealth] = {}
+
+
+def get_n8n_health(tenant_slug: str) -> Optional[TenantN8nHealth]:
+    return _health.get(tenant_slug)
+
+
+def all_n8n_health() -> List[TenantN8nHealth]:
+    return sorted(_health.values(), key=lambda health: health.tenant_slug)
+
+
+def ensure_n8n_available(tenant_slug: str) -> None:
+    """Fail fast with 503 when the tenant's n8n is known to be down"""
+    health = _health.get(tenant_slug)
+    if health and health.is_up is False:
+        raise HTTPException(
+            status_code=503,
+            detail=f"n8n instance for tenant {tenant_slug} is currently unavailable",
+            headers={"Retry-After": str(N8N_HEALTH_PROBE_INTERVAL_SECONDS)}
+        )
+
+
+async def probe_n8n(tenant_slug: str, n8n_url: Optional[str]) -> tuple:
+    """One health check; returns (ok, status_code, latency_ms, error)"""
+    url = f"{tenant_n8n_url(tenant_slug, n8n_url)}{N8N_HEALTH_PATH}"
+    started = time.perf_counter()
+    try:
+        response = await get_http_client().get(url)
+        latency_ms = (time.perf_counter() - started) * 1000
+        if response.status_code == 200:
+            return True, 200, latency_ms, None
+        return False, response.status_code, latency_ms, f"HTTP {response.status_code}"
+    except httpx.HTTPError as e:
+        return False, None, (time.perf_counter() - started) * 1000, f"{e.__class__.__name__}: {e}"[:500]
+
+
+async def load_health_state(conn: asyncpg.Connection) -> None:
+    """Replace the in-memory state with the latest persisted results"""
+    rows = await conn.fetch("SELECT * FROM tenant_n8n_health")
+    loaded = {row["tenant_slug"]: TenantN8nHealth.from_row(row) for row in rows}
+    _health.clear()
+    _health.update(loaded)
+
+
+async def probe_all_tenants(conn: asyncpg.Connection) -> Dict[str, int]:
+    """Probe every active tenant concurrently and persist the results"""
+    tenants = await conn.fetch(
+        "SELECT id, slug, n8n_url FROM tenants WHERE deleted_at IS NULL AND status = 'active'"
+    )
+    # Continue from the shared window, whichever process probed last
+    await load_health_state(conn)
+    semaphore = asyncio.Semaphore(max(1, N8N_HEALTH_PROBE_CONCURRENCY))
+
+    async def probe_one(tenant) -> TenantN8nHealth:
+        async with semaphore:
+            result = await probe_n8n(tenant["slug"], tenant["n8n_url"])
+        health = _health.get(tenant["slug"]) or TenantN8nHealth(tenant["id"], tenant["slug"])
+        if health.record(*result):
+            state = "UP" if health.is_up else "DOWN"
+            print(f"N8N_HEALTH: tenant {tenant['slug']} n8n is {state} ({health.last_error or f'{health.last_latency_ms:.0f} ms'})")
+        return health
+
+    results = await asyncio.gather(*(probe_one(tenant) for tenant in tenants))
+    _health.clear()
+    _health.update({health.tenant_slug: health for health in results})
+
+    await conn.executemany(
+        """INSERT INTO tenant_n8n_health
+               (tenant_id, tenant_slug, is_up, consecutive_failures, last_status_code, last_latency_ms,
+                recent_latencies_ms, p50_latency_ms, p90_latency_ms, p99_latency_ms, last_error,
+                checked_at, last_up_at, state_changed_at)
+           VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13, $14)
+           ON CONFLICT (tenant_id) DO UPDATE SET
+               tenant_slug = EXCLUDED.tenant_slug,
+               is_up = EXCLUDED.is_up,
+               consecutive_failures = EXCLUDED.consecutive_failures,
+               last_status_code = EXCLUDED.last_status_code,
+               last_latency_ms = EXCLUDED.last_latency_ms,
+               recent_latencies_ms = EXCLUDED.recent_latencies_ms,
+               p50_latency_ms = EXCLUDED.p50_latency_ms,
+               p90_latency_ms = EXCLUDED.p90_latency_ms,
+               p99_latency_ms = EXCLUDED.p99_latency_ms,
+               last_error = EXCLUDED.last_error,
+               checked_at = EXCLUDED.checked_at,
+               last_up_at = EXCLUDED.last_up_at,
+               state_changed_at = EXCLUDED.state_changed_at""",
+        [
+            (h.tenant_id, h.tenant_slug, h.is_up, h.consecutive_failures, h.last_status_code, h.last_latency_ms,
+             list(h.latencies), *h.percentiles().values(), h.last_error, h.checked_at, h.last_up_at, h.state_changed_at)
+            for h in results
+        ]
+    )
+    # Tenants deleted or deactivated since
+    await conn.execute(
+        "DELETE FROM tenant_n8n_health WHERE NOT (tenant_id = ANY($1::uuid[]))",
+        [tenant["id"] for tenant in tenants]
+    )
+
+    up = sum(1 for health in results if health.is_up)
+    return {"tenants": len(results), "up": up, "down": len(results) - up}
+
+
+async def run_n8n_health_probe() -> Optional[Dict[str, int]]:
+    """Maintenance entry point: probe all tenants, or mirror the process that currently does"""
+    conn = await get_db_connection()
+    try:
+        if not await conn.fetchval("SELECT pg_try_advisory_lock($1)", N8N_HEALTH_LOCK_KEY):
+            await load_health_state(conn)
+            return None
+        try:
+            # The lock is free between ticks, so every worker gets it in turn; probe only when the last round is due
+            probed_recently = await conn.fetchval(
+                "SELECT MAX(checked_at) > NOW() - make_interval(secs => $1) FROM tenant_n8n_health",
+                N8N_HEALTH_MIN_PROBE_SPACING_SECONDS
+            )
+            if probed_recently:
+                await load_health_state(conn)
+                return None
+            summary = await probe_all_tenants(conn)
+        finally:
+            await conn.execute("SELECT pg_advisory_unlock($1)", N8N_HEALTH_LOCK_KEY)
+        if summary["down"]:
+            print(f"N8N_HEALTH: {summary['down']} of {summary['tenants']} tenant n8n instances down")
+        return summary
+    finally:
+        await conn.close()
+
+
+__all__ = [
+    "N8N_HEALTH_PROBE_INTERVAL_SECONDS",
+    "TenantN8nHealth",
+    "all_n8n_health",
+    "ensure_n8n_available",
+    "get_n8n_health",
+    "load_health_state",
+    "probe_all_tenants",
+    "probe_n8n",
+    "run_n8n_health_probe",
+    "tenant_n8n_url",
+]
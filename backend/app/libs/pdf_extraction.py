@@ -0,0 +1,147 @@
+"""Off-loop document extraction for the conversion tools.
+
+Uploads are spooled to a temporary file in fixed-size chunks instead of being
+read into memory, and PDF text is extracted by a process pool in page-range
+shards so PyPDF2 never runs on the event loop. Pages are yielded in order as
+soon as their shard finishes, which lets callers stream markdown per page.
+
+Usage:
+
+    from app.libs.pdf_extraction import spool_upload, iter_pdf_pages
+
+    path = await spool_upload(file)
+    try:
+        async for page_text in iter_pdf_pages(path):
+            ...
+    finally:
+        os.unlink(path)
+"""
+
+import asyncio
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import AsyncIterator, Dict, List, Optional
+
+from fastapi import HTTPException
+
+# Configuration
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(50 * 1024 * 1024)))
+PDF_MAX_PAGES = int(os.getenv("PDF_MAX_PAGES", "1000"))
+PDF_SHARD_PAGES = int(os.getenv("PDF_SHARD_PAGES", "25"))
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", str(min(4, os.cpu_count() or 1))))
+CONVERT_MAX_CONCURRENCY_PER_TENANT = int(os.getenv("CONVERT_MAX_CONCURRENCY_PER_TENANT", "2"))
+SPOOL_CHUNK_BYTES = 1024 * 1024
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def get_executor() -> ProcessPoolExecutor:
+    """Return the shared extraction process pool, creating it on first use"""
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=PDF_WORKERS)
+    return _executor
+
+
+async def spool_upload(file, max_bytes: int = UPLOAD_MAX_BYTES, suffix: str = "") -> str:
+    """Copy an UploadFile to a temp file chunk by chunk, enforcing the byte limit.
+
+    Returns the temp file path; the caller is responsible for deleting it.
+    """
+    fd, path = tempfile.mkstemp(prefix="flomastr-upload-", suffix=suffix)
+    written = 0
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = await file.read(SPOOL_CHUNK_BYTES)
+                if not chunk:
+                    break
+                written += len(chunk)
+                if written > max_bytes:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"File too large (max {max_bytes // (1024 * 1024)}MB)"
+                    )
+                out.write(chunk)
+    except BaseException:
+        os.unlink(path)
+        raise
+    return path
+
+
+def _count_pages(path: str) -> int:
+    # Runs in a worker process
+    from PyPDF2 import PdfReader
+    return len(PdfReader(path).pages)
+
+
+def _extract_page_range(path: str, start: int, end: int) -> List[str]:
+    # Runs in a worker process; each shard opens its own reader
+    from PyPDF2 import PdfReader
+    reader = PdfReader(path)
+    return [(reader.pages[i].extract_text() or "") for i in range(start, end)]
+
+
+async def iter_pdf_pages(
+    path: str,
+    max_pages: int = PDF_MAX_PAGES,
+    shard_pages: int = PDF_SHARD_PAGES,
+) -> AsyncIterator[str]:
+    """Yield the text of each PDF page in order, extracting shards in parallel"""
+    loop = asyncio.get_running_loop()
+    executor = get_executor()
+
+    page_count = await loop.run_in_executor(executor, _count_pages, path)
+    if page_count > max_pages:
+        raise HTTPException(
+            status_code=413,
+            detail=f"PDF has {page_count} pages (max {max_pages})"
+        )
+
+    shards = [
+        loop.run_in_executor(executor, _extract_page_range, path, start, min(start + shard_pages, page_count))
+        for start in range(0, page_count, shard_pages)
+    ]
+    try:
+        for shard in shards:
+            for page_text in await shard:
+                yield page_text
+    finally:
+        for shard in shards:
+            shard.cancel()
+
+
+class TenantConcurrencyLimiter:
+    """Caps concurrent conversions per tenant; excess requests get 429"""
+
+    def __init__(self, limit: int = CONVERT_MAX_CONCURRENCY_PER_TENANT):
+        self.limit = limit
+        self._active: Dict[str, int] = {}
+
+    def acquire(self, tenant_key: str) -> None:
+        if self._active.get(tenant_key, 0) >= self.limit:
+            raise HTTPException(
+                status_code=429,
+                detail=f"Too many concurrent conversions for tenant '{tenant_key}' (max {self.limit})"
+            )
+        self._active[tenant_key] = self._active.get(tenant_key, 0) + 1
+
+    def release(self, tenant_key: str) -> None:
+        remaining = self._active.get(tenant_key, 1) - 1
+        if remaining > 0:
+            self._active[tenant_key] = remaining
+        else:
+            self._active.pop(tenant_key, None)
+
+
+conversion_limiter = TenantConcurrencyLimiter()
+
+__all__ = [
+    "UPLOAD_MAX_BYTES",
+    "PDF_MAX_PAGES",
+    "spool_upload",
+    "iter_pdf_pages",
+    "TenantConcurrencyLimiter",
+    "conversion_limiter",
+]
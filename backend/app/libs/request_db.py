@@ -0,0 +1,89 @@
+"""Request-scoped database connection.
+
+Before this, a tenant-scoped request connected once in
+``require_tenant_membership`` and again in the handler, and a handler that
+called another handler (``upload_logo`` -> ``update_branding_settings``)
+connected a third time. Every ``get_db_connection()`` is a new TCP + TLS
+handshake.
+
+``RequestDBDep`` gives every dependency and handler of a request the same
+``RequestDB``, since FastAPI caches a dependency per request. The connection
+is opened on the first ``await db.connection()``, so a request that never
+touches the database never connects. It is closed in the dependency's
+cleanup once the handler is done. Helpers receive the ``RequestDB`` (or its
+connection) as an argument.
+
+A handler that makes slow outbound calls (n8n installs, webhooks) takes
+``RequestDBDep`` as well and calls ``await db.close()`` once it is done with
+the database, so no idle connection is held through the call. A later
+``db.connection()`` reopens it.
+
+Queries on the shared connection run one at a time, as they already did in
+every handler. Fan out over separate connections where a request needs
+concurrent queries.
+
+Usage:
+
+    from app.libs.request_db import RequestDB, RequestDBDep
+
+    @router.get("/tenants/{tenant_slug}/things")
+    async def list_things(tenant_user: TenantAuthorizedUser = TenantUserDep, db: RequestDB = RequestDBDep):
+        conn = await db.connection()
+        return await conn.fetch("SELECT ...")
+"""
+
+import asyncio
+from typing import AsyncIterator, Optional
+
+import asyncpg
+from fastapi import Depends, Request
+
+from app.libs.db_connection import get_db_connection
+
+
+class RequestDB:
+    """Lazily opened connection shared by everything that handles one request"""
+
+    def __init__(self):
+        self._conn: Optional[asyncpg.Connection] = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        return self._conn is not None
+
+    async def connection(self) -> asyncpg.Connection:
+        if self._conn is None:
+            async with self._lock:
+                if self._conn is None:
+                    self._conn = await get_db_connection()
+        return self._conn
+
+    async def close(self) -> None:
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            try:
+                await conn.close()
+            except Exception as e:
+                print(f"REQUEST_DB: error closing connection: {e}")
+
+
+async def get_request_db(request: Request) -> AsyncIterator[RequestDB]:
+    """FastAPI dependency: one RequestDB per request, closed when the request is done"""
+    db = RequestDB()
+    # Also reachable from code that only has the Request
+    request.state.db = db
+    try:
+        yield db
+    finally:
+        await db.close()
+
+
+RequestDBDep = Depends(get_request_db)
+
+
+__all__ = [
+    "RequestDB",
+    "RequestDBDep",
+    "get_request_db",
+]
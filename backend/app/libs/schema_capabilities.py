@@ -0,0 +1,136 @@
+"""In-memory map of which tables and columns exist in the database.
+
+Handlers that must cope with optional tables used to query
+``information_schema`` on every request. Instead, the catalog is read once
+(at startup, or lazily on first use), kept in memory and refreshed when it is
+older than SCHEMA_CAPABILITIES_TTL_SECONDS or after ``invalidate_schema_capabilities()`` — which
+is wired to SIGHUP, so ``kill -HUP`` picks up a migration without a restart.
+
+Usage:
+
+    from app.libs.schema_capabilities import get_schema_capabilities
+
+    schema = await get_schema_capabilities(conn)
+    if schema.has_table("user_roles"):
+        ...
+"""
+
+import asyncio
+import os
+import signal
+import time
+from typing import Dict, Optional, Set
+
+import asyncpg
+
+from app.libs.db_connection import get_db_connection
+
+# Configuration
+SCHEMA_CAPABILITIES_TTL_SECONDS = float(os.getenv("SCHEMA_CAPABILITIES_TTL_SECONDS", "300"))
+
+
+class SchemaCapabilities:
+    """Snapshot of the tables and columns visible on the search_path"""
+
+    def __init__(self, columns: Optional[Dict[str, Set[str]]] = None):
+        self.columns: Dict[str, Set[str]] = columns or {}
+        self.loaded_at: Optional[float] = None
+
+    def has_table(self, table: str) -> bool:
+        return table in self.columns
+
+    def has_column(self, table: str, column: str) -> bool:
+        return column in self.columns.get(table, ())
+
+    def missing_tables(self, *tables: str) -> list:
+        return [table for table in tables if table not in self.columns]
+
+    @property
+    def is_stale(self) -> bool:
+        return self.loaded_at is None or time.monotonic() - self.loaded_at > SCHEMA_CAPABILITIES_TTL_SECONDS
+
+    async def load(self, conn: asyncpg.Connection) -> None:
+        rows = await conn.fetch(
+            """SELECT c.relname AS table_name, a.attname AS column_name
+               FROM pg_class c
+               JOIN pg_namespace n ON n.oid = c.relnamespace
+               JOIN pg_attribute a ON a.attrelid = c.oid AND a.attnum > 0 AND NOT a.attisdropped
+               WHERE c.relkind IN ('r', 'p', 'v', 'm')
+                 AND n.nspname = ANY (current_schemas(false))"""
+        )
+        columns: Dict[str, Set[str]] = {}
+        for row in rows:
+            columns.setdefault(row["table_name"], set()).add(row["column_name"])
+        self.columns = columns
+        self.loaded_at = time.monotonic()
+
+    def summary(self) -> dict:
+        return {
+            "tables": len(self.columns),
+            "age_seconds": round(time.monotonic() - self.loaded_at, 1) if self.loaded_at else None,
+        }
+
+
+_capabilities = SchemaCapabilities()
+_refresh_lock = asyncio.Lock()
+
+
+async def refresh_schema_capabilities(
+    conn: Optional[asyncpg.Connection] = None, only_if_stale: bool = False
+) -> SchemaCapabilities:
+    """Reload the catalog snapshot, using ``conn`` if given or a short-lived connection"""
+    async with _refresh_lock:
+        # Concurrent requests that found it stale reload it only once
+        if only_if_stale and not _capabilities.is_stale:
+            return _capabilities
+        own_conn = conn is None
+        if own_conn:
+            conn = await get_db_connection()
+        try:
+            await _capabilities.load(conn)
+        finally:
+            if own_conn:
+                await conn.close()
+    print(f"SCHEMA_CAPABILITIES: loaded {len(_capabilities.columns)} tables")
+    return _capabilities
+
+
+async def get_schema_capabilities(conn: Optional[asyncpg.Connection] = None) -> SchemaCapabilities:
+    """Current snapshot; only touches the database when it is missing or stale.
+
+    A stale snapshot is reloaded in place. If that fails the previous
+    snapshot keeps being served rather than failing the request.
+    """
+    if not _capabilities.is_stale:
+        return _capabilities
+    try:
+        return await refresh_schema_capabilities(conn, only_if_stale=True)
+    except Exception as e:
+        if not _capabilities.columns:
+            raise
+        print(f"SCHEMA_CAPABILITIES: refresh failed, serving previous snapshot: {e}")
+        # Back off until the next TTL instead of retrying on every request
+        _capabilities.loaded_at = time.monotonic()
+        return _capabilities
+
+
+def invalidate_schema_capabilities() -> None:
+    """Force a reload on the next ``get_schema_capabilities`` call"""
+    _capabilities.loaded_at = None
+
+
+def install_reload_signal_handler() -> None:
+    """Invalidate the snapshot on SIGHUP (no-op where signals are unsupported)"""
+    try:
+        asyncio.get_running_loop().add_signal_handler(signal.SIGHUP, invalidate_schema_capabilities)
+    except (NotImplementedError, AttributeError, RuntimeError):
+        pass
+
+
+__all__ = [
+    "SchemaCapabilities",
+    "get_schema_capabilities",
+    "install_reload_signal_handler",
+    "invalidate_schema_capabilities",
+    "refresh_schema_capabilities",
+]
@@ -0,0 +1,207 @@
+"""Shared LLM synthesis engine for the knowledge tools.
+
+All answer generation goes through one lazily constructed ``AsyncOpenAI``
+client so HTTP connections are pooled and reused across requests. Calls are
+bounded by a process-wide semaphore and every request carries its own timeout.
+
+Usage:
+
+    from app.libs.synthesis import synthesize_answer, stream_answer
+
+    answer = await synthesize_answer(query, context)
+
+    async for token in stream_answer(query, context):
+        ...
+"""
+
+import asyncio
+import json
+import os
+from typing import AsyncIterator, Dict, List, Optional
+
+import httpx
+
+# Try to import OpenAI, but make it optional
+try:
+    from openai import APITimeoutError, AsyncOpenAI
+    OPENAI_AVAILABLE = True
+except ImportError:
+    OPENAI_AVAILABLE = False
+    AsyncOpenAI = None
+    APITimeoutError = None
+
+# Configuration
+SYNTHESIS_MODEL = os.getenv("SYNTHESIS_MODEL", "gpt-4o-mini")
+SYNTHESIS_TIMEOUT_SECONDS = float(os.getenv("SYNTHESIS_TIMEOUT_SECONDS", "30"))
+SYNTHESIS_MAX_CONCURRENCY = int(os.getenv("SYNTHESIS_MAX_CONCURRENCY", "16"))
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "32"))
+
+# System prompt to instruct the LLM to act as a knowledge assistant
+SYSTEM_PROMPT = (
+    "You are a helpful knowledge assistant. Your task is to provide a concise and direct answer to the user's question. "
+    "The user will provide a question and a block of context. "
+    "You must answer the question using ONLY the information provided in the context. "
+    "If the context does not contain the answer, state that you cannot answer based on the provided information. "
+    "Do not use any prior knowledge. Do not make up any information. "
+    "Answer in a professional and helpful tone."
+)
+
+
+class SynthesisUnavailableError(RuntimeError):
+    """Raised when no LLM client can be constructed (missing package or API key)."""
+
+
+class SynthesisTimeoutError(RuntimeError):
+    """Raised when the LLM does not answer within the per-request timeout."""
+
+
+# The client's own timeout can fire before asyncio.wait_for (and surfaces as
+# APITimeoutError, or httpx.TimeoutException while a stream is read); all of
+# them mean the LLM did not answer in time
+_TIMEOUT_ERRORS = tuple(
+    error for error in (asyncio.TimeoutError, APITimeoutError, httpx.TimeoutException) if error is not None
+)
+
+
+# Shared client and concurrency limiter (created lazily on first use)
+_client = None
+_semaphore: Optional[asyncio.Semaphore] = None
+
+
+def get_openai_client():
+    """Return the process-wide AsyncOpenAI client, creating it on first use.
+
+    ``OPENAI_BASE_URL`` may point at any OpenAI-compatible endpoint.
+    """
+    global _client
+
+    if _client is not None:
+        return _client
+
+    if not OPENAI_AVAILABLE:
+        raise SynthesisUnavailableError("openai package is not installed")
+
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        raise SynthesisUnavailableError("OPENAI_API_KEY is not configured")
+
+    http_client = httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=OPENAI_MAX_CONNECTIONS,
+            max_keepalive_connections=OPENAI_MAX_CONNECTIONS,
+        ),
+        timeout=httpx.Timeout(SYNTHESIS_TIMEOUT_SECONDS, connect=5.0),
+    )
+    _client = AsyncOpenAI(
+        api_key=api_key,
+        base_url=os.getenv("OPENAI_BASE_URL") or None,
+        http_client=http_client,
+        max_retries=1,
+    )
+    return _client
+
+
+def _get_semaphore() -> asyncio.Semaphore:
+    """Bound the number of in-flight LLM calls for this process."""
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(SYNTHESIS_MAX_CONCURRENCY)
+    return _semaphore
+
+
+def build_messages(query: str, context: str, system_prompt: str = SYSTEM_PROMPT) -> List[Dict[str, str]]:
+    """Combine the user query and context into the message history"""
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": f"Context:\n{context}\n\nQuestion:\n{query}"}
+    ]
+
+
+async def synthesize_answer(
+    query: str,
+    context: str,
+    model: str = SYNTHESIS_MODEL,
+    timeout: Optional[float] = None,
+) -> str:
+    """Generate a complete answer using only the provided context."""
+    client = get_openai_client()
+    timeout = timeout or SYNTHESIS_TIMEOUT_SECONDS
+
+    try:
+        async with _get_semaphore():
+            response = await asyncio.wait_for(
+                client.chat.completions.create(
+                    model=model,
+                    messages=build_messages(query, context),
+                    temperature=0.0,  # Deterministic, factual responses
+                    timeout=timeout,
+                ),
+                timeout=timeout,
+            )
+    except _TIMEOUT_ERRORS as e:
+        raise SynthesisTimeoutError(f"LLM did not respond within {timeout}s") from e
+
+    return response.choices[0].message.content or ""
+
+
+async def stream_answer(
+    query: str,
+    context: str,
+    model: str = SYNTHESIS_MODEL,
+    timeout: Optional[float] = None,
+) -> AsyncIterator[str]:
+    """Yield answer tokens as the LLM produces them.
+
+    The timeout bounds the wait for the first token; subsequent reads are
+    bounded by the client's read timeout.
+    """
+    client = get_openai_client()
+    timeout = timeout or SYNTHESIS_TIMEOUT_SECONDS
+
+    async with _get_semaphore():
+        try:
+            stream = await asyncio.wait_for(
+                client.chat.completions.create(
+                    model=model,
+                    messages=build_messages(query, context),
+                    temperature=0.0,
+                    stream=True,
+                    timeout=timeout,
+                ),
+                timeout=timeout,
+            )
+        except _TIMEOUT_ERRORS as e:
+            raise SynthesisTimeoutError(f"LLM did not respond within {timeout}s") from e
+
+        try:
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                token = chunk.choices[0].delta.content
+                if token:
+                    yield token
+        except _TIMEOUT_ERRORS as e:
+            raise SynthesisTimeoutError(f"LLM stopped responding for {timeout}s mid-answer") from e
+        finally:
+            await stream.close()
+
+
+def format_sse(data: dict, event: Optional[str] = None) -> str:
+    """Format a single Server-Sent Events frame"""
+    frame = f"data: {json.dumps(data)}\n\n"
+    if event:
+        frame = f"event: {event}\n" + frame
+    return frame
+
+
+__all__ = [
+    "SYSTEM_PROMPT",
+    "SYNTHESIS_MODEL",
+    "SynthesisUnavailableError",
+    "SynthesisTimeoutError",
+    "get_openai_client",
+    "build_messages",
+    "synthesize_answer",
+    "stream_answer",
+    "format_sse",
+]
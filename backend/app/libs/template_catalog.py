@@ -0,0 +1,496 @@
+"""In-memory workflow template catalog, synced from master n8n.
+
+The gallery used to call master n8n on every page load and re-derive tags,
+``requires`` and icons for every workflow. The catalog instead syncs in the
+background (``template_catalog_sync`` maintenance job, or on demand through
+the sync webhook), derives those fields once per sync and keeps:
+
+- the gallery entries, in name order;
+- inverted indexes tag -> templates and requires -> templates, for filters
+  and facet counts;
+- a BM25 search index over name, description, tags, requires and node types,
+  with a sorted vocabulary so query words also match as prefixes. Each
+  posting holds its precomputed BM25 term score, and the scores and
+  relevance order of recent query words are cached per snapshot;
+- the unfiltered facet counts and the "tags" ordering, so a browse without
+  filters does not touch every template. A page is taken with a bounded heap
+  instead of sorting every match.
+
+A sync builds a complete new snapshot and swaps it in, so readers never see
+a half-built catalog. A failed sync keeps serving the previous snapshot, so
+the gallery stays up when master n8n is slow or down.
+
+Each process holds its own copy. After a sync, the ``template_catalog_version``
+row is bumped. Readers compare it with the version they hold, at most every
+TEMPLATE_CATALOG_VERSION_CHECK_SECONDS, and refresh in the background when
+another process has synced. A webhook sync on one worker therefore reaches
+the others within seconds, and only one process (the periodic job is a
+singleton) polls master n8n.
+
+Usage:
+
+    from app.libs.template_catalog import template_catalog
+
+    await template_catalog.ensure_loaded()
+    await template_catalog.check_version()
+    page = template_catalog.search("support bot", tags=["chatbot"], limit=20)
+"""
+
+import asyncio
+import heapq
+import math
+import os
+import re
+import time
+from bisect import bisect_left
+from collections import OrderedDict
+from itertools import islice
+from typing import Any, Dict, List, Optional, Set
+
+import httpx
+
+from app.libs.db_connection import get_db_connection
+
+# Configuration
+TEMPLATE_CATALOG_SOURCE_URL = os.getenv(
+    "TEMPLATE_CATALOG_SOURCE_URL", "https://test.n8n.flomastr.com/api/v1/workflows?active=true"
+)
+TEMPLATE_CATALOG_SYNC_SECONDS = int(os.getenv("TEMPLATE_CATALOG_SYNC_SECONDS", "300"))
+TEMPLATE_CATALOG_TIMEOUT_SECONDS = float(os.getenv("TEMPLATE_CATALOG_TIMEOUT_SECONDS", "30"))
+TEMPLATE_CATALOG_VERSION_CHECK_SECONDS = float(os.getenv("TEMPLATE_CATALOG_VERSION_CHECK_SECONDS", "10"))
+
+# BM25 ranking
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Each occurrence of a word counts this many times towards its term frequency
+FIELD_WEIGHTS = {"name": 3, "tags": 2, "requires": 2, "node_types": 1, "description": 1}
+# A query word that only matches as a prefix ("auto" -> "automation") scores lower than a whole word
+PREFIX_MATCH_WEIGHT = 0.6
+MAX_PREFIX_EXPANSIONS = 50
+# Scored query words kept per snapshot
+TEMPLATE_SEARCH_CACHE_ENTRIES = int(os.getenv("TEMPLATE_SEARCH_CACHE_ENTRIES", "1024"))
+
+# (tag, keywords matched against the lower-cased workflow name)
+TAG_RULES = [
+    ("webhook", ("webhook",)),
+    ("chatbot", ("chat", "bot", "support")),
+    ("email", ("email",)),
+    ("crm", ("crm", "lead")),
+    ("healthcare", ("health", "patient", "triage")),
+    ("booking", ("booking", "appointment")),
+    ("finance", ("finance", "invoice")),
+    ("automation", ("automation",)),
+]
+
+# (requirement, exact node types, substrings matched against lower-cased node types)
+REQUIRES_RULES = [
+    ("OpenAI", ("n8n-nodes-base.openAi",), ()),
+    ("Webhook", ("n8n-nodes-base.webhook",), ()),
+    ("Email", ("n8n-nodes-base.emailSend",), ()),
+    ("HTTP", ("n8n-nodes-base.httpRequest",), ()),
+    ("Twilio", (), ("twilio",)),
+    ("Zendesk", (), ("zendesk",)),
+    ("Calendar", (), ("calendar",)),
+    ("SMS", (), ("sms",)),
+]
+
+# First match wins
+ICON_BASE_URL = "https://cdn.flomastr.com/icons"
+ICON_RULES = [
+    ("chat.svg", ("chat", "bot", "support")),
+    ("email.svg", ("email",)),
+    ("webhook.svg", ("webhook",)),
+    ("crm.svg", ("crm", "lead")),
+    ("health.svg", ("health", "patient")),
+    ("calendar.svg", ("booking", "appointment")),
+    ("finance.svg", ("finance", "invoice")),
+]
+DEFAULT_ICON = "workflow.svg"
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_CAMEL_RE = re.compile(r"([a-z0-9])([A-Z])")
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+
+def node_type_terms(node_type: str) -> List[str]:
+    """Search words for a node type: "n8n-nodes-base.httpRequest" -> httprequest, http, request"""
+    name = node_type.rsplit(".", 1)[-1]
+    return list(dict.fromkeys(tokenize(name) + tokenize(_CAMEL_RE.sub(r"\1 \2", name))))
+
+
+def document_terms(template: Dict[str, Any]) -> Dict[str, int]:
+    """Field-weighted term frequencies of one template"""
+    fields = {
+        "name": tokenize(template["name"]),
+        "description": tokenize(template["description"]),
+        "tags": [term for tag in template["tags"] for term in tokenize(tag)],
+        "requires": [term for requirement in template["requires"] for term in tokenize(requirement)],
+        "node_types": [term for node_type in template["node_types"] for term in node_type_terms(node_type)],
+    }
+    terms: Dict[str, int] = {}
+    for field, tokens in fields.items():
+        for token in tokens:
+            terms[token] = terms.get(token, 0) + FIELD_WEIGHTS[field]
+    return terms
+
+
+def build_template(workflow: Dict[str, Any]) -> Dict[str, Any]:
+    """Gallery entry for one master n8n workflow, with every derived field precomputed"""
+    name = workflow.get("name", "Untitled Workflow")
+    name_lower = name.lower()
+    nodes = workflow.get("nodes")
+    node_types = [node.get("type", "") for node in nodes or []]
+    node_types_lower = [node_type.lower() for node_type in node_types]
+
+    if nodes is not None:
+        description = f"Automated workflow with {len(node_types)} steps"
+    else:
+        description = f"Automated workflow: {name}"
+
+    tags = ["active"] if workflow.get("active") else []
+    tags += [tag for tag, keywords in TAG_RULES if any(keyword in name_lower for keyword in keywords)]
+
+    requires = [
+        requirement
+        for requirement, exact, substrings in REQUIRES_RULES
+        if any(node_type in exact for node_type in node_types)
+        or any(sub in node_type for sub in substrings for node_type in node_types_lower)
+    ]
+
+    icon = next(
+        (icon for icon, keywords in ICON_RULES if any(keyword in name_lower for keyword in keywords)),
+        DEFAULT_ICON
+    )
+
+    return {
+        "id": str(workflow.get("id", "")),
+        "name": name,
+        "icon_url": f"{ICON_BASE_URL}/{icon}",
+        "description": description,
+        "tags": tags,
+        "requires": requires,
+        "node_types": sorted(set(node_types)),
+    }
+
+
+class CatalogSnapshot:
+    """Immutable catalog contents plus its indexes; templates are addressed by position"""
+
+    def __init__(self, templates: List[Dict[str, Any]]):
+        self.templates = sorted(templates, key=lambda t: t["name"].lower())
+        self.by_id = {template["id"]: template for template in self.templates}
+        self.all_docs = frozenset(range(len(self.templates)))
+        self.tag_index: Dict[str, Set[int]] = {}
+        self.requires_index: Dict[str, Set[int]] = {}
+        # facet value as displayed -> templates carrying it
+        self.tag_docs: Dict[str, Set[int]] = {}
+        self.requires_docs: Dict[str, Set[int]] = {}
+        frequencies: Dict[str, Dict[int, int]] = {}
+        doc_lengths: List[int] = []
+
+        for doc, template in enumerate(self.templates):
+            for tag in template["tags"]:
+                self.tag_index.setdefault(tag.lower(), set()).add(doc)
+                self.tag_docs.setdefault(tag, set()).add(doc)
+            for requirement in template["requires"]:
+                self.requires_index.setdefault(requirement.lower(), set()).add(doc)
+                self.requires_docs.setdefault(requirement, set()).add(doc)
+            terms = document_terms(template)
+            for term, frequency in terms.items():
+                frequencies.setdefault(term, {})[doc] = frequency
+            doc_lengths.append(sum(terms.values()))
+
+        self.vocabulary = sorted(frequencies)
+        avg_doc_length = (sum(doc_lengths) / len(doc_lengths)) if doc_lengths else 0.0
+        total = len(self.templates)
+        # term -> {doc: BM25 score of the term in that template}
+        self.postings: Dict[str, Dict[int, float]] = {}
+        for term, docs in frequencies.items():
+            idf = math.log(1 + (total - len(docs) + 0.5) / (len(docs) + 0.5))
+            self.postings[term] = {
+                doc: idf * frequency * (BM25_K1 + 1)
+                / (frequency + BM25_K1 * (1 - BM25_B + BM25_B * doc_lengths[doc] / avg_doc_length))
+                for doc, frequency in docs.items()
+            }
+
+        self.tag_counts = facet_counts(self.tag_docs, self.all_docs)
+        self.requires_counts = facet_counts(self.requires_docs, self.all_docs)
+        # Position of each template in "tags" order (most tags first, then name)
+        tags_order = sorted(self.all_docs, key=lambda doc: (-len(self.templates[doc]["tags"]), doc))
+        self.tags_order = tags_order
+        self.tags_rank = [0] * total
+        for rank, doc in enumerate(tags_order):
+            self.tags_rank[doc] = rank
+        # query word -> (scores, relevance order); belongs to this snapshot, so a sync starts it afresh
+        self._token_cache: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def expand(self, token: str) -> List[tuple]:
+        """(term, weight) pairs for a query word: the word itself plus words it prefixes"""
+        matches = []
+        position = bisect_left(self.vocabulary, token)
+        while position < len(self.vocabulary) and len(matches) < MAX_PREFIX_EXPANSIONS:
+            term = self.vocabulary[position]
+            if not term.startswith(token):
+                break
+            matches.append((term, 1.0 if term == token else PREFIX_MATCH_WEIGHT))
+            position += 1
+        return matches
+
+    def score(self, query: str) -> Dict[int, float]:
+        """BM25 scores of the templates matching every query word (as a word or prefix)"""
+        scores: Optional[Dict[int, float]] = None
+        for token in dict.fromkeys(tokenize(query)):
+            token_scores = self.token_scores(token)
+            if scores is None:
+                scores = token_scores
+            else:
+                scores = {doc: scores[doc] + term_score for doc, term_score in token_scores.items() if doc in scores}
+            if not scores:
+                break
+        return scores or {}
+
+    def token_scores(self, token: str) -> Dict[int, float]:
+        """BM25 scores of one query word; cached, since gallery queries repeat (treat as read-only)"""
+        return self._scored_token(token)[0]
+
+    def ranking(self, query: str) -> Optional[List[int]]:
+        """Cached relevance order of a one-word query (best first), else None"""
+        tokens = list(dict.fromkeys(tokenize(query)))
+        return self._scored_token(tokens[0])[1] if len(tokens) == 1 else None
+
+    def _scored_token(self, token: str) -> tuple:
+        cached = self._token_cache.get(token)
+        if cached is not None:
+            self._token_cache.move_to_end(token)
+            return cached
+        token_scores: Dict[int, float] = {}
+        for term, weight in self.expand(token):
+            get = token_scores.get
+            for doc, term_score in self.postings[term].items():
+                term_score *= weight
+                # A query word counts once, through its best-matching term
+                if term_score > get(doc, 0.0):
+                    token_scores[doc] = term_score
+        cached = (token_scores, sorted(token_scores, key=lambda doc: (-token_scores[doc], doc)))
+        self._token_cache[token] = cached
+        if len(self._token_cache) > TEMPLATE_SEARCH_CACHE_ENTRIES:
+            self._token_cache.popitem(last=False)
+        return cached
+
+    def docs_with_any(self, index: Dict[str, Set[int]], values: List[str]) -> Set[int]:
+        docs: Set[int] = set()
+        for value in values:
+            docs |= index.get(value.strip().lower(), set())
+        return docs
+
+
+def facet_counts(value_docs: Dict[str, Set[int]], docs: Set[int]) -> Dict[str, int]:
+    """Templates in ``docs`` per facet value, most common first; one set intersection per value"""
+    counts = {value: len(docs & with_value) for value, with_value in value_docs.items()}
+    return dict(sorted(((value, count) for value, count in counts.items() if count),
+                       key=lambda item: (-item[1], item[0])))
+
+
+class TemplateCatalog:
+    def __init__(self):
+        self.snapshot = CatalogSnapshot([])
+        self.synced_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+        # Shared catalog version this process last synced at
+        self.version: Optional[int] = None
+        self._version_checked_at = 0.0
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self._sync_lock = asyncio.Lock()
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=TEMPLATE_CATALOG_TIMEOUT_SECONDS)
+        return self._client
+
+    async def fetch_workflows(self) -> List[Dict[str, Any]]:
+        api_key = os.getenv("N8N_MASTER_API_KEY")
+        if not api_key:
+            raise RuntimeError("N8N master API key not configured")
+        response = await self._get_client().get(
+            TEMPLATE_CATALOG_SOURCE_URL,
+            headers={"X-N8N-API-KEY": api_key, "Accept": "application/json"},
+        )
+        if response.status_code != 200:
+            raise RuntimeError(f"Master n8n API error: {response.status_code} - {response.text[:200]}")
+        return response.json().get("data", [])
+
+    async def sync(self) -> int:
+        """Fetch, derive and index the catalog, swap it in and tell other processes; returns the template count"""
+        async with self._sync_lock:
+            count = await self._sync_locked()
+        try:
+            self.version = await self._bump_version()
+        except Exception as e:
+            print(f"TEMPLATE_CATALOG: could not publish catalog version, other processes refresh on their own: {e}")
+        return count
+
+    async def _bump_version(self) -> int:
+        conn = await get_db_connection()
+        try:
+            return await conn.fetchval(
+                """INSERT INTO template_catalog_version (id, version, synced_at) VALUES (1, 1, NOW())
+                   ON CONFLICT (id) DO UPDATE SET
+                       version = template_catalog_version.version + 1, synced_at = NOW()
+                   RETURNING version"""
+            )
+        finally:
+            await conn.close()
+
+    async def _read_version(self) -> Optional[int]:
+        conn = await get_db_connection()
+        try:
+            return await conn.fetchval("SELECT version FROM template_catalog_version WHERE id = 1")
+        finally:
+            await conn.close()
+
+    async def check_version(self) -> None:
+        """Refresh in the background when another process synced since we did (rate limited)"""
+        now = time.monotonic()
+        if now - self._version_checked_at < TEMPLATE_CATALOG_VERSION_CHECK_SECONDS:
+            return
+        if self._refresh_task and not self._refresh_task.done():
+            return
+        self._version_checked_at = now
+        try:
+            version = await self._read_version()
+        except Exception as e:
+            print(f"TEMPLATE_CATALOG: version check failed: {e}")
+            return
+        if version is not None and version != self.version:
+            self._refresh_task = asyncio.create_task(self._refresh(version))
+
+    async def _refresh(self, version: int) -> None:
+        try:
+            async with self._sync_lock:
+                await self._sync_locked()
+            self.version = version
+        except Exception:
+            # Already logged; the next check retries
+            pass
+
+    async def ensure_loaded(self) -> None:
+        """Block on a first sync only when nothing has ever been loaded"""
+        if self.synced_at is None:
+            async with self._sync_lock:
+                # Concurrent first requests share one sync
+                if self.synced_at is None:
+                    try:
+                        version = await self._read_version()
+                    except Exception:
+                        version = None
+                    await self._sync_locked()
+                    self.version = version
+
+    async def _sync_locked(self) -> int:
+        try:
+            workflows = await self.fetch_workflows()
+        except Exception as e:
+            self.last_error = str(e)
+            print(f"TEMPLATE_CATALOG: sync failed, keeping {len(self.snapshot.templates)} cached templates: {e}")
+            raise
+        self.snapshot = CatalogSnapshot([build_template(workflow) for workflow in workflows])
+        self.synced_at = time.time()
+        self.last_error = None
+        print(f"TEMPLATE_CATALOG: synced {len(self.snapshot.templates)} templates")
+        return len(self.snapshot.templates)
+
+    def search(
+        self,
+        search: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+        requires: Optional[List[str]] = None,
+        sort: Optional[str] = None,
+        offset: int = 0,
+        limit: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """One page of matching templates, the total match count and facet counts.
+
+        Tags and requires filters match any of the given values. Each facet is
+        counted with every filter applied except its own, so the counts show
+        what selecting another value would add. Results are ranked by relevance
+        when searching, by name otherwise; ``sort`` may force "name" or "tags".
+        """
+        snapshot = self.snapshot
+        scores = snapshot.score(search) if search and tokenize(search) else None
+        matched = snapshot.all_docs if scores is None or len(scores) == len(snapshot.all_docs) else set(scores)
+
+        tagged = snapshot.docs_with_any(snapshot.tag_index, tags) if tags else matched
+        required = snapshot.docs_with_any(snapshot.requires_index, requires) if requires else matched
+        results = matched & tagged & required
+        everything = len(results) == len(snapshot.all_docs)
+
+        # Only the first offset + limit matches are ordered; document numbers are already in name order
+        end = None if limit is None else offset + limit
+        if sort == "tags":
+            if everything:
+                ordered = snapshot.tags_order[:end]
+            elif end is None:
+                ordered = sorted(results, key=snapshot.tags_rank.__getitem__)
+            else:
+                ordered = heapq.nsmallest(end, results, key=snapshot.tags_rank.__getitem__)
+        elif scores is not None and sort in (None, "relevance"):
+            ranking = snapshot.ranking(search)
+            if ranking is not None:
+                if tags or requires:
+                    ordered = list(islice((doc for doc in ranking if doc in results), end))
+                else:
+                    ordered = ranking[:end]
+            elif end is None:
+                ordered = sorted(results, key=lambda doc: (-scores[doc], doc))
+            else:
+                ordered = heapq.nsmallest(end, results, key=lambda doc: (-scores[doc], doc))
+        elif everything:
+            ordered = range(len(snapshot.templates))[:end]
+        else:
+            ordered = sorted(results) if end is None else heapq.nsmallest(end, results)
+
+        tag_docs = matched & required
+        requires_docs = matched & tagged
+        return {
+            "templates": [snapshot.templates[doc] for doc in ordered[offset:]],
+            "total": len(results),
+            "facets": {
+                "tags": (snapshot.tag_counts if len(tag_docs) == len(snapshot.all_docs)
+                         else facet_counts(snapshot.tag_docs, tag_docs)),
+                "requires": (snapshot.requires_counts if len(requires_docs) == len(snapshot.all_docs)
+                             else facet_counts(snapshot.requires_docs, requires_docs)),
+            },
+        }
+
+    def status(self) -> dict:
+        return {
+            "templates": len(self.snapshot.templates),
+            "synced_at": self.synced_at,
+            "version": self.version,
+            "last_error": self.last_error,
+        }
+
+
+# Process-wide catalog
+template_catalog = TemplateCatalog()
+
+
+async def run_template_catalog_sync() -> int:
+    """Maintenance entry point (singleton): refresh the catalog from master n8n and publish the new version"""
+    return await template_catalog.sync()
+
+
+__all__ = [
+    "TEMPLATE_CATALOG_SYNC_SECONDS",
+    "TemplateCatalog",
+    "build_template",
+    "document_terms",
+    "node_type_terms",
+    "run_template_catalog_sync",
+    "template_catalog",
+    "tokenize",
+]
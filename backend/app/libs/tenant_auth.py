@@ -6,6 +6,7 @@ from app.auth import AuthorizedUser
 import re
 # Import centralized database connection
 from app.libs.db_connection import get_db_connection
+from app.libs.request_db import RequestDB, RequestDBDep
 
 class TenantAuthorizedUser:
     """
@@ -45,12 +46,19 @@ async def extract_tenant_slug_from_path(request: Request) -> Optional[str]:
         
     return None
 
-async def validate_tenant_membership(user_id: str, tenant_slug: str) -> Optional[dict]:
+async def validate_tenant_membership(
+    user_id: str,
+    tenant_slug: str,
+    conn: Optional[asyncpg.Connection] = None
+) -> Optional[dict]:
     """
     Validate that a user has active membership in the specified tenant.
     Returns membership info if valid, None if not.
+    Uses ``conn`` when given (e.g. the request's shared connection), else its own.
     """
-    conn = await get_db_connection()
+    own_conn = conn is None
+    if own_conn:
+        conn = await get_db_connection()
     try:
         # Query to check if user has active membership in the tenant
         query = """
@@ -82,11 +90,13 @@ async def validate_tenant_membership(user_id: str, tenant_slug: str) -> Optional
         return None
         
     finally:
-        await conn.close()
+        if own_conn:
+            await conn.close()
 
 async def require_tenant_membership(
     request: Request,
-    user: AuthorizedUser
+    user: AuthorizedUser,
+    db: RequestDB = RequestDBDep
 ) -> TenantAuthorizedUser:
     """
     FastAPI dependency that validates tenant membership.
@@ -124,7 +134,7 @@ async def require_tenant_membership(
         )
     
     # Validate tenant membership
-    membership = await validate_tenant_membership(user_id, tenant_slug)
+    membership = await validate_tenant_membership(user_id, tenant_slug, await db.connection())
     
     if not membership:
         # AB-1 FIX: Return 403 Forbidden if user is not a member of the tenant
@@ -143,7 +153,8 @@ async def require_tenant_membership(
 
 async def require_tenant_membership_by_email(
     request: Request,
-    user: AuthorizedUser
+    user: AuthorizedUser,
+    db: RequestDB = RequestDBDep
 ) -> TenantAuthorizedUser:
     """
     FastAPI dependency that resolves tenant membership by user email.
@@ -169,64 +180,60 @@ async def require_tenant_membership_by_email(
         )
     
     # Get user's primary tenant membership (first active membership)
-    conn = await get_db_connection()
-    try:
-        # Check if user has tenant membership (prefer owner role, then any active membership)
-        query = """
-            SELECT 
-                tm.tenant_id, 
-                t.slug as tenant_slug, 
-                tm.role, 
-                tm.status,
-                t.status as tenant_status
-            FROM tenant_memberships tm
-            JOIN tenants t ON tm.tenant_id = t.id
-            WHERE tm.user_id = $1 
-              AND tm.status = 'active'
-              AND t.deleted_at IS NULL
-            ORDER BY 
-              CASE WHEN tm.role = 'owner' THEN 1 
-                   WHEN tm.role = 'admin' THEN 2 
-                   ELSE 3 END,
-              tm.created_at ASC
-            LIMIT 1
-        """
-        
-        membership_row = await conn.fetchrow(query, user_id)
-        
-        if not membership_row:
-            # Fallback: check if user email matches tenant primary_contact_email
-            if user_email:
-                tenant_row = await conn.fetchrow(
-                    "SELECT id, slug FROM tenants WHERE primary_contact_email = $1 AND deleted_at IS NULL",
-                    user_email.lower()
-                )
-                
-                if tenant_row:
-                    membership_row = {
-                        'tenant_id': tenant_row['id'],
-                        'tenant_slug': tenant_row['slug'],
-                        'role': 'owner',
-                        'status': 'active',
-                        'tenant_status': 'active'
-                    }
-        
-        if not membership_row:
-            raise HTTPException(
-                status_code=403,
-                detail=f"Access denied: User does not have membership in any tenant"
+    conn = await db.connection()
+    # Check if user has tenant membership (prefer owner role, then any active membership)
+    query = """
+        SELECT 
+            tm.tenant_id, 
+            t.slug as tenant_slug, 
+            tm.role, 
+            tm.status,
+            t.status as tenant_status
+        FROM tenant_memberships tm
+        JOIN tenants t ON tm.tenant_id = t.id
+        WHERE tm.user_id = $1 
+          AND tm.status = 'active'
+          AND t.deleted_at IS NULL
+        ORDER BY 
+          CASE WHEN tm.role = 'owner' THEN 1 
+               WHEN tm.role = 'admin' THEN 2 
+               ELSE 3 END,
+          tm.created_at ASC
+        LIMIT 1
+    """
+    
+    membership_row = await conn.fetchrow(query, user_id)
+    
+    if not membership_row:
+        # Fallback: check if user email matches tenant primary_contact_email
+        if user_email:
+            tenant_row = await conn.fetchrow(
+                "SELECT id, slug FROM tenants WHERE primary_contact_email = $1 AND deleted_at IS NULL",
+                user_email.lower()
             )
-        
-        # Return enhanced user object with tenant information
-        return TenantAuthorizedUser(
-            user=user,
-            tenant_slug=membership_row['tenant_slug'],
-            tenant_id=membership_row['tenant_id'],
-            membership_role=membership_row['role']
+            
+            if tenant_row:
+                membership_row = {
+                    'tenant_id': tenant_row['id'],
+                    'tenant_slug': tenant_row['slug'],
+                    'role': 'owner',
+                    'status': 'active',
+                    'tenant_status': 'active'
+                }
+    
+    if not membership_row:
+        raise HTTPException(
+            status_code=403,
+            detail=f"Access denied: User does not have membership in any tenant"
         )
-        
-    finally:
-        await conn.close()
+    
+    # Return enhanced user object with tenant information
+    return TenantAuthorizedUser(
+        user=user,
+        tenant_slug=membership_row['tenant_slug'],
+        tenant_id=membership_row['tenant_id'],
+        membership_role=membership_row['role']
+    )
 
 # Alias for easier imports
 TenantUser = require_tenant_membership
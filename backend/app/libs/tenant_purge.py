@@ -0,0 +1,335 @@
+"""Batched tenant hard delete.
+
+Purging a tenant removes its rows table by table in bounded batches selected
+by primary key. Every batch is a single ``DELETE ... RETURNING`` statement
+that commits on its own, so locks are held for one batch at a time and WAL is
+written incrementally instead of in one giant transaction. Deleted row counts
+come from the RETURNING totals and are written to ``tenant_deletion_jobs``
+after every batch, which the lifecycle status endpoint reports as progress.
+
+Every table that references ``tenants`` is purged this way, children before
+parents. Foreign keys found in the catalog that the plan does not list are
+swept the same way afterwards. The ``tenants`` row is deleted only once no
+row references it any more, so that final delete has nothing left to cascade
+over. Monthly ``messages_archive`` partitions that retention detached (but
+did not drop) are no longer reached through the parent, so they are purged
+separately.
+
+Deletes are idempotent, so a failed job is resumed by starting it again and
+counts keep accumulating. A running job keeps ``updated_at`` fresh; the
+``tenant_purge_recovery`` maintenance job resumes queued or running jobs
+whose process stopped doing so (a restart or deploy mid-purge).
+
+Usage:
+
+    from app.libs.tenant_purge import create_purge_job, start_tenant_purge
+
+    if not await is_purge_running(conn, tenant["id"]):
+        await create_purge_job(conn, tenant, reason, requested_by)
+        start_tenant_purge(tenant["id"])
+"""
+
+import asyncio
+import json
+import os
+from typing import Dict, List, Optional, Tuple
+
+import asyncpg
+
+from app.libs.db_connection import get_db_connection
+from app.libs.message_partitions import detached_partitions
+from app.libs.schema_capabilities import get_schema_capabilities
+
+# Configuration
+TENANT_PURGE_BATCH_SIZE = int(os.getenv("TENANT_PURGE_BATCH_SIZE", "5000"))
+# Pause between batches so replication and autovacuum keep up
+TENANT_PURGE_BATCH_PAUSE_SECONDS = float(os.getenv("TENANT_PURGE_BATCH_PAUSE_SECONDS", "0.05"))
+TENANT_PURGE_HEARTBEAT_SECONDS = float(os.getenv("TENANT_PURGE_HEARTBEAT_SECONDS", "30"))
+# A queued/running job without a heartbeat for this long is considered orphaned
+TENANT_PURGE_STALE_SECONDS = int(os.getenv("TENANT_PURGE_STALE_SECONDS", "300"))
+
+ACTIVE_JOB_STATUSES = ("queued", "running")
+
+# (table, tenant column, tenant key, batch key), children before parents.
+# Tenant key: 'id' -> tenant id, 'id_text' -> tenant id as text, 'slug' -> tenant slug.
+# Child tables without a tenant column give a predicate on $1 instead of a column.
+# Tables without a single-column primary key are batched by (tableoid, ctid).
+_ROW_ID = "tableoid, ctid"
+PURGE_PLAN = [
+    ("messages_archive", "tenant_id", "id", "message_id"),
+    ("contacts_archive", "tenant_id", "id", "contact_id"),
+    ("contacts_cache", "tenant_id", "id", "contact_id"),
+    ("inbox_threads", "tenant_id", "id", "thread_id"),
+    ("active_hitl_tasks", "tenant_id", "id_text", "task_id"),
+    ("knowledge_index", "tenant_slug", "slug", _ROW_ID),
+    ("ctx_cache_envelopes", "tenant_slug", "slug", _ROW_ID),
+    ("tenant_profiles", "tenant_id", "id", _ROW_ID),
+    ("knowledge_import_items", "tenant_id", "id", "id"),
+    ("knowledge_import_jobs", "tenant_id", "id", "id"),
+    ("embeddings", "tenant_id", "id", "id"),
+    ("knowledge_bases", "tenant_id", "id", "id"),
+    ("workflow_execution_payloads",
+     "execution_id IN (SELECT id FROM workflow_executions WHERE tenant_id = $1)", "id", "execution_id"),
+    ("workflow_executions", "tenant_id", "id", "id"),
+    ("workflow_execution_rollups", "tenant_id", "id", _ROW_ID),
+    ("workflow_rollout_targets", "tenant_id", "id", _ROW_ID),
+    ("tenant_master_workflows", "tenant_id", "id", _ROW_ID),
+    ("workflows", "tenant_id", "id", "id"),
+    ("tenant_n8n_health", "tenant_id", "id", "tenant_id"),
+    ("pulse_messages", "campaign_id IN (SELECT id FROM pulse_campaigns WHERE tenant_id = $1)", "id", "id"),
+    ("pulse_campaigns", "tenant_id", "id", "id"),
+    ("conversation_topics", "tenant_id", "id", "id"),
+    ("conversations", "tenant_id", "id", "id"),
+    ("user_preferences", "tenant_id", "id", "id"),
+    ("users", "tenant_id", "id", "id"),
+    ("tenant_memberships", "tenant_id", "id", "id"),
+]
+
+# tenant id -> running task
+_running: Dict[str, asyncio.Task] = {}
+
+
+def _tenant_key(tenant: dict, kind: str):
+    if kind == "slug":
+        return tenant["slug"]
+    if kind == "id_text":
+        return str(tenant["id"])
+    return tenant["id"]
+
+
+async def delete_in_batches(
+    conn: asyncpg.Connection,
+    table: str,
+    tenant_column: str,
+    tenant_value,
+    batch_key: str,
+    batch_size: int = TENANT_PURGE_BATCH_SIZE,
+):
+    """Delete matching rows one committed batch at a time; yields each batch's count"""
+    tenant_filter = tenant_column if "$1" in tenant_column else f"{tenant_column} = $1"
+    query = f"""
+        WITH deleted AS (
+            DELETE FROM {table}
+            WHERE ({batch_key}) IN (
+                SELECT {batch_key} FROM {table} WHERE {tenant_filter} LIMIT $2
+            )
+            RETURNING 1
+        )
+        SELECT COUNT(*) FROM deleted
+    """
+    while True:
+        deleted = await conn.fetchval(query, tenant_value, batch_size)
+        if not deleted:
+            return
+        yield deleted
+        if deleted < batch_size:
+            return
+        await asyncio.sleep(TENANT_PURGE_BATCH_PAUSE_SECONDS)
+
+
+async def create_purge_job(conn: asyncpg.Connection, tenant, reason: str, requested_by: Optional[str]) -> None:
+    """Record (or re-arm a failed) deletion job and stop new writes to the tenant"""
+    async with conn.transaction():
+        await conn.execute(
+            """INSERT INTO tenant_deletion_jobs (tenant_id, tenant_slug, tenant_name, status, reason, requested_by)
+               VALUES ($1, $2, $3, 'queued', $4, $5)
+               ON CONFLICT (tenant_id) DO UPDATE SET
+                   status = 'queued', reason = EXCLUDED.reason, requested_by = EXCLUDED.requested_by,
+                   error = NULL, finished_at = NULL, updated_at = NOW()""",
+            str(tenant["id"]), tenant["slug"], tenant["name"], reason, requested_by
+        )
+        # Ingestion only accepts active tenants, so nothing new lands while we purge
+        await conn.execute(
+            "UPDATE tenants SET status = 'suspended', updated_at = NOW() WHERE id = $1",
+            tenant["id"]
+        )
+
+
+async def tenant_references(conn: asyncpg.Connection) -> List[Tuple[str, str]]:
+    """(table, column) of every single-column foreign key to tenants(id)"""
+    rows = await conn.fetch(
+        """SELECT cl.relname AS table_name, a.attname AS column_name
+           FROM pg_constraint c
+           JOIN pg_class cl ON cl.oid = c.conrelid
+           JOIN pg_attribute a ON a.attrelid = c.conrelid AND a.attnum = c.conkey[1]
+           WHERE c.contype = 'f'
+             AND c.confrelid = 'tenants'::regclass
+             AND cardinality(c.conkey) = 1
+             AND c.conparentid = 0
+           ORDER BY cl.relname"""
+    )
+    return [(row["table_name"], row["column_name"]) for row in rows]
+
+
+async def _record_batch(conn: asyncpg.Connection, job_key: str, table: str, deleted: int) -> None:
+    await conn.execute(
+        """UPDATE tenant_deletion_jobs
+           SET deleted_counts = jsonb_set(
+                   deleted_counts, ARRAY[$2::text],
+                   to_jsonb(COALESCE((deleted_counts->>$2)::bigint, 0) + $3)
+               ),
+               updated_at = NOW()
+           WHERE tenant_id = $1""",
+        job_key, table, deleted
+    )
+
+
+async def _purge_table(conn: asyncpg.Connection, job_key: str, table: str, tenant_column: str, tenant_value, batch_key: str) -> None:
+    await conn.execute(
+        "UPDATE tenant_deletion_jobs SET current_table = $2, updated_at = NOW() WHERE tenant_id = $1",
+        job_key, table
+    )
+    async for deleted in delete_in_batches(conn, table, tenant_column, tenant_value, batch_key):
+        await _record_batch(conn, job_key, table, deleted)
+
+
+async def _heartbeat(job_key: str) -> None:
+    """Keep updated_at fresh while the purge runs, also through long batches"""
+    conn = await get_db_connection()
+    try:
+        while True:
+            await asyncio.sleep(TENANT_PURGE_HEARTBEAT_SECONDS)
+            await conn.execute("UPDATE tenant_deletion_jobs SET updated_at = NOW() WHERE tenant_id = $1", job_key)
+    finally:
+        await conn.close()
+
+
+async def run_tenant_purge(tenant_id) -> None:
+    """Delete all of a tenant's data, then the tenant row, recording progress per batch"""
+    job_key = str(tenant_id)
+    conn = await get_db_connection()
+    heartbeat = asyncio.create_task(_heartbeat(job_key))
+    try:
+        await conn.execute(
+            """UPDATE tenant_deletion_jobs
+               SET status = 'running', started_at = COALESCE(started_at, NOW()), updated_at = NOW()
+               WHERE tenant_id = $1""",
+            job_key
+        )
+        tenant = await conn.fetchrow("SELECT id, slug FROM tenants WHERE id = $1", tenant_id)
+        if tenant:
+            schema = await get_schema_capabilities(conn)
+            for table, tenant_column, key_kind, batch_key in PURGE_PLAN:
+                if not schema.has_table(table):
+                    continue
+                await _purge_table(conn, job_key, table, tenant_column, _tenant_key(tenant, key_kind), batch_key)
+
+            # Detached months are plain tables now, outside messages_archive and without a tenants FK
+            for table in await detached_partitions(conn):
+                await _purge_table(conn, job_key, table, "tenant_id", tenant_id, _ROW_ID)
+
+            # Foreign keys added after the plan was written
+            planned = {table for table, _, _, _ in PURGE_PLAN}
+            references = await tenant_references(conn)
+            for table, column in references:
+                if table not in planned:
+                    await _purge_table(conn, job_key, table, column, tenant_id, _ROW_ID)
+
+            for table, column in references:
+                if await conn.fetchval(f"SELECT EXISTS (SELECT 1 FROM {table} WHERE {column} = $1)", tenant_id):
+                    raise RuntimeError(f"rows in {table} still reference the tenant; run the purge again")
+
+            # Nothing references the row any more, so this no longer cascades
+            await conn.execute("DELETE FROM tenants WHERE id = $1", tenant_id)
+
+        await conn.execute(
+            """UPDATE tenant_deletion_jobs
+               SET status = 'completed', current_table = NULL, finished_at = NOW(), updated_at = NOW()
+               WHERE tenant_id = $1""",
+            job_key
+        )
+        print(f"TENANT_PURGE: tenant {tenant_id} permanently deleted")
+
+    except Exception as e:
+        print(f"TENANT_PURGE: tenant {tenant_id} purge failed: {e}")
+        await conn.execute(
+            """UPDATE tenant_deletion_jobs SET status = 'failed', error = $2, updated_at = NOW()
+               WHERE tenant_id = $1""",
+            job_key, str(e)[:2000]
+        )
+    finally:
+        heartbeat.cancel()
+        await asyncio.gather(heartbeat, return_exceptions=True)
+        await conn.close()
+        _running.pop(job_key, None)
+
+
+async def is_purge_running(conn: asyncpg.Connection, tenant_id) -> bool:
+    """True while this or another process is purging the tenant (its job is still heartbeating)"""
+    task = _running.get(str(tenant_id))
+    if task and not task.done():
+        return True
+    return await conn.fetchval(
+        """SELECT EXISTS (
+               SELECT 1 FROM tenant_deletion_jobs
+               WHERE tenant_id = $1 AND status = ANY($2::text[])
+                 AND updated_at >= NOW() - make_interval(secs => $3)
+           )""",
+        str(tenant_id), list(ACTIVE_JOB_STATUSES), TENANT_PURGE_STALE_SECONDS
+    )
+
+
+def start_tenant_purge(tenant_id) -> None:
+    """Schedule the purge on the running event loop"""
+    job_key = str(tenant_id)
+    task = _running.get(job_key)
+    if not task or task.done():
+        _running[job_key] = asyncio.create_task(run_tenant_purge(tenant_id))
+
+
+async def recover_purge_jobs() -> int:
+    """Maintenance entry point: resume purges whose process stopped heartbeating; returns jobs resumed"""
+    conn = await get_db_connection()
+    try:
+        # Claim by touching updated_at, so a second sweep cannot pick the same job
+        orphaned = await conn.fetch(
+            """UPDATE tenant_deletion_jobs SET updated_at = NOW()
+               WHERE status = ANY($1::text[])
+                 AND updated_at < NOW() - make_interval(secs => $2)
+                 AND NOT (tenant_id = ANY($3::text[]))
+               RETURNING tenant_id""",
+            list(ACTIVE_JOB_STATUSES), TENANT_PURGE_STALE_SECONDS, list(_running)
+        )
+    finally:
+        await conn.close()
+    for job in orphaned:
+        start_tenant_purge(job["tenant_id"])
+    if orphaned:
+        print(f"TENANT_PURGE: resuming {len(orphaned)} orphaned purge jobs")
+    return len(orphaned)
+
+
+async def get_purge_job(conn: asyncpg.Connection, tenant_id) -> Optional[dict]:
+    row = await conn.fetchrow(
+        """SELECT status, reason, requested_by, current_table, deleted_counts, error,
+                  created_at, started_at, finished_at, updated_at
+           FROM tenant_deletion_jobs WHERE tenant_id = $1""",
+        str(tenant_id)
+    )
+    if not row:
+        return None
+    job = dict(row)
+    counts = job["deleted_counts"]
+    job["deleted_counts"] = json.loads(counts) if isinstance(counts, str) else (counts or {})
+    job["tables_total"] = len(PURGE_PLAN)
+    tables = [table for table, _, _, _ in PURGE_PLAN]
+    if job["status"] == "completed":
+        job["tables_done"] = len(PURGE_PLAN)
+    elif job["current_table"] in tables:
+        job["tables_done"] = tables.index(job["current_table"])
+    else:
+        job["tables_done"] = 0
+    return job
+
+
+__all__ = [
+    "PURGE_PLAN",
+    "create_purge_job",
+    "delete_in_batches",
+    "get_purge_job",
+    "is_purge_running",
+    "recover_purge_jobs",
+    "run_tenant_purge",
+    "start_tenant_purge",
+    "tenant_references",
+]
@@ -0,0 +1,141 @@
+"""Async URL fetch + markdown conversion with conditional revalidation.
+
+Pages are downloaded with a shared ``httpx.AsyncClient`` and streamed through
+``HTMLMarkdownConverter`` as bytes arrive, with a hard size cap. Converted
+output is cached by the sha256 of the raw body, and each URL remembers its
+ETag / Last-Modified validators so re-ingesting an unchanged page costs a
+304 and a cache lookup instead of a download and re-parse.
+
+Usage:
+
+    from app.libs.url_fetcher import fetch_url_markdown
+
+    result = await fetch_url_markdown("https://example.com")
+    result.markdown, result.title, result.cache_status
+"""
+
+import codecs
+import hashlib
+import os
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+import httpx
+from fastapi import HTTPException
+
+from app.libs.html_markdown import HTMLMarkdownConverter
+
+# Configuration
+URL_FETCH_MAX_BYTES = int(os.getenv("URL_FETCH_MAX_BYTES", str(5 * 1024 * 1024)))
+URL_FETCH_TIMEOUT_SECONDS = float(os.getenv("URL_FETCH_TIMEOUT_SECONDS", "10"))
+URL_CACHE_MAX_ENTRIES = int(os.getenv("URL_CACHE_MAX_ENTRIES", "2000"))
+USER_AGENT = "FloMastr-Ingest/1.0"
+
+_client: Optional[httpx.AsyncClient] = None
+
+# content sha256 -> (markdown, title)
+_content_cache: "OrderedDict[str, Tuple[str, str]]" = OrderedDict()
+# url -> {"etag", "last_modified", "content_hash"}
+_validators: "OrderedDict[str, Dict[str, Optional[str]]]" = OrderedDict()
+
+
+class UrlMarkdownResult:
+    def __init__(self, markdown: str, title: str, content_hash: str, cache_status: str):
+        self.markdown = markdown
+        self.title = title
+        self.content_hash = content_hash
+        self.cache_status = cache_status  # 'revalidated', 'content_hit' or 'miss'
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the shared fetch client, creating it on first use"""
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            timeout=httpx.Timeout(URL_FETCH_TIMEOUT_SECONDS, connect=5.0),
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=50, max_keepalive_connections=20),
+            headers={"User-Agent": USER_AGENT},
+        )
+    return _client
+
+
+def _remember(cache: OrderedDict, key: str, value) -> None:
+    cache[key] = value
+    cache.move_to_end(key)
+    while len(cache) > URL_CACHE_MAX_ENTRIES:
+        cache.popitem(last=False)
+
+
+def _cached_content(content_hash: Optional[str]) -> Optional[Tuple[str, str]]:
+    if content_hash and content_hash in _content_cache:
+        _content_cache.move_to_end(content_hash)
+        return _content_cache[content_hash]
+    return None
+
+
+async def fetch_url_markdown(url: str, max_bytes: int = URL_FETCH_MAX_BYTES) -> UrlMarkdownResult:
+    """Fetch a URL and convert it to markdown, reusing cached output when unchanged"""
+    client = get_http_client()
+
+    headers = {"Accept": "text/html,application/xhtml+xml,text/plain;q=0.9,*/*;q=0.5"}
+    known = _validators.get(url)
+    if known and _cached_content(known.get("content_hash")):
+        if known.get("etag"):
+            headers["If-None-Match"] = known["etag"]
+        if known.get("last_modified"):
+            headers["If-Modified-Since"] = known["last_modified"]
+
+    async with client.stream("GET", url, headers=headers) as response:
+        if response.status_code == 304:
+            revalidated = _cached_content(known["content_hash"]) if known else None
+            if not revalidated:
+                raise HTTPException(status_code=502, detail="Origin returned 304 for an uncached page")
+            return UrlMarkdownResult(revalidated[0], revalidated[1], known["content_hash"], "revalidated")
+
+        response.raise_for_status()
+
+        declared_length = response.headers.get("Content-Length")
+        if declared_length and declared_length.isdigit() and int(declared_length) > max_bytes:
+            raise HTTPException(status_code=413, detail=f"Page too large (max {max_bytes} bytes)")
+
+        content_type = response.headers.get("Content-Type", "")
+        is_html = "html" in content_type or not content_type
+        decoder = codecs.getincrementaldecoder(response.encoding or "utf-8")(errors="replace")
+        converter = HTMLMarkdownConverter() if is_html else None
+        digest = hashlib.sha256()
+        parts = []
+        received = 0
+
+        async for chunk in response.aiter_bytes():
+            received += len(chunk)
+            if received > max_bytes:
+                raise HTTPException(status_code=413, detail=f"Page too large (max {max_bytes} bytes)")
+            digest.update(chunk)
+            text = decoder.decode(chunk)
+            parts.append(converter.feed(text) if converter else text)
+
+        tail = decoder.decode(b"", final=True)
+        parts.append(converter.feed(tail) + converter.close() if converter else tail)
+
+        content_hash = digest.hexdigest()
+        validators = {
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "content_hash": content_hash,
+        }
+
+    _remember(_validators, url, validators)
+
+    # Same bytes under a new URL or validator: keep the existing conversion
+    cached = _cached_content(content_hash)
+    if cached:
+        return UrlMarkdownResult(cached[0], cached[1], content_hash, "content_hit")
+
+    title = (converter.title if converter else None) or f"Content from {url}"
+    markdown = "".join(parts).strip()
+    _remember(_content_cache, content_hash, (markdown, title))
+    return UrlMarkdownResult(markdown, title, content_hash, "miss")
+
+
+__all__ = ["UrlMarkdownResult", "fetch_url_markdown", "get_http_client"]
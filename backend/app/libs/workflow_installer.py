@@ -0,0 +1,280 @@
+"""Async installation of master n8n workflows into tenant n8n instances.
+
+Master workflow definitions are fetched with a shared ``httpx.AsyncClient``
+(with timeouts) and cached. Each master id maps to the sha256 of its
+installable definition, and definitions are stored once per hash. Within
+``MASTER_WORKFLOW_CACHE_TTL_SECONDS`` an install does not touch master n8n at
+all. Concurrent installs of the same workflow share one in-flight fetch.
+
+``install_workflow_bundle`` installs many workflows into one tenant
+concurrently, bounded by ``WORKFLOW_INSTALL_CONCURRENCY``, and reports a
+result per workflow instead of failing the whole bundle on the first error.
+
+Every installed copy is recorded in ``tenant_master_workflows``, the table
+fleet rollouts use to update a tenant's existing copy in place.
+
+Usage:
+
+    from app.libs.workflow_installer import install_master_workflow, install_workflow_bundle
+
+    result = await install_master_workflow("acme", "wf_123", tenant["n8n_url"])
+    results = await install_workflow_bundle("acme", ["wf_1", "wf_2", "wf_3"], tenant["n8n_url"])
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+from fastapi import HTTPException
+
+from app.libs.db_connection import get_db_connection
+from app.libs.n8n_health import ensure_n8n_available, tenant_n8n_url
+
+# Configuration
+N8N_MASTER_URL = os.getenv("N8N_MASTER_URL", "https://master.n8n.flomastr.com")
+WORKFLOW_INSTALL_TIMEOUT_SECONDS = float(os.getenv("WORKFLOW_INSTALL_TIMEOUT_SECONDS", "30"))
+WORKFLOW_INSTALL_CONCURRENCY = int(os.getenv("WORKFLOW_INSTALL_CONCURRENCY", "10"))
+WORKFLOW_BUNDLE_MAX_WORKFLOWS = int(os.getenv("WORKFLOW_BUNDLE_MAX_WORKFLOWS", "25"))
+MASTER_WORKFLOW_CACHE_TTL_SECONDS = float(os.getenv("MASTER_WORKFLOW_CACHE_TTL_SECONDS", "300"))
+MASTER_WORKFLOW_CACHE_MAX_ENTRIES = int(os.getenv("MASTER_WORKFLOW_CACHE_MAX_ENTRIES", "500"))
+
+_client: Optional[httpx.AsyncClient] = None
+
+# content sha256 -> installable definition
+_definitions: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+# master workflow id -> (content sha256, fetched_at)
+_master_index: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+# master workflow id -> fetch in progress
+_inflight: Dict[str, asyncio.Future] = {}
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the shared n8n API client, creating it on first use"""
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            timeout=httpx.Timeout(WORKFLOW_INSTALL_TIMEOUT_SECONDS, connect=5.0),
+            limits=httpx.Limits(max_connections=50, max_keepalive_connections=20),
+        )
+    return _client
+
+
+def _api_key(name: str) -> str:
+    value = os.getenv(name)
+    if not value:
+        raise HTTPException(status_code=500, detail="N8N API keys not configured")
+    return value
+
+
+def installable_definition(workflow: Dict[str, Any]) -> Dict[str, Any]:
+    """Master workflow JSON without its id, so the tenant's n8n assigns a new one"""
+    return {key: value for key, value in workflow.items() if key != "id"}
+
+
+def definition_hash(definition: Dict[str, Any]) -> str:
+    canonical = json.dumps(definition, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def _remember(master_workflow_id: str, content_hash: str, definition: Dict[str, Any]) -> None:
+    _definitions[content_hash] = definition
+    _definitions.move_to_end(content_hash)
+    _master_index[master_workflow_id] = (content_hash, time.monotonic())
+    _master_index.move_to_end(master_workflow_id)
+    while len(_master_index) > MASTER_WORKFLOW_CACHE_MAX_ENTRIES:
+        _master_index.popitem(last=False)
+    # Drop definitions no master id points at any more
+    if len(_definitions) > len(_master_index):
+        referenced = {entry[0] for entry in _master_index.values()}
+        for stale in [h for h in _definitions if h not in referenced]:
+            del _definitions[stale]
+
+
+async def _fetch_master_workflow(master_workflow_id: str) -> Tuple[str, Dict[str, Any]]:
+    url = f"{N8N_MASTER_URL}/api/v1/workflows/{master_workflow_id}"
+    print(f"Fetching workflow from master: {url}")
+    response = await get_http_client().get(
+        url,
+        headers={"X-N8N-API-KEY": _api_key("N8N_MASTER_API_KEY"), "Accept": "application/json"},
+    )
+    if response.status_code != 200:
+        print(f"Failed to fetch from master: {response.status_code} - {response.text[:200]}")
+        raise HTTPException(
+            status_code=404,
+            detail=f"Workflow {master_workflow_id} not found in master repository"
+        )
+
+    definition = installable_definition(response.json())
+    content_hash = definition_hash(definition)
+    # Unchanged content keeps sharing the stored definition
+    definition = _definitions.get(content_hash, definition)
+    _remember(master_workflow_id, content_hash, definition)
+    return content_hash, definition
+
+
+async def get_master_workflow(master_workflow_id: str) -> Tuple[str, Dict[str, Any], str]:
+    """Installable definition of a master workflow; returns (content_hash, definition, cache_status)"""
+    entry = _master_index.get(master_workflow_id)
+    if entry and time.monotonic() - entry[1] < MASTER_WORKFLOW_CACHE_TTL_SECONDS and entry[0] in _definitions:
+        _master_index.move_to_end(master_workflow_id)
+        return entry[0], _definitions[entry[0]], "hit"
+
+    future = _inflight.get(master_workflow_id)
+    if future is None:
+        future = asyncio.ensure_future(_fetch_master_workflow(master_workflow_id))
+        _inflight[master_workflow_id] = future
+        future.add_done_callback(lambda _: _inflight.pop(master_workflow_id, None))
+    # shield: one cancelled waiter must not cancel the fetch for the others
+    content_hash, definition = await asyncio.shield(future)
+    return content_hash, definition, "miss"
+
+
+async def install_definition(tenant_slug: str, definition: Dict[str, Any], n8n_url: Optional[str] = None) -> str:
+    """Create the workflow in the tenant's n8n; returns the new tenant workflow id"""
+    ensure_n8n_available(tenant_slug)
+    url = f"{tenant_n8n_url(tenant_slug, n8n_url)}/api/v1/workflows"
+    print(f"Installing workflow to tenant: {url}")
+    response = await get_http_client().post(
+        url,
+        headers={"X-N8N-API-KEY": _api_key("N8N_API_KEY"), "Content-Type": "application/json"},
+        json=definition,
+    )
+    if response.status_code not in (200, 201):
+        print(f"Failed to install to tenant: {response.status_code} - {response.text[:200]}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to install workflow to tenant {tenant_slug}"
+        )
+
+    tenant_workflow_id = response.json().get("id")
+    if not tenant_workflow_id:
+        raise HTTPException(
+            status_code=500,
+            detail="Failed to get workflow ID from tenant installation"
+        )
+    return str(tenant_workflow_id)
+
+
+async def update_definition(
+    tenant_slug: str,
+    tenant_workflow_id: str,
+    definition: Dict[str, Any],
+    n8n_url: Optional[str] = None,
+) -> bool:
+    """Replace an installed workflow in place; False when it no longer exists in the tenant's n8n"""
+    ensure_n8n_available(tenant_slug)
+    url = f"{tenant_n8n_url(tenant_slug, n8n_url)}/api/v1/workflows/{tenant_workflow_id}"
+    response = await get_http_client().put(
+        url,
+        headers={"X-N8N-API-KEY": _api_key("N8N_API_KEY"), "Content-Type": "application/json"},
+        json=definition,
+    )
+    if response.status_code == 404:
+        return False
+    if response.status_code != 200:
+        print(f"Failed to update tenant workflow: {response.status_code} - {response.text[:200]}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to update workflow {tenant_workflow_id} in tenant {tenant_slug}"
+        )
+    return True
+
+
+async def record_tenant_copy(tenant_slug: str, master_workflow_id: str, tenant_workflow_id: str, content_hash: str) -> None:
+    """Remember the tenant's copy so a later rollout updates it instead of installing another one.
+
+    The workflow is already installed at this point, so a failure is logged rather than raised.
+    """
+    try:
+        conn = await get_db_connection()
+        try:
+            await conn.execute(
+                """INSERT INTO tenant_master_workflows
+                       (tenant_id, master_workflow_id, tenant_workflow_id, content_hash)
+                   SELECT id, $2, $3, $4 FROM tenants WHERE slug = $1
+                   ON CONFLICT (tenant_id, master_workflow_id) DO UPDATE SET
+                       tenant_workflow_id = EXCLUDED.tenant_workflow_id,
+                       content_hash = EXCLUDED.content_hash,
+                       updated_at = NOW()""",
+                tenant_slug, master_workflow_id, tenant_workflow_id, content_hash
+            )
+        finally:
+            await conn.close()
+    except Exception as e:
+        print(f"Failed to record workflow {tenant_workflow_id} for tenant {tenant_slug}: {str(e)}")
+
+
+async def install_master_workflow(
+    tenant_slug: str,
+    master_workflow_id: str,
+    n8n_url: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Fetch (or reuse) a master workflow and install it; raises HTTPException on failure.
+
+    Pass the tenant's ``tenants.n8n_url`` so the copy lands on the instance that
+    is health-checked and rolled out to.
+    """
+    try:
+        content_hash, definition, cache_status = await get_master_workflow(master_workflow_id)
+        tenant_workflow_id = await install_definition(tenant_slug, definition, n8n_url)
+    except httpx.RequestError as e:
+        print(f"Network error during workflow installation: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Network error during installation: {str(e)}"
+        ) from e
+
+    print(f"Successfully installed workflow {master_workflow_id} to {tenant_slug} with ID: {tenant_workflow_id}")
+    await record_tenant_copy(tenant_slug, master_workflow_id, tenant_workflow_id, content_hash)
+    return {
+        "master_workflow_id": master_workflow_id,
+        "tenant_workflow_id": tenant_workflow_id,
+        "name": definition.get("name"),
+        "content_hash": content_hash,
+        "cache_status": cache_status,
+        "iframe_url": f"{tenant_n8n_url(tenant_slug, n8n_url)}/workflow-setup/{tenant_workflow_id}",
+    }
+
+
+async def install_workflow_bundle(
+    tenant_slug: str,
+    master_workflow_ids: List[str],
+    n8n_url: Optional[str] = None,
+    concurrency: int = WORKFLOW_INSTALL_CONCURRENCY,
+) -> List[Dict[str, Any]]:
+    """Install several master workflows concurrently; one result per distinct id, in request order"""
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def install_one(master_workflow_id: str) -> Dict[str, Any]:
+        async with semaphore:
+            try:
+                result = await install_master_workflow(tenant_slug, master_workflow_id, n8n_url)
+                return {"success": True, **result}
+            except HTTPException as e:
+                return {"master_workflow_id": master_workflow_id, "success": False,
+                        "status_code": e.status_code, "error": e.detail}
+            except Exception as e:
+                print(f"Unexpected error installing workflow {master_workflow_id}: {str(e)}")
+                return {"master_workflow_id": master_workflow_id, "success": False,
+                        "status_code": 500, "error": str(e)}
+
+    unique_ids = list(dict.fromkeys(master_workflow_ids))
+    return list(await asyncio.gather(*(install_one(workflow_id) for workflow_id in unique_ids)))
+
+
+__all__ = [
+    "WORKFLOW_BUNDLE_MAX_WORKFLOWS",
+    "definition_hash",
+    "get_master_workflow",
+    "install_definition",
+    "install_master_workflow",
+    "install_workflow_bundle",
+    "record_tenant_copy",
+    "tenant_n8n_url",
+    "update_definition",
+]
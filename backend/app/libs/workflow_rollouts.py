@@ -0,0 +1,544 @@
+"""Fleet-wide rollout of a master workflow to tenant n8n instances.
+
+A rollout pins one version of a master workflow (definition and content hash)
+and the tenants picked by a selector. The tenants are spread over cumulative
+waves, e.g. ``[1, 10, 50, 100]`` percent, and wave 0 is the canary. Waves run
+in order, and each one fans out with at most ``concurrency`` tenants in
+flight. Each tenant's copy is created the first time and updated in place on
+later rollouts (``tenant_master_workflows``). A tenant whose copy already has
+the pinned hash is left unchanged.
+
+After each wave, the share of failed tenants is compared with
+``max_failure_ratio``. A bad canary pauses the rollout before it reaches the
+rest of the fleet. An operator can then resume it, which by default retries
+the failures, or cancel it.
+
+Every tenant's status is written to ``workflow_rollout_targets`` as it
+finishes. The runner holds a lease (``runner_id`` + ``heartbeat_at``). When a
+process dies mid-rollout, the ``workflow_rollouts`` maintenance job picks the
+rollout up once the lease goes stale, and continues from the pending tenants
+of the current wave. A tenant that was in flight during the crash is
+attempted again once its attempt is older than the lease, and this is an
+update unless its first install had not been recorded yet. Copies installed
+through the install endpoints are recorded too, so a rollout updates them
+instead of installing a second one.
+
+Usage:
+
+    from app.libs.workflow_rollouts import create_rollout, start_rollout
+
+    rollout = await create_rollout(conn, "wf_123", {"slugs": ["acme"]}, created_by=user.sub)
+    start_rollout(rollout["id"])
+"""
+
+import asyncio
+import hashlib
+import json
+import math
+import os
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+import asyncpg
+import httpx
+from fastapi import HTTPException
+
+from app.libs.db_connection import get_db_connection
+from app.libs.workflow_installer import get_master_workflow, install_definition, update_definition
+
+# Configuration
+ROLLOUT_DEFAULT_WAVES = [1, 10, 50, 100]
+ROLLOUT_DEFAULT_CONCURRENCY = int(os.getenv("ROLLOUT_DEFAULT_CONCURRENCY", "20"))
+ROLLOUT_MAX_CONCURRENCY = int(os.getenv("ROLLOUT_MAX_CONCURRENCY", "100"))
+ROLLOUT_DEFAULT_MAX_FAILURE_RATIO = float(os.getenv("ROLLOUT_DEFAULT_MAX_FAILURE_RATIO", "0.1"))
+ROLLOUT_DEFAULT_WAVE_DELAY_SECONDS = int(os.getenv("ROLLOUT_DEFAULT_WAVE_DELAY_SECONDS", "30"))
+ROLLOUT_HEARTBEAT_SECONDS = float(os.getenv("ROLLOUT_HEARTBEAT_SECONDS", "10"))
+# A running rollout whose heartbeat is older than this is considered orphaned
+ROLLOUT_LEASE_SECONDS = float(os.getenv("ROLLOUT_LEASE_SECONDS", "120"))
+
+TERMINAL_STATUSES = ("completed", "cancelled")
+
+# rollout id -> running task
+_running: Dict[str, asyncio.Task] = {}
+
+
+def normalize_waves(waves: Optional[List[float]]) -> List[float]:
+    """Validate cumulative wave percentages; the last wave always covers every tenant"""
+    waves = list(waves or ROLLOUT_DEFAULT_WAVES)
+    if any(not 0 < pct <= 100 for pct in waves) or any(b <= a for a, b in zip(waves, waves[1:])):
+        raise HTTPException(status_code=400, detail="waves must be strictly increasing percentages in (0, 100]")
+    if waves[-1] != 100:
+        waves.append(100)
+    return waves
+
+
+def assign_waves(total: int, waves: List[float]) -> List[int]:
+    """Wave number for each of ``total`` ordered tenants; every wave gets at least one tenant"""
+    assignment: List[int] = []
+    for wave, pct in enumerate(waves):
+        boundary = total if wave == len(waves) - 1 else min(total, max(len(assignment) + 1, math.ceil(total * pct / 100)))
+        assignment.extend([wave] * (boundary - len(assignment)))
+    return assignment
+
+
+async def select_tenants(conn: asyncpg.Connection, selector: Dict[str, Any]) -> List[asyncpg.Record]:
+    """Tenants matching a selector: tenant_ids, slugs, exclude_slugs and statuses (default active)"""
+    clauses = ["deleted_at IS NULL", "status::text = ANY($1::text[])"]
+    params: List[Any] = [selector.get("statuses") or ["active"]]
+    if selector.get("tenant_ids"):
+        params.append([str(tenant_id) for tenant_id in selector["tenant_ids"]])
+        clauses.append(f"id = ANY(${len(params)}::uuid[])")
+    if selector.get("slugs"):
+        params.append(selector["slugs"])
+        clauses.append(f"slug = ANY(${len(params)}::text[])")
+    if selector.get("exclude_slugs"):
+        params.append(selector["exclude_slugs"])
+        clauses.append(f"NOT (slug = ANY(${len(params)}::text[]))")
+    return await conn.fetch(
+        f"SELECT id, slug, n8n_url FROM tenants WHERE {' AND '.join(clauses)}",
+        *params
+    )
+
+
+async def create_rollout(
+    conn: asyncpg.Connection,
+    master_workflow_id: str,
+    selector: Dict[str, Any],
+    waves: Optional[List[float]] = None,
+    concurrency: int = ROLLOUT_DEFAULT_CONCURRENCY,
+    max_failure_ratio: float = ROLLOUT_DEFAULT_MAX_FAILURE_RATIO,
+    wave_delay_seconds: int = ROLLOUT_DEFAULT_WAVE_DELAY_SECONDS,
+    created_by: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Pin the master workflow version and the target tenants; the rollout starts as 'pending'"""
+    waves = normalize_waves(waves)
+    content_hash, definition, _ = await get_master_workflow(master_workflow_id)
+
+    tenants = await select_tenants(conn, selector)
+    if not tenants:
+        raise HTTPException(status_code=400, detail="Tenant selector matched no tenants")
+
+    rollout_id = uuid.uuid4()
+    # Stable pseudo-random order, so the canary is not always the oldest tenants
+    tenants = sorted(tenants, key=lambda t: hashlib.md5(f"{rollout_id}:{t['id']}".encode()).hexdigest())
+    wave_numbers = assign_waves(len(tenants), waves)
+
+    async with conn.transaction():
+        await conn.execute(
+            """INSERT INTO workflow_rollouts
+                   (id, master_workflow_id, content_hash, definition, tenant_selector, waves,
+                    concurrency, max_failure_ratio, wave_delay_seconds, created_by)
+               VALUES ($1, $2, $3, $4::jsonb, $5::jsonb, $6::jsonb, $7, $8, $9, $10)""",
+            rollout_id, master_workflow_id, content_hash, json.dumps(definition), json.dumps(selector),
+            json.dumps(waves), concurrency, max_failure_ratio, wave_delay_seconds, created_by
+        )
+        await conn.execute(
+            """INSERT INTO workflow_rollout_targets (rollout_id, tenant_id, wave)
+               SELECT $1, tenant_id, wave FROM unnest($2::uuid[], $3::int[]) AS t(tenant_id, wave)""",
+            rollout_id, [t["id"] for t in tenants], wave_numbers
+        )
+
+    print(f"WORKFLOW_ROLLOUTS: created rollout {rollout_id} of {master_workflow_id} to {len(tenants)} tenants in {len(waves)} waves")
+    return await get_rollout(conn, rollout_id)
+
+
+class RolloutRunner:
+    """Runs one claimed rollout on a single connection; DB access is serialised, HTTP calls are not"""
+
+    def __init__(self, conn: asyncpg.Connection, rollout: asyncpg.Record, runner_id: uuid.UUID):
+        self.conn = conn
+        self.rollout = rollout
+        self.rollout_id = rollout["id"]
+        self.runner_id = runner_id
+        self.definition = json.loads(rollout["definition"])
+        self.db_lock = asyncio.Lock()
+        self.last_heartbeat = time.monotonic()
+        self.stopped = False
+
+    async def heartbeat(self, force: bool = False) -> bool:
+        """Renew the lease; False (and stop) when the rollout was paused, cancelled or taken over"""
+        if self.stopped:
+            return False
+        if not force and time.monotonic() - self.last_heartbeat < ROLLOUT_HEARTBEAT_SECONDS:
+            return True
+        async with self.db_lock:
+            renewed = await self.conn.fetchval(
+                """UPDATE workflow_rollouts SET heartbeat_at = NOW()
+                   WHERE id = $1 AND runner_id = $2 AND status = 'running'
+                   RETURNING 1""",
+                self.rollout_id, self.runner_id
+            )
+        self.last_heartbeat = time.monotonic()
+        if not renewed:
+            self.stopped = True
+            print(f"WORKFLOW_ROLLOUTS: rollout {self.rollout_id} is no longer running here, stopping")
+        return bool(renewed)
+
+    async def deploy(self, tenant: asyncpg.Record) -> Dict[str, Any]:
+        """Create or update the tenant's copy of the pinned workflow"""
+        async with self.db_lock:
+            existing = await self.conn.fetchrow(
+                """SELECT tenant_workflow_id, content_hash FROM tenant_master_workflows
+                   WHERE tenant_id = $1 AND master_workflow_id = $2""",
+                tenant["tenant_id"], self.rollout["master_workflow_id"]
+            )
+        if existing and existing["content_hash"] == self.rollout["content_hash"]:
+            return {"action": "unchanged", "tenant_workflow_id": existing["tenant_workflow_id"]}
+        if existing and await update_definition(
+            tenant["slug"], existing["tenant_workflow_id"], self.definition, tenant["n8n_url"]
+        ):
+            return {"action": "updated", "tenant_workflow_id": existing["tenant_workflow_id"]}
+        # Never installed, or deleted from the tenant's n8n since
+        tenant_workflow_id = await install_definition(tenant["slug"], self.definition, tenant["n8n_url"])
+        return {"action": "created", "tenant_workflow_id": tenant_workflow_id}
+
+    async def run_target(self, tenant: asyncpg.Record, semaphore: asyncio.Semaphore) -> Optional[bool]:
+        """Roll out to one tenant; returns success, or None when skipped because the runner stopped"""
+        async with semaphore:
+            if not await self.heartbeat():
+                return None
+            async with self.db_lock:
+                await self.conn.execute(
+                    """UPDATE workflow_rollout_targets
+                       SET status = 'running', attempts = attempts + 1, started_at = NOW(), error_message = NULL
+                       WHERE rollout_id = $1 AND tenant_id = $2""",
+                    self.rollout_id, tenant["tenant_id"]
+                )
+
+            result, error = None, None
+            try:
+                result = await self.deploy(tenant)
+            except HTTPException as e:
+                error = str(e.detail)
+            except httpx.HTTPError as e:
+                error = f"Network error: {e.__class__.__name__}: {e}"
+            except Exception as e:
+                error = f"Unexpected error: {e}"
+
+            async with self.db_lock:
+                async with self.conn.transaction():
+                    await self.conn.execute(
+                        """UPDATE workflow_rollout_targets
+                           SET status = $3, action = $4, tenant_workflow_id = $5, error_message = $6, finished_at = NOW()
+                           WHERE rollout_id = $1 AND tenant_id = $2""",
+                        self.rollout_id, tenant["tenant_id"], "failed" if error else "succeeded",
+                        result and result["action"], result and result["tenant_workflow_id"],
+                        error and error[:2000]
+                    )
+                    if result and result["action"] != "unchanged":
+                        await self.conn.execute(
+                            """INSERT INTO tenant_master_workflows
+                                   (tenant_id, master_workflow_id, tenant_workflow_id, content_hash)
+                               VALUES ($1, $2, $3, $4)
+                               ON CONFLICT (tenant_id, master_workflow_id) DO UPDATE SET
+                                   tenant_workflow_id = EXCLUDED.tenant_workflow_id,
+                                   content_hash = EXCLUDED.content_hash,
+                                   updated_at = NOW()""",
+                            tenant["tenant_id"], self.rollout["master_workflow_id"],
+                            result["tenant_workflow_id"], self.rollout["content_hash"]
+                        )
+            if error:
+                print(f"WORKFLOW_ROLLOUTS: rollout {self.rollout_id} failed for tenant {tenant['slug']}: {error}")
+            return error is None
+
+    async def run_wave(self, wave: int) -> List[bool]:
+        """Run the wave's pending tenants; tenants a previous runner still has in flight are waited for"""
+        semaphore = asyncio.Semaphore(max(1, min(self.rollout["concurrency"], ROLLOUT_MAX_CONCURRENCY)))
+        results: List[bool] = []
+        while not self.stopped:
+            async with self.db_lock:
+                await _requeue_stale_targets(self.conn, self.rollout_id)
+                tenants = await self.conn.fetch(
+                    """SELECT t.tenant_id, tn.slug, tn.n8n_url
+                       FROM workflow_rollout_targets t
+                       JOIN tenants tn ON tn.id = t.tenant_id
+                       WHERE t.rollout_id = $1 AND t.wave = $2 AND t.status = 'pending'""",
+                    self.rollout_id, wave
+                )
+                in_flight = await self.conn.fetchval(
+                    """SELECT COUNT(*) FROM workflow_rollout_targets
+                       WHERE rollout_id = $1 AND wave = $2 AND status = 'running'""",
+                    self.rollout_id, wave
+                )
+            if tenants:
+                outcomes = await asyncio.gather(*(self.run_target(tenant, semaphore) for tenant in tenants))
+                results.extend(outcome for outcome in outcomes if outcome is not None)
+            elif not in_flight:
+                break
+            # Left by a paused or taken-over runner; it finishes them, or they go stale and are re-queued
+            elif not await self.soak(ROLLOUT_HEARTBEAT_SECONDS):
+                break
+        return results
+
+    async def soak(self, seconds: float) -> bool:
+        """Wait between waves while keeping the lease; False when stopped meanwhile"""
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            await asyncio.sleep(min(ROLLOUT_HEARTBEAT_SECONDS, deadline - time.monotonic()))
+            if not await self.heartbeat(force=True):
+                return False
+        return True
+
+    async def set_status(self, status: str, reason: Optional[str] = None) -> None:
+        async with self.db_lock:
+            await self.conn.execute(
+                """UPDATE workflow_rollouts
+                   SET status = $3, status_reason = $4, updated_at = NOW(),
+                       finished_at = CASE WHEN $3 = 'completed' THEN NOW() ELSE finished_at END
+                   WHERE id = $1 AND runner_id = $2 AND status = 'running'""",
+                self.rollout_id, self.runner_id, status, reason
+            )
+
+    async def run(self) -> None:
+        waves = json.loads(self.rollout["waves"])
+        for wave in range(self.rollout["current_wave"], len(waves)):
+            outcomes = await self.run_wave(wave)
+            if self.stopped:
+                return
+            # Gate on this run's attempts, so resuming without retrying accepts earlier failures
+            failed = outcomes.count(False)
+            if outcomes and failed / len(outcomes) > self.rollout["max_failure_ratio"]:
+                await self.set_status(
+                    "paused",
+                    f"Wave {wave}: {failed} of {len(outcomes)} tenants failed "
+                    f"(max failure ratio {self.rollout['max_failure_ratio']})"
+                )
+                print(f"WORKFLOW_ROLLOUTS: rollout {self.rollout_id} paused after wave {wave} ({failed}/{len(outcomes)} failed)")
+                return
+            async with self.db_lock:
+                await self.conn.execute(
+                    """UPDATE workflow_rollouts SET current_wave = $3, heartbeat_at = NOW(), updated_at = NOW()
+                       WHERE id = $1 AND runner_id = $2""",
+                    self.rollout_id, self.runner_id, wave + 1
+                )
+            print(f"WORKFLOW_ROLLOUTS: rollout {self.rollout_id} wave {wave} done ({len(outcomes) - failed}/{len(outcomes)} succeeded)")
+            # Soak only after a wave that actually changed tenants
+            if outcomes and wave + 1 < len(waves) and not await self.soak(self.rollout["wave_delay_seconds"]):
+                return
+        await self.set_status("completed")
+        print(f"WORKFLOW_ROLLOUTS: rollout {self.rollout_id} completed")
+
+
+async def claim_rollout(conn: asyncpg.Connection, rollout_id, runner_id: uuid.UUID) -> Optional[asyncpg.Record]:
+    """Take the lease on a pending rollout, or on a running one whose runner went away"""
+    async with conn.transaction():
+        rollout = await conn.fetchrow(
+            """UPDATE workflow_rollouts
+               SET status = 'running', runner_id = $2, heartbeat_at = NOW(), status_reason = NULL,
+                   started_at = COALESCE(started_at, NOW()), updated_at = NOW()
+               WHERE id = $1
+                 AND (status = 'pending'
+                      OR (status = 'running' AND (heartbeat_at IS NULL
+                          OR heartbeat_at < NOW() - make_interval(secs => $3))))
+               RETURNING *""",
+            rollout_id, runner_id, ROLLOUT_LEASE_SECONDS
+        )
+        if rollout:
+            await _requeue_stale_targets(conn, rollout_id)
+    return rollout
+
+
+async def _requeue_stale_targets(conn: asyncpg.Connection, rollout_id) -> None:
+    """Make in-flight tenants pending again once their attempt is older than the lease.
+
+    A younger attempt may still belong to a paused or replaced runner whose
+    install is in flight; retrying it now could create a second copy.
+    """
+    await conn.execute(
+        """UPDATE workflow_rollout_targets SET status = 'pending'
+           WHERE rollout_id = $1 AND status = 'running'
+             AND (started_at IS NULL OR started_at < NOW() - make_interval(secs => $2))""",
+        rollout_id, ROLLOUT_LEASE_SECONDS
+    )
+
+
+async def run_rollout(rollout_id) -> None:
+    """Claim and run a rollout to completion, pause or cancellation"""
+    conn = await get_db_connection()
+    try:
+        runner_id = uuid.uuid4()
+        rollout = await claim_rollout(conn, rollout_id, runner_id)
+        if not rollout:
+            return
+        runner = RolloutRunner(conn, rollout, runner_id)
+        try:
+            await runner.run()
+        except Exception as e:
+            # Paused rather than left running, so the job does not retry a broken rollout in a loop
+            print(f"WORKFLOW_ROLLOUTS: rollout {rollout_id} failed: {e}")
+            await runner.set_status("paused", f"Runner error: {str(e)[:1000]}")
+    finally:
+        await conn.close()
+        _running.pop(str(rollout_id), None)
+
+
+def is_rollout_running(rollout_id) -> bool:
+    task = _running.get(str(rollout_id))
+    return bool(task and not task.done())
+
+
+def start_rollout(rollout_id) -> None:
+    """Schedule the rollout on the running event loop"""
+    if not is_rollout_running(rollout_id):
+        _running[str(rollout_id)] = asyncio.create_task(run_rollout(rollout_id))
+
+
+async def resume_rollouts() -> int:
+    """Maintenance entry point: start pending rollouts and pick up orphaned running ones"""
+    conn = await get_db_connection()
+    try:
+        rows = await conn.fetch(
+            """SELECT id FROM workflow_rollouts
+               WHERE status = 'pending'
+                  OR (status = 'running' AND (heartbeat_at IS NULL
+                      OR heartbeat_at < NOW() - make_interval(secs => $1)))""",
+            ROLLOUT_LEASE_SECONDS
+        )
+    finally:
+        await conn.close()
+
+    started = 0
+    for row in rows:
+        if not is_rollout_running(row["id"]):
+            start_rollout(row["id"])
+            started += 1
+    if started:
+        print(f"WORKFLOW_ROLLOUTS: resuming {started} rollouts")
+    return started
+
+
+async def set_rollout_status(conn: asyncpg.Connection, rollout_id, action: str, retry_failed: bool = True) -> Dict[str, Any]:
+    """Operator actions: pause, resume (optionally retrying failed tenants) or cancel"""
+    async with conn.transaction():
+        current = await conn.fetchval("SELECT status FROM workflow_rollouts WHERE id = $1 FOR UPDATE", rollout_id)
+        if current is None:
+            raise HTTPException(status_code=404, detail="Rollout not found")
+        if current in TERMINAL_STATUSES:
+            raise HTTPException(status_code=409, detail=f"Rollout is already {current}")
+
+        if action == "pause":
+            if current not in ("pending", "running"):
+                raise HTTPException(status_code=409, detail=f"Cannot pause a {current} rollout")
+            await conn.execute(
+                """UPDATE workflow_rollouts SET status = 'paused', status_reason = 'Paused by operator', updated_at = NOW()
+                   WHERE id = $1""",
+                rollout_id
+            )
+        elif action == "resume":
+            if current != "paused":
+                raise HTTPException(status_code=409, detail=f"Cannot resume a {current} rollout")
+            if retry_failed:
+                await conn.execute(
+                    """UPDATE workflow_rollout_targets SET status = 'pending'
+                       WHERE rollout_id = $1 AND status = 'failed'""",
+                    rollout_id
+                )
+            # Restart from the earliest wave that still has work
+            await conn.execute(
+                """UPDATE workflow_rollouts
+                   SET status = 'pending', status_reason = NULL, updated_at = NOW(),
+                       current_wave = LEAST(current_wave, COALESCE(
+                           (SELECT MIN(wave) FROM workflow_rollout_targets
+                            WHERE rollout_id = $1 AND status IN ('pending', 'running')),
+                           current_wave))
+                   WHERE id = $1""",
+                rollout_id
+            )
+        elif action == "cancel":
+            await conn.execute(
+                """UPDATE workflow_rollouts
+                   SET status = 'cancelled', status_reason = 'Cancelled by operator', finished_at = NOW(), updated_at = NOW()
+                   WHERE id = $1""",
+                rollout_id
+            )
+        else:
+            raise HTTPException(status_code=400, detail=f"Unknown rollout action: {action}")
+
+    if action == "resume":
+        start_rollout(rollout_id)
+    return await get_rollout(conn, rollout_id)
+
+
+_ROLLOUT_COLUMNS = """id, master_workflow_id, content_hash, tenant_selector, waves, current_wave, concurrency,
+                      max_failure_ratio, wave_delay_seconds, status, status_reason, created_by, heartbeat_at,
+                      created_at, started_at, finished_at, updated_at"""
+
+
+def _rollout_dict(row: asyncpg.Record) -> Dict[str, Any]:
+    rollout = dict(row)
+    rollout["tenant_selector"] = json.loads(rollout["tenant_selector"])
+    rollout["waves"] = json.loads(rollout["waves"])
+    return rollout
+
+
+async def get_rollout(conn: asyncpg.Connection, rollout_id) -> Optional[Dict[str, Any]]:
+    """Rollout with target counts per status and per wave"""
+    row = await conn.fetchrow(f"SELECT {_ROLLOUT_COLUMNS} FROM workflow_rollouts WHERE id = $1", rollout_id)
+    if not row:
+        return None
+    rollout = _rollout_dict(row)
+
+    counts = await conn.fetch(
+        """SELECT wave, status, COUNT(*)::int AS count FROM workflow_rollout_targets
+           WHERE rollout_id = $1 GROUP BY wave, status""",
+        rollout_id
+    )
+    totals: Dict[str, int] = {}
+    waves: Dict[int, Dict[str, int]] = {}
+    for count in counts:
+        totals[count["status"]] = totals.get(count["status"], 0) + count["count"]
+        waves.setdefault(count["wave"], {})[count["status"]] = count["count"]
+    rollout["targets"] = {"total": sum(totals.values()), **totals}
+    rollout["wave_progress"] = [
+        {"wave": wave, "percent": pct, **waves.get(wave, {})}
+        for wave, pct in enumerate(rollout["waves"])
+    ]
+    return rollout
+
+
+async def list_rollouts(conn: asyncpg.Connection, limit: int = 50) -> List[Dict[str, Any]]:
+    rows = await conn.fetch(
+        f"SELECT {_ROLLOUT_COLUMNS} FROM workflow_rollouts ORDER BY created_at DESC LIMIT $1",
+        limit
+    )
+    return [_rollout_dict(row) for row in rows]
+
+
+async def list_rollout_targets(
+    conn: asyncpg.Connection,
+    rollout_id,
+    status: Optional[str] = None,
+    limit: int = 200,
+) -> List[Dict[str, Any]]:
+    rows = await conn.fetch(
+        """SELECT t.tenant_id, tn.slug AS tenant_slug, t.wave, t.status, t.action, t.tenant_workflow_id,
+                  t.attempts, t.error_message, t.started_at, t.finished_at
+           FROM workflow_rollout_targets t
+           JOIN tenants tn ON tn.id = t.tenant_id
+           WHERE t.rollout_id = $1 AND ($2::text IS NULL OR t.status = $2)
+           ORDER BY t.wave, tn.slug
+           LIMIT $3""",
+        rollout_id, status, limit
+    )
+    return [dict(row) for row in rows]
+
+
+__all__ = [
+    "ROLLOUT_DEFAULT_CONCURRENCY",
+    "ROLLOUT_DEFAULT_MAX_FAILURE_RATIO",
+    "ROLLOUT_DEFAULT_WAVE_DELAY_SECONDS",
+    "ROLLOUT_MAX_CONCURRENCY",
+    "assign_waves",
+    "create_rollout",
+    "get_rollout",
+    "is_rollout_running",
+    "list_rollout_targets",
+    "list_rollouts",
+    "normalize_waves",
+    "resume_rollouts",
+    "run_rollout",
+    "select_tenants",
+    "set_rollout_status",
+    "start_rollout",
+]
@@ -169,6 +169,53 @@ def create_app() -> FastAPI:
     # Include API routes
     app.include_router(import_api_routers())
 
+    # Periodic maintenance (partitions, retention, contact eviction, execution payloads and history, template catalog, workflow rollouts, tenant n8n health, answer cache, orphaned knowledge imports and tenant purges)
+    @app.on_event("startup")
+    async def start_background_maintenance():
+        from app.libs.maintenance import register_periodic_job, start_maintenance
+        from app.libs.message_partitions import run_partition_maintenance
+        from app.libs.contact_tiers import run_contact_eviction
+        from app.libs.execution_payloads import run_payload_offload
+        from app.libs.execution_retention import run_execution_retention
+        from app.libs.template_catalog import TEMPLATE_CATALOG_SYNC_SECONDS, run_template_catalog_sync
+        from app.libs.workflow_rollouts import resume_rollouts
+        from app.libs.n8n_health import N8N_HEALTH_PROBE_INTERVAL_SECONDS, run_n8n_health_probe
+        from app.libs.answer_cache import run_answer_cache_memory_purge, run_answer_cache_purge
+        from app.libs.knowledge_import import recover_import_jobs
+        from app.libs.tenant_purge import recover_purge_jobs
+
+        register_periodic_job("message_partitions", 6 * 3600, run_partition_maintenance)
+        register_periodic_job("contact_eviction", 15 * 60, run_contact_eviction)
+        register_periodic_job("execution_payload_offload", 5 * 60, run_payload_offload)
+        register_periodic_job("execution_retention", 3600, run_execution_retention)
+        register_periodic_job("template_catalog_sync", TEMPLATE_CATALOG_SYNC_SECONDS, run_template_catalog_sync)
+        register_periodic_job("workflow_rollouts", 60, resume_rollouts)
+        # One process probes (own lock), every process mirrors the results
+        register_periodic_job("n8n_health", N8N_HEALTH_PROBE_INTERVAL_SECONDS, run_n8n_health_probe, singleton=False)
+        register_periodic_job("answer_cache_purge", 3600, run_answer_cache_purge)
+        # The in-memory LRU is per process
+        register_periodic_job("answer_cache_memory_purge", 3600, run_answer_cache_memory_purge, singleton=False)
+        register_periodic_job("knowledge_import_recovery", 120, recover_import_jobs)
+        register_periodic_job("tenant_purge_recovery", 120, recover_purge_jobs)
+        start_maintenance()
+
+    # Schema capability map: load the catalog once instead of probing it per request
+    @app.on_event("startup")
+    async def load_schema_capabilities():
+        from app.libs.schema_capabilities import install_reload_signal_handler, refresh_schema_capabilities
+
+        install_reload_signal_handler()
+        try:
+            await refresh_schema_capabilities()
+        except Exception as e:
+            # Loaded lazily by the first handler that needs it
+            print(f"⚠️ Schema capabilities not loaded at startup: {e}")
+
+    @app.on_event("shutdown")
+    async def stop_background_maintenance():
+        from app.libs.maintenance import stop_maintenance
+        await stop_maintenance()
+
     # Health check endpoint
     @app.get("/health")
     async def health_check():
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Database Migrations
+Apply pending versioned migrations from ./migrations (idempotent; run on every deploy)
+
+    python migrate.py            # apply pending migrations
+    python migrate.py --status   # list applied and pending migrations
+"""
+
+import asyncio
+import sys
+
+from app.libs.db_connection import get_db_connection
+from app.libs.migrations import migration_status, run_migrations
+
+
+async def main(argv) -> int:
+    conn = await get_db_connection()
+    try:
+        if "--status" in argv:
+            for row in await migration_status(conn):
+                state = f"applied {row['applied_at']:%Y-%m-%d %H:%M}" if row["applied_at"] else "pending"
+                flag = " (modified since applied)" if row["modified"] else ""
+                print(f"{row['version']}_{row['name']}: {state}{flag}")
+            return 0
+
+        print("🔧 DATABASE MIGRATIONS")
+        print("=" * 50)
+        applied = await run_migrations(conn)
+        print(f"🎉 {len(applied)} migration(s) applied" if applied else "✅ Database schema is up to date")
+        return 0
+    except Exception as e:
+        print(f"❌ Migration failed: {e}")
+        return 1
+    finally:
+        await conn.close()
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(sys.argv[1:])))
@@ -0,0 +1,228 @@
+-- Baseline schema (formerly database/setup_db.py)
+
+-- Create ENUM types
+DO $$ BEGIN
+    CREATE TYPE tenant_status AS ENUM ('active', 'inactive', 'suspended');
+EXCEPTION
+    WHEN duplicate_object THEN null;
+END $$;
+
+DO $$ BEGIN
+    CREATE TYPE membership_role AS ENUM ('owner', 'admin', 'member');
+EXCEPTION
+    WHEN duplicate_object THEN null;
+END $$;
+
+DO $$ BEGIN
+    CREATE TYPE membership_status AS ENUM ('active', 'pending', 'inactive');
+EXCEPTION
+    WHEN duplicate_object THEN null;
+END $$;
+
+DO $$ BEGIN
+    CREATE TYPE user_role AS ENUM ('user', 'admin', 'super_admin');
+EXCEPTION
+    WHEN duplicate_object THEN null;
+END $$;
+
+-- Create user_roles table
+CREATE TABLE IF NOT EXISTS user_roles (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    email VARCHAR(255) UNIQUE NOT NULL,
+    role user_role DEFAULT 'user',
+    assigned_by VARCHAR(255),
+    assigned_at TIMESTAMPTZ DEFAULT NOW(),
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    updated_at TIMESTAMPTZ
+);
+
+-- Create tenants table
+CREATE TABLE IF NOT EXISTS tenants (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    slug VARCHAR(63) UNIQUE NOT NULL,
+    name VARCHAR(255) NOT NULL,
+    status tenant_status DEFAULT 'active',
+    n8n_url VARCHAR(255),
+    branding_settings JSONB DEFAULT '{}',
+    confidence_threshold FLOAT DEFAULT 0.8,
+    hot_ttl_days INTEGER DEFAULT 30,
+    deleted_at TIMESTAMPTZ,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    updated_at TIMESTAMPTZ
+);
+
+-- Add missing columns to existing tenants table
+ALTER TABLE tenants ADD COLUMN IF NOT EXISTS branding_settings JSONB DEFAULT '{}';
+ALTER TABLE tenants ADD COLUMN IF NOT EXISTS confidence_threshold FLOAT DEFAULT 0.8;
+ALTER TABLE tenants ADD COLUMN IF NOT EXISTS hot_ttl_days INTEGER DEFAULT 30;
+ALTER TABLE tenants ADD COLUMN IF NOT EXISTS deleted_at TIMESTAMPTZ;
+
+-- Create tenant_memberships table
+CREATE TABLE IF NOT EXISTS tenant_memberships (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    tenant_id UUID NOT NULL REFERENCES tenants(id) ON DELETE CASCADE,
+    user_id VARCHAR(255) NOT NULL,
+    role membership_role DEFAULT 'member',
+    status membership_status DEFAULT 'active',
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    updated_at TIMESTAMPTZ,
+    UNIQUE (tenant_id, user_id)
+);
+
+-- Create workflows table
+CREATE TABLE IF NOT EXISTS workflows (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    tenant_id UUID NOT NULL REFERENCES tenants(id) ON DELETE CASCADE,
+    name VARCHAR(255) NOT NULL,
+    description TEXT,
+    n8n_workflow_id VARCHAR(255),
+    category VARCHAR(100),
+    tags TEXT[],
+    is_active BOOLEAN DEFAULT true,
+    is_public BOOLEAN DEFAULT false,
+    metadata JSONB,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    updated_at TIMESTAMPTZ,
+    UNIQUE (tenant_id, n8n_workflow_id)
+);
+
+-- Create workflow_executions table
+CREATE TABLE IF NOT EXISTS workflow_executions (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    workflow_id UUID NOT NULL REFERENCES workflows(id) ON DELETE CASCADE,
+    tenant_id UUID NOT NULL REFERENCES tenants(id) ON DELETE CASCADE,
+    n8n_execution_id VARCHAR(255),
+    status VARCHAR(50) DEFAULT 'running',
+    started_at TIMESTAMPTZ DEFAULT NOW(),
+    finished_at TIMESTAMPTZ,
+    execution_data JSONB,
+    error_message TEXT,
+    created_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+-- Create knowledge_bases table
+CREATE TABLE IF NOT EXISTS knowledge_bases (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    tenant_id UUID NOT NULL REFERENCES tenants(id) ON DELETE CASCADE,
+    name VARCHAR(255) NOT NULL,
+    description TEXT,
+    source_type VARCHAR(50), -- 'upload', 'url', 'api', etc.
+    source_metadata JSONB,
+    document_count INTEGER DEFAULT 0,
+    total_chunks INTEGER DEFAULT 0,
+    last_updated TIMESTAMPTZ,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    updated_at TIMESTAMPTZ
+);
+
+-- Create embeddings table (vector storage)
+CREATE TABLE IF NOT EXISTS embeddings (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    knowledge_base_id UUID NOT NULL REFERENCES knowledge_bases(id) ON DELETE CASCADE,
+    tenant_id UUID NOT NULL REFERENCES tenants(id) ON DELETE CASCADE,
+    chunk_text TEXT NOT NULL,
+    chunk_metadata JSONB,
+    embedding_vector FLOAT[1536], -- OpenAI ada-002 dimensions
+    document_name VARCHAR(255),
+    chunk_index INTEGER,
+    created_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+-- Create user_preferences table
+CREATE TABLE IF NOT EXISTS user_preferences (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    user_id VARCHAR(255) NOT NULL,
+    tenant_id UUID REFERENCES tenants(id) ON DELETE CASCADE,
+    preferences JSONB DEFAULT '{}',
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    updated_at TIMESTAMPTZ,
+    UNIQUE (user_id, tenant_id)
+);
+
+-- Create webchat_sessions table (already used by tenants API)
+CREATE TABLE IF NOT EXISTS webchat_sessions (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    session_key VARCHAR(255) UNIQUE NOT NULL,
+    tenant_id VARCHAR(255) NOT NULL,
+    workflow_id VARCHAR(255) NOT NULL,
+    user_id VARCHAR(255) NOT NULL,
+    messages JSONB DEFAULT '[]',
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+-- Create pulse_campaigns table for Relational Pulse analytics
+CREATE TABLE IF NOT EXISTS pulse_campaigns (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    tenant_id UUID NOT NULL REFERENCES tenants(id) ON DELETE CASCADE,
+    campaign_date DATE NOT NULL,
+    total_users INTEGER DEFAULT 0,
+    messages_sent INTEGER DEFAULT 0,
+    delivery_rate FLOAT DEFAULT 0.0,
+    open_rate FLOAT DEFAULT 0.0,
+    response_rate FLOAT DEFAULT 0.0,
+    engagement_score FLOAT DEFAULT 0.0,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    updated_at TIMESTAMPTZ
+);
+
+-- Create pulse_messages table for individual message tracking
+CREATE TABLE IF NOT EXISTS pulse_messages (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    campaign_id UUID NOT NULL REFERENCES pulse_campaigns(id) ON DELETE CASCADE,
+    user_id VARCHAR(255) NOT NULL,
+    whatsapp_number VARCHAR(20) NOT NULL,
+    message_content TEXT,
+    personalization_score FLOAT DEFAULT 0.0,
+    sent_at TIMESTAMPTZ,
+    delivered_at TIMESTAMPTZ,
+    read_at TIMESTAMPTZ,
+    responded_at TIMESTAMPTZ,
+    created_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+-- Add pulse_settings column to tenants table
+ALTER TABLE tenants
+ADD COLUMN IF NOT EXISTS pulse_settings JSONB DEFAULT '{"enabled": false}';
+
+-- Create conversation_topics table for context tracking
+CREATE TABLE IF NOT EXISTS conversation_topics (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    conversation_id UUID NOT NULL,
+    tenant_id UUID NOT NULL REFERENCES tenants(id) ON DELETE CASCADE,
+    topic VARCHAR(255) NOT NULL,
+    confidence_score FLOAT DEFAULT 0.0,
+    created_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+-- Create conversations table for context (if not exists)
+CREATE TABLE IF NOT EXISTS conversations (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    tenant_id UUID NOT NULL REFERENCES tenants(id) ON DELETE CASCADE,
+    user_id VARCHAR(255) NOT NULL,
+    whatsapp_number VARCHAR(20),
+    status VARCHAR(50) DEFAULT 'active',
+    last_message_at TIMESTAMPTZ,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    updated_at TIMESTAMPTZ
+);
+
+-- Create users table for Relational Pulse
+CREATE TABLE IF NOT EXISTS users (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    user_id VARCHAR(255) UNIQUE NOT NULL,
+    tenant_id UUID REFERENCES tenants(id) ON DELETE CASCADE,
+    name VARCHAR(255),
+    whatsapp_number VARCHAR(20),
+    email VARCHAR(255),
+    status VARCHAR(50) DEFAULT 'active',
+    last_interaction TIMESTAMPTZ,
+    customer_context JSONB DEFAULT '{}',
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    updated_at TIMESTAMPTZ
+);
+
+-- Add pulse_preferences to user_preferences (users table now exists)
+UPDATE user_preferences
+SET preferences = preferences || '{"pulse_preferences": {"enabled": true, "frequency": "weekly"}}'::jsonb
+WHERE preferences->>'pulse_preferences' IS NULL;
@@ -0,0 +1,15 @@
+-- Columns expected by tenant provisioning (formerly backend/migrate_schema.py)
+ALTER TABLE user_roles ADD COLUMN IF NOT EXISTS email VARCHAR(255) UNIQUE;
+ALTER TABLE user_roles ADD COLUMN IF NOT EXISTS assigned_by VARCHAR(255);
+ALTER TABLE user_roles ADD COLUMN IF NOT EXISTS assigned_at TIMESTAMPTZ;
+ALTER TABLE user_roles ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ;
+ALTER TABLE tenant_memberships ADD COLUMN IF NOT EXISTS tenant_slug VARCHAR(100);
+
+-- Allow the 'user' role for tenant owners (formerly backend/fix_user_roles_constraint.py)
+DO $$ BEGIN
+    IF EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'user_roles_role_check') THEN
+        ALTER TABLE user_roles DROP CONSTRAINT user_roles_role_check;
+        ALTER TABLE user_roles ADD CONSTRAINT user_roles_role_check
+            CHECK (role::text IN ('user', 'admin', 'super_admin'));
+    END IF;
+END $$;
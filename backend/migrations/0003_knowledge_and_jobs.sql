@@ -0,0 +1,75 @@
+-- Knowledge ingestion, answer cache and background job tables
+
+-- Incremental ingestion: per-document and per-chunk content hashes
+ALTER TABLE knowledge_bases ADD COLUMN IF NOT EXISTS content_hash CHAR(64);
+
+ALTER TABLE embeddings ADD COLUMN IF NOT EXISTS chunk_hash CHAR(64);
+
+-- Knowledge index is keyset-paginated on (updated_at, id): updated_at must never be NULL
+UPDATE knowledge_bases SET updated_at = COALESCE(last_updated, created_at, NOW()) WHERE updated_at IS NULL;
+
+ALTER TABLE knowledge_bases ALTER COLUMN updated_at SET DEFAULT NOW();
+
+-- Create synthesis_answer_cache table (persistent tier of the answer cache)
+CREATE TABLE IF NOT EXISTS synthesis_answer_cache (
+    cache_key CHAR(64) PRIMARY KEY, -- sha256(model, prompt, query, context)
+    scope_hash CHAR(64) NOT NULL,    -- sha256(model, prompt, context)
+    model VARCHAR(100) NOT NULL,
+    answer TEXT NOT NULL,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    expires_at TIMESTAMPTZ NOT NULL
+);
+
+-- Create knowledge import job tables (bulk import progress and per-document errors)
+CREATE TABLE IF NOT EXISTS knowledge_import_jobs (
+    id UUID PRIMARY KEY,
+    tenant_id UUID NOT NULL REFERENCES tenants(id) ON DELETE CASCADE,
+    status VARCHAR(30) NOT NULL DEFAULT 'queued', -- queued, running, completed, completed_with_errors, failed, cancelled
+    total_items INTEGER NOT NULL DEFAULT 0,
+    processed_items INTEGER NOT NULL DEFAULT 0,
+    succeeded_items INTEGER NOT NULL DEFAULT 0,
+    unchanged_items INTEGER NOT NULL DEFAULT 0,
+    failed_items INTEGER NOT NULL DEFAULT 0,
+    chunks_added INTEGER NOT NULL DEFAULT 0,
+    created_by VARCHAR(255),
+    staging_dir TEXT,
+    error TEXT,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    started_at TIMESTAMPTZ,
+    finished_at TIMESTAMPTZ,
+    updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS knowledge_import_items (
+    id BIGSERIAL PRIMARY KEY,
+    job_id UUID NOT NULL REFERENCES knowledge_import_jobs(id) ON DELETE CASCADE,
+    tenant_id UUID NOT NULL REFERENCES tenants(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    source_type VARCHAR(10) NOT NULL, -- file, zip, url
+    source_ref TEXT NOT NULL,
+    staged_path TEXT,
+    status VARCHAR(20) NOT NULL DEFAULT 'pending', -- pending, processing, succeeded, unchanged, failed, cancelled
+    knowledge_base_id UUID REFERENCES knowledge_bases(id) ON DELETE SET NULL,
+    chunks_added INTEGER,
+    error TEXT,
+    started_at TIMESTAMPTZ,
+    finished_at TIMESTAMPTZ,
+    UNIQUE (job_id, position)
+);
+
+-- Create tenant_deletion_jobs table (progress of batched hard deletes; outlives the tenant row)
+CREATE TABLE IF NOT EXISTS tenant_deletion_jobs (
+    tenant_id VARCHAR(64) PRIMARY KEY,
+    tenant_slug VARCHAR(63),
+    tenant_name VARCHAR(255),
+    status VARCHAR(20) NOT NULL DEFAULT 'queued', -- queued, running, completed, failed
+    reason TEXT,
+    requested_by VARCHAR(255),
+    current_table VARCHAR(63),
+    deleted_counts JSONB NOT NULL DEFAULT '{}',
+    error TEXT,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    started_at TIMESTAMPTZ,
+    finished_at TIMESTAMPTZ,
+    updated_at TIMESTAMPTZ DEFAULT NOW()
+);
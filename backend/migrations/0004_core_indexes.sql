@@ -0,0 +1,30 @@
+-- migrate: no-transaction
+-- Performance indexes, built without blocking writes
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_workflows_tenant_id ON workflows(tenant_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_workflows_active ON workflows(is_active) WHERE is_active = true;
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_workflow_executions_workflow_id ON workflow_executions(workflow_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_workflow_executions_tenant_id ON workflow_executions(tenant_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_workflow_executions_status ON workflow_executions(status);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_workflow_executions_started_at ON workflow_executions(started_at);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_knowledge_bases_tenant_id ON knowledge_bases(tenant_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_embeddings_knowledge_base_id ON embeddings(knowledge_base_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_embeddings_tenant_id ON embeddings(tenant_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_embeddings_kb_document_hash ON embeddings(knowledge_base_id, document_name, chunk_hash);
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS uq_knowledge_bases_tenant_name ON knowledge_bases(tenant_id, name);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_knowledge_bases_tenant_updated ON knowledge_bases(tenant_id, updated_at DESC, id DESC);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_knowledge_import_jobs_tenant_created ON knowledge_import_jobs(tenant_id, created_at DESC);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_knowledge_import_items_job_status ON knowledge_import_items(job_id, status, position);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_user_preferences_user_id ON user_preferences(user_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_webchat_sessions_session_key ON webchat_sessions(session_key);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_webchat_sessions_tenant_id ON webchat_sessions(tenant_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_tenant_memberships_user_id ON tenant_memberships(user_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_tenant_memberships_tenant_id ON tenant_memberships(tenant_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_pulse_campaigns_tenant_id ON pulse_campaigns(tenant_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_pulse_campaigns_date ON pulse_campaigns(campaign_date);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_pulse_messages_campaign_id ON pulse_messages(campaign_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_pulse_messages_user_id ON pulse_messages(user_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_conversation_topics_conversation_id ON conversation_topics(conversation_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_conversations_tenant_user ON conversations(tenant_id, user_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_conversations_whatsapp ON conversations(whatsapp_number);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_synthesis_answer_cache_expires_at ON synthesis_answer_cache(expires_at);
@@ -0,0 +1,100 @@
+"""Convert messages_archive to monthly range partitions.
+
+The copy is resumable, so this runs outside a transaction: an interrupted
+deploy leaves messages_archive partitioned and messages_archive_legacy in
+place, and the next run finishes the copy.
+
+Self-contained on purpose: an applied migration must keep doing what it did
+when it was written, so it does not import app.libs.message_partitions
+(which partition maintenance keeps evolving).
+"""
+
+from datetime import date, datetime, timezone
+
+TRANSACTIONAL = False
+
+PARENT_TABLE = "messages_archive"
+LEGACY_TABLE = "messages_archive_legacy"
+MONTHS_AHEAD = 2
+
+
+def _month_start(value) -> date:
+    return date(value.year, value.month, 1)
+
+
+def _add_months(month: date, count: int) -> date:
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+async def _is_partitioned(conn) -> bool:
+    relkind = await conn.fetchval("SELECT relkind FROM pg_class WHERE oid = to_regclass($1)", PARENT_TABLE)
+    return relkind == "p"
+
+
+async def _ensure_partitions(conn, first_month: date, last_month: date) -> None:
+    month = first_month
+    while month <= last_month:
+        name = f"{PARENT_TABLE}_{month.year}_{month.month:02d}"
+        await conn.execute(
+            f"""CREATE TABLE IF NOT EXISTS {name} PARTITION OF {PARENT_TABLE}
+                FOR VALUES FROM ('{month.isoformat()}') TO ('{_add_months(month, 1).isoformat()}')"""
+        )
+        month = _add_months(month, 1)
+
+
+async def migrate(conn):
+    # messages_archive is owned by the conversation pipeline; nothing to do until it exists
+    if not await conn.fetchval("SELECT to_regclass($1) IS NOT NULL", PARENT_TABLE):
+        return
+
+    current = _month_start(datetime.now(timezone.utc))
+    if not await _is_partitioned(conn):
+        async with conn.transaction():
+            await conn.execute(f"LOCK TABLE {PARENT_TABLE} IN ACCESS EXCLUSIVE MODE")
+            await conn.execute(f"ALTER TABLE {PARENT_TABLE} RENAME TO {LEGACY_TABLE}")
+            await conn.execute(
+                f"""CREATE TABLE {PARENT_TABLE} (LIKE {LEGACY_TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)
+                    PARTITION BY RANGE (message_timestamp)"""
+            )
+            # The partition key must be part of the primary key
+            await conn.execute(f"ALTER TABLE {PARENT_TABLE} ADD PRIMARY KEY (message_id, message_timestamp)")
+            await _ensure_partitions(conn, current, _add_months(current, MONTHS_AHEAD))
+        print("  messages_archive is now partitioned; copying existing rows")
+
+    if await conn.fetchval("SELECT to_regclass($1) IS NOT NULL", LEGACY_TABLE):
+        bounds = await conn.fetchrow(
+            f"SELECT MIN(message_timestamp) AS oldest, MAX(message_timestamp) AS newest FROM {LEGACY_TABLE}"
+        )
+        copied = 0
+        if bounds["oldest"]:
+            oldest = _month_start(bounds["oldest"])
+            newest = _month_start(bounds["newest"])
+            await _ensure_partitions(conn, oldest, max(newest, _add_months(current, MONTHS_AHEAD)))
+            # Newest months first so recent-message lookups are complete soonest
+            month = newest
+            while month >= oldest:
+                status = await conn.execute(
+                    f"""INSERT INTO {PARENT_TABLE} SELECT * FROM {LEGACY_TABLE}
+                        WHERE message_timestamp >= $1 AND message_timestamp < $2
+                        ON CONFLICT DO NOTHING""",
+                    month, _add_months(month, 1)
+                )
+                copied += int(status.split()[-1])
+                month = _add_months(month, -1)
+
+        missing = await conn.fetchval(
+            f"""SELECT COUNT(*) FROM {LEGACY_TABLE} l
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM {PARENT_TABLE} m
+                    WHERE m.message_id = l.message_id AND m.message_timestamp = l.message_timestamp
+                )"""
+        )
+        if missing:
+            raise RuntimeError(
+                f"{missing} rows are still only in {LEGACY_TABLE}; fix them and re-run migrate.py"
+            )
+        await conn.execute(f"DROP TABLE {LEGACY_TABLE}")
+        print(f"  Copied {copied} rows, dropped {LEGACY_TABLE}")
+
+    await _ensure_partitions(conn, current, _add_months(current, MONTHS_AHEAD))
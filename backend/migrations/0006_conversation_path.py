@@ -0,0 +1,175 @@
+"""Indexes for the conversation data path (ingest, context envelope, HITL routing).
+
+Built CONCURRENTLY so live conversation traffic is not blocked. For the
+partitioned messages_archive the index is created on the parent only, built
+concurrently on each partition and then attached.
+
+The old ingest path created a second contact whenever a number was only in
+contacts_archive, and inbox threads were created check-then-insert. Before
+the unique indexes are built, duplicates are merged. Per (tenant, number)
+the contact with the newest last_contact_timestamp is kept. Messages and
+inbox threads of the other contacts are re-pointed to it, their cached
+context envelopes are deleted, and then the other contact rows are deleted.
+Per (tenant, contact) only the most recent inbox thread is kept. Both steps are
+idempotent, so a run that fails on a race with live ingest is simply re-run.
+
+Partition lookups are inlined rather than imported from
+app.libs.message_partitions, so this migration does not change behaviour
+when that module does.
+"""
+
+import re
+
+from app.libs.migrations import drop_invalid_index
+
+TRANSACTIONAL = False
+
+INDEXES = [
+    ("contacts_cache", "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS uq_contacts_cache_tenant_whatsapp ON contacts_cache(tenant_id, whatsapp_number) INCLUDE (contact_id)"),
+    ("contacts_archive", "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS uq_contacts_archive_tenant_whatsapp ON contacts_archive(tenant_id, whatsapp_number) INCLUDE (contact_id)"),
+    ("contacts_cache", "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_contacts_cache_tenant_contact ON contacts_cache(tenant_id, contact_id)"),
+    ("contacts_archive", "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_contacts_archive_tenant_contact ON contacts_archive(tenant_id, contact_id)"),
+    ("inbox_threads", "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS uq_inbox_threads_tenant_contact ON inbox_threads(tenant_id, contact_id) INCLUDE (thread_id)"),
+    ("active_hitl_tasks", "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_active_hitl_tasks_tenant_status_created ON active_hitl_tasks(tenant_id, status, created_at)"),
+    ("active_hitl_tasks", "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_active_hitl_tasks_open_by_tenant ON active_hitl_tasks(tenant_id, created_at DESC) WHERE status NOT IN ('completed', 'resolved')"),
+]
+
+MESSAGES_INDEX = "idx_messages_archive_tenant_contact_ts"
+MESSAGES_INDEX_COLUMNS = "(tenant_id, contact_id, message_timestamp DESC)"
+
+
+_PARTITION_RE = re.compile(r"^messages_archive_(\d{4})_(\d{2})$")
+
+
+async def _exists(conn, relation: str) -> bool:
+    return await conn.fetchval("SELECT to_regclass($1) IS NOT NULL", relation)
+
+
+async def _is_partitioned(conn) -> bool:
+    relkind = await conn.fetchval("SELECT relkind FROM pg_class WHERE oid = to_regclass('messages_archive')")
+    return relkind == "p"
+
+
+async def _monthly_partitions(conn) -> list:
+    rows = await conn.fetch(
+        """SELECT c.relname FROM pg_inherits i
+           JOIN pg_class c ON c.oid = i.inhrelid
+           WHERE i.inhparent = to_regclass('messages_archive')"""
+    )
+    return sorted(row["relname"] for row in rows if _PARTITION_RE.match(row["relname"]))
+
+
+async def _merge_duplicate_contacts(conn):
+    tiers = [table for table in ("contacts_archive", "contacts_cache") if await _exists(conn, table)]
+    if not tiers:
+        return
+    candidates = " UNION ".join(
+        f"SELECT contact_id, tenant_id, whatsapp_number, last_contact_timestamp FROM {table} WHERE whatsapp_number IS NOT NULL"
+        for table in tiers
+    )
+    async with conn.transaction():
+        await conn.execute(f"""
+            CREATE TEMP TABLE contact_merge ON COMMIT DROP AS
+            SELECT DISTINCT ON (old_id) old_id, keep_id FROM (
+                SELECT contact_id AS old_id,
+                       FIRST_VALUE(contact_id) OVER w AS keep_id
+                FROM ({candidates}) c
+                WINDOW w AS (
+                    PARTITION BY tenant_id, whatsapp_number
+                    ORDER BY last_contact_timestamp DESC NULLS LAST, contact_id DESC
+                )
+            ) ranked
+            WHERE old_id <> keep_id
+        """)
+        merged = await conn.fetchval("SELECT COUNT(DISTINCT old_id) FROM contact_merge")
+        if not merged:
+            return
+        await conn.execute("CREATE INDEX ON contact_merge (old_id)")
+
+        if await _exists(conn, "messages_archive"):
+            await conn.execute("""
+                UPDATE messages_archive m SET contact_id = x.keep_id
+                FROM contact_merge x WHERE m.contact_id = x.old_id
+            """)
+        if await _exists(conn, "inbox_threads"):
+            await conn.execute("""
+                UPDATE inbox_threads t SET contact_id = x.keep_id
+                FROM contact_merge x WHERE t.contact_id = x.old_id
+            """)
+        if await _exists(conn, "ctx_cache_envelopes"):
+            # Cached context is rebuilt on the next request
+            await conn.execute("DELETE FROM ctx_cache_envelopes e USING contact_merge x WHERE e.contact_id = x.old_id")
+
+        if "contacts_archive" in tiers and "contacts_cache" in tiers:
+            # Keep the archive complete when the surviving contact only lived in the hot tier
+            await conn.execute("""
+                INSERT INTO contacts_archive (contact_id, tenant_id, whatsapp_number, full_name, metadata, last_contact_timestamp)
+                SELECT DISTINCT ON (c.contact_id)
+                       c.contact_id, c.tenant_id, c.whatsapp_number, c.full_name, c.metadata, c.last_contact_timestamp
+                FROM contacts_cache c
+                JOIN contact_merge x ON x.keep_id = c.contact_id
+                WHERE NOT EXISTS (SELECT 1 FROM contacts_archive a WHERE a.contact_id = c.contact_id)
+            """)
+        for table in tiers:
+            await conn.execute(f"DELETE FROM {table} c USING contact_merge x WHERE c.contact_id = x.old_id")
+    print(f"  Merged {merged} duplicate contacts")
+
+
+async def _dedupe_inbox_threads(conn):
+    if not await _exists(conn, "inbox_threads"):
+        return
+    status = await conn.execute("""
+        DELETE FROM inbox_threads t
+        USING (
+            SELECT thread_id,
+                   ROW_NUMBER() OVER (
+                       PARTITION BY tenant_id, contact_id
+                       ORDER BY last_message_timestamp DESC NULLS LAST, thread_id DESC
+                   ) AS duplicate_rank
+            FROM inbox_threads
+        ) d
+        WHERE t.thread_id = d.thread_id AND d.duplicate_rank > 1
+    """)
+    deleted = int(status.split()[-1])
+    if deleted:
+        print(f"  Removed {deleted} duplicate inbox threads")
+
+
+async def _index_messages_archive(conn):
+    if not await _is_partitioned(conn):
+        await drop_invalid_index(conn, MESSAGES_INDEX)
+        await conn.execute(
+            f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {MESSAGES_INDEX} ON messages_archive{MESSAGES_INDEX_COLUMNS}"
+        )
+        return
+
+    # CONCURRENTLY is not supported on a partitioned parent: build per partition, then attach
+    await conn.execute(f"CREATE INDEX IF NOT EXISTS {MESSAGES_INDEX} ON ONLY messages_archive{MESSAGES_INDEX_COLUMNS}")
+    for partition in await _monthly_partitions(conn):
+        child = f"{partition}_tenant_contact_ts"
+        await drop_invalid_index(conn, child)
+        await conn.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {child} ON {partition}{MESSAGES_INDEX_COLUMNS}")
+        attached = await conn.fetchval(
+            "SELECT EXISTS (SELECT 1 FROM pg_inherits WHERE inhrelid = to_regclass($1))", child
+        )
+        if not attached:
+            await conn.execute(f"ALTER INDEX {MESSAGES_INDEX} ATTACH PARTITION {child}")
+
+
+async def migrate(conn):
+    if await _exists(conn, "contacts_cache"):
+        await conn.execute("ALTER TABLE contacts_cache ADD COLUMN IF NOT EXISTS last_accessed_at TIMESTAMPTZ DEFAULT NOW()")
+
+    # Unique builds fail on existing duplicates
+    await _merge_duplicate_contacts(conn)
+    await _dedupe_inbox_threads(conn)
+
+    for table, statement in INDEXES:
+        if not await _exists(conn, table):
+            continue
+        index_name = statement.split(" IF NOT EXISTS ")[1].split()[0]
+        await drop_invalid_index(conn, index_name)
+        await conn.execute(statement)
+
+    if await _exists(conn, "messages_archive"):
+        await _index_messages_archive(conn)
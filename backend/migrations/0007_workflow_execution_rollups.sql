@@ -0,0 +1,31 @@
+-- Hourly execution statistics, maintained incrementally as executions change
+
+CREATE TABLE IF NOT EXISTS workflow_execution_rollups (
+    tenant_id UUID NOT NULL REFERENCES tenants(id) ON DELETE CASCADE,
+    workflow_id UUID NOT NULL REFERENCES workflows(id) ON DELETE CASCADE,
+    bucket TIMESTAMPTZ NOT NULL, -- UTC hour of started_at
+    status VARCHAR(50) NOT NULL,
+    executions INTEGER NOT NULL DEFAULT 0,
+    duration_ms_sum BIGINT NOT NULL DEFAULT 0, -- finished executions only
+    duration_count INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ DEFAULT NOW(),
+    PRIMARY KEY (tenant_id, workflow_id, bucket, status)
+);
+
+CREATE INDEX IF NOT EXISTS idx_workflow_execution_rollups_tenant_bucket ON workflow_execution_rollups(tenant_id, bucket);
+
+CREATE INDEX IF NOT EXISTS idx_workflow_execution_rollups_bucket ON workflow_execution_rollups(bucket);
+
+-- Backfill from the executions recorded so far
+INSERT INTO workflow_execution_rollups (tenant_id, workflow_id, bucket, status, executions, duration_ms_sum, duration_count)
+SELECT tenant_id,
+       workflow_id,
+       date_trunc('hour', started_at AT TIME ZONE 'UTC') AT TIME ZONE 'UTC',
+       COALESCE(status, 'running'),
+       COUNT(*),
+       COALESCE(SUM(GREATEST(0, (EXTRACT(EPOCH FROM (finished_at - started_at)) * 1000)::bigint)), 0),
+       COUNT(finished_at)
+FROM workflow_executions
+WHERE started_at IS NOT NULL
+GROUP BY 1, 2, 3, 4
+ON CONFLICT (tenant_id, workflow_id, bucket, status) DO NOTHING;
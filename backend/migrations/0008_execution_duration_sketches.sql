@@ -0,0 +1,34 @@
+-- Mergeable duration sketches (DDSketch, 1% relative accuracy) per rollup bucket
+
+ALTER TABLE workflow_execution_rollups ADD COLUMN IF NOT EXISTS duration_sketch JSONB NOT NULL DEFAULT '{}';
+
+-- Adds sketch bucket counts key by key, dropping buckets that reach zero
+CREATE OR REPLACE FUNCTION ddsketch_merge(a JSONB, b JSONB) RETURNS JSONB
+LANGUAGE sql IMMUTABLE AS $$
+    SELECT COALESCE(jsonb_object_agg(key, total) FILTER (WHERE total <> 0), '{}'::jsonb)
+    FROM (
+        SELECT key, SUM(value::bigint) AS total
+        FROM (SELECT * FROM jsonb_each_text(a) UNION ALL SELECT * FROM jsonb_each_text(b)) counts
+        GROUP BY key
+    ) merged
+$$;
+
+-- Backfill from finished executions (bucket index = ceil(ln(ms) / ln(gamma)), ms clamped to >= 1)
+UPDATE workflow_execution_rollups r
+SET duration_sketch = s.sketch
+FROM (
+    SELECT tenant_id, workflow_id, bucket, status, jsonb_object_agg(sketch_key, executions) AS sketch
+    FROM (
+        SELECT tenant_id,
+               workflow_id,
+               date_trunc('hour', started_at AT TIME ZONE 'UTC') AT TIME ZONE 'UTC' AS bucket,
+               COALESCE(status, 'running') AS status,
+               CEIL(LN(GREATEST(1, ROUND(EXTRACT(EPOCH FROM (finished_at - started_at)) * 1000))) / LN(1.01 / 0.99))::int::text AS sketch_key,
+               COUNT(*) AS executions
+        FROM workflow_executions
+        WHERE started_at IS NOT NULL AND finished_at IS NOT NULL
+        GROUP BY 1, 2, 3, 4, 5
+    ) keyed
+    GROUP BY 1, 2, 3, 4
+) s
+WHERE r.tenant_id = s.tenant_id AND r.workflow_id = s.workflow_id AND r.bucket = s.bucket AND r.status = s.status;
@@ -0,0 +1,45 @@
+-- migrate: no-transaction
+-- Keyset pagination of execution history on (started_at, id)
+
+-- Rows without started_at were skipped by the 0007/0008 rollup backfill; add their contribution
+-- in the same statement that gives them a started_at, so later updates and deletes subtract what was counted
+WITH backfilled AS (
+    UPDATE workflow_executions SET started_at = COALESCE(created_at, NOW())
+    WHERE started_at IS NULL
+    RETURNING tenant_id,
+              workflow_id,
+              date_trunc('hour', started_at AT TIME ZONE 'UTC') AT TIME ZONE 'UTC' AS bucket,
+              COALESCE(status, 'running') AS status,
+              CASE WHEN finished_at IS NOT NULL
+                   THEN GREATEST(0, ROUND(EXTRACT(EPOCH FROM (finished_at - started_at)) * 1000))::bigint
+              END AS duration_ms
+),
+sketches AS (
+    SELECT tenant_id, workflow_id, bucket, status, jsonb_object_agg(sketch_key, executions) AS sketch
+    FROM (
+        SELECT tenant_id, workflow_id, bucket, status,
+               CEIL(LN(GREATEST(1, duration_ms)) / LN(1.01 / 0.99))::int::text AS sketch_key,
+               COUNT(*) AS executions
+        FROM backfilled
+        WHERE duration_ms IS NOT NULL
+        GROUP BY 1, 2, 3, 4, 5
+    ) keyed
+    GROUP BY 1, 2, 3, 4
+)
+INSERT INTO workflow_execution_rollups AS r
+    (tenant_id, workflow_id, bucket, status, executions, duration_ms_sum, duration_count, duration_sketch)
+SELECT b.tenant_id, b.workflow_id, b.bucket, b.status,
+       COUNT(*), COALESCE(SUM(b.duration_ms), 0), COUNT(b.duration_ms), COALESCE(s.sketch, '{}')
+FROM backfilled b
+LEFT JOIN sketches s USING (tenant_id, workflow_id, bucket, status)
+GROUP BY b.tenant_id, b.workflow_id, b.bucket, b.status, s.sketch
+ON CONFLICT (tenant_id, workflow_id, bucket, status) DO UPDATE SET
+    executions = r.executions + EXCLUDED.executions,
+    duration_ms_sum = r.duration_ms_sum + EXCLUDED.duration_ms_sum,
+    duration_count = r.duration_count + EXCLUDED.duration_count,
+    duration_sketch = ddsketch_merge(r.duration_sketch, EXCLUDED.duration_sketch),
+    updated_at = NOW();
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_workflow_executions_tenant_started ON workflow_executions(tenant_id, started_at DESC, id DESC);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_workflow_executions_workflow_started ON workflow_executions(workflow_id, started_at DESC, id DESC);
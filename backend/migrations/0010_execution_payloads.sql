@@ -0,0 +1,13 @@
+-- Out-of-line, compressed execution payloads (moved from workflow_executions.execution_data)
+
+CREATE TABLE IF NOT EXISTS workflow_execution_payloads (
+    execution_id UUID PRIMARY KEY REFERENCES workflow_executions(id) ON DELETE CASCADE,
+    codec VARCHAR(10) NOT NULL, -- zstd or zlib
+    raw_size INTEGER NOT NULL,
+    payload BYTEA NOT NULL,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+-- Already compressed: keep TOAST from compressing it again
+ALTER TABLE workflow_execution_payloads ALTER COLUMN payload SET STORAGE EXTERNAL;
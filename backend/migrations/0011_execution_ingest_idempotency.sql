@@ -0,0 +1,14 @@
+-- migrate: no-transaction
+-- Batched n8n event ingestion upserts on (tenant_id, n8n_execution_id)
+
+-- Older duplicates keep their row but lose the n8n id, so the unique index can be built
+UPDATE workflow_executions e
+SET n8n_execution_id = NULL
+FROM (
+    SELECT id, ROW_NUMBER() OVER (PARTITION BY tenant_id, n8n_execution_id ORDER BY started_at DESC, id DESC) AS duplicate_rank
+    FROM workflow_executions
+    WHERE n8n_execution_id IS NOT NULL
+) d
+WHERE e.id = d.id AND d.duplicate_rank > 1;
+
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS uq_workflow_executions_tenant_n8n_execution ON workflow_executions(tenant_id, n8n_execution_id) WHERE n8n_execution_id IS NOT NULL;
@@ -0,0 +1,13 @@
+-- Per-tenant execution retention and rollup downsampling
+
+-- NULL means the EXECUTION_DETAIL_DAYS / EXECUTION_RETENTION_DAYS defaults
+ALTER TABLE tenants ADD COLUMN IF NOT EXISTS execution_detail_days INTEGER;
+
+ALTER TABLE tenants ADD COLUMN IF NOT EXISTS execution_retention_days INTEGER;
+
+-- Merges many duration sketches (used when folding hourly rollups into daily ones)
+CREATE OR REPLACE AGGREGATE ddsketch_merge_agg(JSONB) (
+    SFUNC = ddsketch_merge,
+    STYPE = JSONB,
+    INITCOND = '{}'
+);
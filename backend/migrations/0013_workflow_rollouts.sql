@@ -0,0 +1,60 @@
+-- Fleet-wide workflow rollouts and the master workflow copies installed per tenant
+
+CREATE TABLE IF NOT EXISTS workflow_rollouts (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    master_workflow_id VARCHAR(255) NOT NULL,
+    -- Pinned at creation so every tenant gets the same version
+    content_hash CHAR(64) NOT NULL,
+    definition JSONB NOT NULL,
+    tenant_selector JSONB NOT NULL DEFAULT '{}',
+    -- Cumulative percentages of the selected tenants, e.g. [1, 10, 50, 100]; wave 0 is the canary
+    waves JSONB NOT NULL,
+    current_wave INTEGER NOT NULL DEFAULT 0,
+    concurrency INTEGER NOT NULL,
+    max_failure_ratio FLOAT NOT NULL,
+    wave_delay_seconds INTEGER NOT NULL DEFAULT 0,
+    status VARCHAR(20) NOT NULL DEFAULT 'pending'
+        CHECK (status IN ('pending', 'running', 'paused', 'completed', 'cancelled')),
+    status_reason TEXT,
+    created_by VARCHAR(255),
+    -- Lease held by the process running the rollout; a stale heartbeat lets another process resume it
+    runner_id UUID,
+    heartbeat_at TIMESTAMPTZ,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    started_at TIMESTAMPTZ,
+    finished_at TIMESTAMPTZ,
+    updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_workflow_rollouts_active
+    ON workflow_rollouts (heartbeat_at)
+    WHERE status IN ('pending', 'running');
+
+CREATE TABLE IF NOT EXISTS workflow_rollout_targets (
+    rollout_id UUID NOT NULL REFERENCES workflow_rollouts(id) ON DELETE CASCADE,
+    tenant_id UUID NOT NULL REFERENCES tenants(id) ON DELETE CASCADE,
+    wave INTEGER NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'pending'
+        CHECK (status IN ('pending', 'running', 'succeeded', 'failed')),
+    action VARCHAR(20), -- created, updated or unchanged
+    tenant_workflow_id VARCHAR(255),
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error_message TEXT,
+    started_at TIMESTAMPTZ,
+    finished_at TIMESTAMPTZ,
+    PRIMARY KEY (rollout_id, tenant_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_workflow_rollout_targets_wave
+    ON workflow_rollout_targets (rollout_id, wave, status);
+
+-- Which tenant workflow holds each master workflow, so later rollouts update it in place
+CREATE TABLE IF NOT EXISTS tenant_master_workflows (
+    tenant_id UUID NOT NULL REFERENCES tenants(id) ON DELETE CASCADE,
+    master_workflow_id VARCHAR(255) NOT NULL,
+    tenant_workflow_id VARCHAR(255) NOT NULL,
+    content_hash CHAR(64) NOT NULL,
+    installed_at TIMESTAMPTZ DEFAULT NOW(),
+    updated_at TIMESTAMPTZ DEFAULT NOW(),
+    PRIMARY KEY (tenant_id, master_workflow_id)
+);
@@ -0,0 +1,19 @@
+-- Latest health probe result per tenant n8n instance (written by the n8n_health maintenance job)
+
+CREATE TABLE IF NOT EXISTS tenant_n8n_health (
+    tenant_id UUID PRIMARY KEY REFERENCES tenants(id) ON DELETE CASCADE,
+    tenant_slug VARCHAR(63) NOT NULL,
+    is_up BOOLEAN, -- NULL until the first success or enough failures
+    consecutive_failures INTEGER NOT NULL DEFAULT 0,
+    last_status_code INTEGER,
+    last_latency_ms FLOAT,
+    -- Rolling window of successful probe latencies, shared by whichever process probes next
+    recent_latencies_ms FLOAT[] NOT NULL DEFAULT '{}',
+    p50_latency_ms FLOAT,
+    p90_latency_ms FLOAT,
+    p99_latency_ms FLOAT,
+    last_error TEXT,
+    checked_at TIMESTAMPTZ NOT NULL,
+    last_up_at TIMESTAMPTZ,
+    state_changed_at TIMESTAMPTZ
+);
@@ -0,0 +1,14 @@
+"""Add a DEFAULT partition to messages_archive.
+
+Monthly partitions are only created a few months ahead, so a message with a
+later (or older) timestamp had no partition and the insert failed. Such rows
+now land in messages_archive_default; partition maintenance moves them into
+their month's partition once it is created.
+"""
+
+
+async def migrate(conn):
+    relkind = await conn.fetchval("SELECT relkind FROM pg_class WHERE oid = to_regclass('messages_archive')")
+    if relkind != "p":
+        return
+    await conn.execute("CREATE TABLE IF NOT EXISTS messages_archive_default PARTITION OF messages_archive DEFAULT")
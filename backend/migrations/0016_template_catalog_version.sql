@@ -0,0 +1,9 @@
+-- Template catalog version, bumped after every sync so other processes know to refresh their in-memory copy
+
+CREATE TABLE IF NOT EXISTS template_catalog_version (
+    id SMALLINT PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+    version BIGINT NOT NULL DEFAULT 0,
+    synced_at TIMESTAMPTZ
+);
+
+INSERT INTO template_catalog_version (id, version) VALUES (1, 0) ON CONFLICT (id) DO NOTHING;
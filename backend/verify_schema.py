@@ -2,11 +2,99 @@
 """
 Database Schema Verification Script
 Check if tables and columns match what the tenant provisioning code expects
+
+    python verify_schema.py            # table and column checks
+    python verify_schema.py --explain  # EXPLAIN the hot conversation queries, flag seq scans
 """
 
 import asyncio
 import asyncpg
+import json
 import os
+import sys
+import uuid
+
+# Tables smaller than this are expected to be seq-scanned
+SEQ_SCAN_MIN_ROWS = 1000
+
+# (name, query, parameter factory) for the hottest queries in conversations and context
+HOT_QUERIES = [
+    (
+        "contact lookup by phone (hot tier)",
+        "SELECT contact_id, full_name FROM contacts_cache WHERE tenant_id = $1 AND whatsapp_number = $2",
+        lambda t: (t["id"], "+10000000000"),
+    ),
+    (
+        "contact lookup by phone (cold tier)",
+        "SELECT contact_id, full_name FROM contacts_archive WHERE tenant_id = $1 AND whatsapp_number = $2",
+        lambda t: (t["id"], "+10000000000"),
+    ),
+    (
+        "contact lookup by id (hot tier)",
+        "SELECT contact_id, full_name FROM contacts_cache WHERE tenant_id = $1 AND contact_id = $2",
+        lambda t: (t["id"], uuid.uuid4()),
+    ),
+    (
+        "recent messages",
+        """SELECT message_content, direction, message_timestamp FROM messages_archive
+           WHERE tenant_id = $1 AND contact_id = $2 AND message_timestamp >= NOW() - make_interval(days => 30)
+           ORDER BY message_timestamp DESC LIMIT 10""",
+        lambda t: (t["id"], uuid.uuid4()),
+    ),
+    (
+        "thread by contact",
+        "SELECT thread_id FROM inbox_threads WHERE tenant_id = $1 AND contact_id = $2",
+        lambda t: (t["id"], uuid.uuid4()),
+    ),
+    (
+        "open HITL task for routing",
+        """SELECT assigned_to FROM active_hitl_tasks
+           WHERE tenant_id = $1::text AND status NOT IN ('completed', 'resolved')
+           ORDER BY created_at DESC LIMIT 1""",
+        lambda t: (str(t["id"]),),
+    ),
+]
+
+def _seq_scans(plan: dict):
+    """Yield relation names of every Seq Scan node in an EXPLAIN JSON plan"""
+    if plan.get("Node Type") == "Seq Scan":
+        yield plan.get("Relation Name")
+    for child in plan.get("Plans", []):
+        yield from _seq_scans(child)
+
+async def explain_hot_queries(conn) -> int:
+    """EXPLAIN each hot query and flag sequential scans on non-trivial tables; returns the count"""
+    print("\n🧪 EXPLAINING HOT QUERIES:")
+    tenant = await conn.fetchrow("SELECT id FROM tenants LIMIT 1")
+    if not tenant:
+        print("  ⚠️ No tenants found; cannot build sample parameters")
+        return 0
+    
+    flagged = 0
+    for name, query, params in HOT_QUERIES:
+        try:
+            plan_json = await conn.fetchval(f"EXPLAIN (FORMAT JSON) {query}", *params(tenant))
+        except Exception as e:
+            print(f"  ❌ {name}: {type(e).__name__}: {str(e)}")
+            continue
+        plan = (json.loads(plan_json) if isinstance(plan_json, str) else plan_json)[0]["Plan"]
+        
+        problems = []
+        for relation in set(_seq_scans(plan)):
+            rows = await conn.fetchval(
+                "SELECT GREATEST(reltuples, 0)::bigint FROM pg_class WHERE oid = to_regclass($1)",
+                relation
+            ) or 0
+            if rows >= SEQ_SCAN_MIN_ROWS:
+                problems.append(f"{relation} (~{rows} rows)")
+        
+        if problems:
+            flagged += 1
+            print(f"  ❌ {name}: sequential scan on {', '.join(problems)}")
+        else:
+            print(f"  ✅ {name}: {plan['Node Type']} (cost {plan['Total Cost']})")
+    
+    return flagged
 
 async def verify_database_schema():
     """Verify the database schema matches code expectations"""
@@ -144,5 +232,20 @@ async def verify_database_schema():
     except Exception as e:
         print(f"❌ Database connection or query failed: {type(e).__name__}: {str(e)}")
 
+async def verify_query_plans():
+    """Run only the EXPLAIN checks; exits non-zero when a seq scan is flagged"""
+    conn = await asyncpg.connect(os.getenv('DATABASE_URL'))
+    try:
+        flagged = await explain_hot_queries(conn)
+    finally:
+        await conn.close()
+    if flagged:
+        print(f"\n❌ {flagged} hot queries use sequential scans; run `python migrate.py` to add the indexes")
+        sys.exit(1)
+    print("\n✅ All hot queries use indexes")
+
 if __name__ == "__main__":
-    asyncio.run(verify_database_schema())
+    if "--explain" in sys.argv:
+        asyncio.run(verify_query_plans())
+    else:
+        asyncio.run(verify_database_schema())